@@ -0,0 +1,123 @@
+import math
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+"""
+Preamble:
+    Time-decayed interaction affinity between users, fed by likes, comments and messages.
+
+    Every interaction adds a weight to the affinity of the acting user towards the other user, and affinities
+    decay exponentially with the given half-life. Decay is applied lazily using forward decay: a weight added at
+    time t is stored as weight * exp(rate * (t - epoch)), so stored scores never need updating as time passes and
+    their order is already the order of the decayed scores. Reading multiplies by exp(-rate * (now - epoch)).
+    When the stored scores grow too large the epoch is moved forward and every score is rescaled once.
+
+    Each user keeps at most top_n partners as two parallel typed arrays (partner IDs and stored scores).
+    A partner not in a full row replaces the weakest one only if the new interaction outweighs it, so a burst
+    of one-off interactions cannot evict partners the user keeps coming back to, but stale partners do age out.
+"""
+
+RESCALE_LIMIT = 1e100  # Largest stored weight before the epoch is moved forward
+
+class AffinityStore:
+    """
+    Bounded, time-decayed affinity scores between users (indexed by dense user ID)
+    """
+    def __init__(self, half_life: float = 7 * 24 * 3600, top_n: int = 32):
+        self.half_life = half_life  # Seconds for an affinity to halve without new interactions
+        self.top_n = top_n  # Most partners kept per user
+        self.rate = math.log(2) / half_life
+        self.epoch = datetime.now().timestamp()  # Reference time of the stored scores
+        self.partners: List[Optional[array]] = []  # User ID -> array('i') of partner IDs, None until the first
+        self.scores: List[Optional[array]] = []  # User ID -> array('d') of stored scores, aligned with partners
+
+    def _weight(self, weight: float, ts: float) -> float:
+        """Stored form of a weight added at time ts (rescaling everything first if it would grow too large)"""
+        exponent = self.rate * (ts - self.epoch)
+        if exponent > math.log(RESCALE_LIMIT):
+            self._rescale(ts)
+            exponent = 0.0
+        return weight * math.exp(exponent)
+
+    def _rescale(self, ts: float) -> None:
+        """Move the epoch to ts. Time Complexity: O(U * top_n)"""
+        factor = math.exp(-self.rate * (ts - self.epoch))
+        for row in self.scores:
+            if row is not None:
+                for i in range(len(row)):
+                    row[i] *= factor
+        self.epoch = ts
+
+    def record(self, uid: int, other: int, weight: float = 1.0, timestamp: datetime = None) -> None:
+        """
+        Add an interaction of user uid towards user other
+        Time Complexity: O(top_n) - a C-level scan of the user's row
+        """
+        if uid == other:
+            return
+        while len(self.partners) <= uid:
+            self.partners.append(None)
+            self.scores.append(None)
+        partners, scores = self.partners[uid], self.scores[uid]
+        if partners is None:
+            partners = self.partners[uid] = array('i')
+            scores = self.scores[uid] = array('d')
+        added = self._weight(weight, (timestamp or datetime.now()).timestamp())  # Rescaling updates rows in place
+        try:
+            idx = partners.index(other)
+        except ValueError:
+            if len(partners) < self.top_n:
+                partners.append(other)
+                scores.append(added)
+                return
+            weakest = min(range(len(scores)), key=scores.__getitem__)
+            if scores[weakest] < added:
+                partners[weakest] = other
+                scores[weakest] = added
+            return
+        scores[idx] += added
+
+    def _decay(self, now: datetime = None) -> float:
+        return math.exp(-self.rate * ((now or datetime.now()).timestamp() - self.epoch))
+
+    def score(self, uid: int, other: int, now: datetime = None) -> float:
+        """
+        Decayed affinity of uid towards other at time now (0 if other is not among uid's top partners)
+        Time Complexity: O(top_n)
+        """
+        partners = self.partners[uid] if uid < len(self.partners) else None
+        if partners is None:
+            return 0.0
+        try:
+            return self.scores[uid][partners.index(other)] * self._decay(now)
+        except ValueError:
+            return 0.0
+
+    def scores_of(self, uid: int, now: datetime = None) -> Dict[int, float]:
+        """
+        Decayed affinity of uid towards each of its top partners, as partner ID -> score
+        Time Complexity: O(top_n)
+        """
+        partners = self.partners[uid] if uid < len(self.partners) else None
+        if partners is None:
+            return {}
+        decay = self._decay(now)
+        return {partner: score * decay for partner, score in zip(partners, self.scores[uid])}
+
+    def top(self, uid: int, limit: int = 10, now: datetime = None) -> List[Tuple[int, float]]:
+        """
+        The partners uid interacts with most, as (partner ID, decayed score), strongest first
+        Time Complexity: O(top_n log top_n)
+        """
+        return sorted(self.scores_of(uid, now).items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def load(self, epoch: float, partners: List[Optional[array]], scores: List[Optional[array]]) -> None:
+        """Restore the rows saved by a snapshot (scores are relative to epoch)"""
+        self.epoch = epoch
+        self.partners = partners
+        self.scores = scores
+
+    def __len__(self) -> int:
+        """Number of (user, partner) affinities held"""
+        return sum(len(row) for row in self.partners if row is not None)
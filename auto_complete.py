@@ -29,6 +29,37 @@ class Trie:
             current = current.children[char]
         current.end_of_name = True  # end_of_name flag is set to True to know when we reach the end of a name
 
+    """
+    (method) def insert_many(
+        self: Self@Trie,
+        names: list
+    ) -> None
+    """
+    def insert_many(self, names):
+        """
+        Inserts many names at once (used when rebuilding the Trie from a snapshot)
+
+        Time Complexity - O(S log n + C) where n is the number of names, S the cost of sorting them and C the number of new nodes
+        Justification - Names are sorted so each one walks only the part of the path it does not share with the previous name
+        """
+        path = [self.root]  # path[i] is the node reached after the first i chars of the previous name
+        previous = ""
+        for name in sorted(name.lower() for name in names):
+            # Length of the prefix shared with the previous name
+            common = 0
+            limit = min(len(name), len(previous))
+            while common < limit and name[common] == previous[common]:
+                common += 1
+            del path[common + 1:]
+            current = path[-1]
+            for char in name[common:]:
+                if char not in current.children:
+                    current.children[char] = TrieNode()
+                current = current.children[char]
+                path.append(current)
+            current.end_of_name = True
+            previous = name
+
     """
     (method) def search(
         self: Self@Trie,
@@ -0,0 +1,1047 @@
+"""
+Benchmarks for the LinkUs data structures.
+
+Usage:
+    python benchmarks.py                      # run every benchmark
+    python benchmarks.py likes search         # run benchmarks by name
+    python benchmarks.py search --size 100000 # override the largest size of a benchmark
+"""
+import argparse
+import collections
+import csv
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from affinity import AffinityStore
+from auto_complete import Trie
+from bulk_import import import_dataset, read_rows
+from friend_recommendation import FriendRecommender
+from hash_map import ChainHashMap
+from csr_graph import intersection_size
+from hobby_network import HobbyNetwork
+from journal import EventJournal, replay
+from like_set import LikeSet
+from message_store import MessageStore
+from recommendation_cache import RecommendationCache
+from search_index import InvertedIndex
+from snapshot import load_snapshot, save_snapshot
+from social_network import Inbox, SocialNetwork
+from trend_series import TrendSeries
+from trending import TrendingHobbies
+
+def measure_memory(build):
+    """
+    Returns (result, bytes) where bytes is the memory allocated by build() that is still alive when it returns
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def zipf_vocabulary(size, seed=7):
+    """
+    Returns (words, cum_weights) for a synthetic vocabulary whose word frequencies follow Zipf's law
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
+    return words, cum_weights
+
+def bench_like_memory(size=1_000_000):
+    """
+    Memory used by the likes of a single post: a set of username strings vs a LikeSet of user IDs
+    """
+    print("==== Like storage memory per post ====")
+    print(f"{'likes':>10} | {'set[str]':>12} | {'LikeSet':>12} | {'add/s':>12} | {'lookup/s':>12}")
+    for size in (10, 10_000, size):
+        # User IDs spread over a user base twice the size of the like count
+        user_ids = random.sample(range(2 * size), size)
+        usernames = [f"user_{user_id}" for user_id in user_ids]  # Strings exist anyway, only the container is measured
+
+        _, set_bytes = measure_memory(lambda: set(usernames))
+
+        _, like_set_bytes = measure_memory(lambda: LikeSet(user_ids))
+
+        start = time.perf_counter()
+        likes = LikeSet(user_ids)
+        add_rate = size / (time.perf_counter() - start)
+
+        probes = user_ids[:100_000]
+        start = time.perf_counter()
+        for user_id in probes:
+            user_id in likes
+        lookup_rate = len(probes) / (time.perf_counter() - start)
+
+        print(f"{size:>10} | {format_bytes(set_bytes):>12} | {format_bytes(like_set_bytes):>12} | "
+              f"{add_rate:>12,.0f} | {lookup_rate:>12,.0f}")
+
+def bench_search(size=1_000_000, queries=200):
+    """
+    Indexing throughput and BM25 query latency of the post content inverted index
+    """
+    print(f"==== Full-text search over {size:,} posts ====")
+    rng = random.Random(11)
+    words, cum_weights = zipf_vocabulary(50_000)
+    index = InvertedIndex()
+
+    batch = 10_000
+    indexed = 0
+    elapsed = 0.0
+    while indexed < size:
+        count = min(batch, size - indexed)
+        posts = [" ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(5, 30))) for _ in range(count)]
+        start = time.perf_counter()
+        for offset, content in enumerate(posts):
+            index.add(indexed + offset, content)
+        elapsed += time.perf_counter() - start
+        indexed += count
+    print(f"Indexed {size:,} posts in {elapsed:.1f}s ({size / elapsed:,.0f} posts/s, {len(index):,} terms)")
+
+    # Queries mix frequent and rare terms, and a quarter are restricted to a small set of visible authors
+    latencies = []
+    for i in range(queries):
+        query = " ".join(rng.choice(words[:rng.choice((100, 5_000, 50_000))]) for _ in range(rng.randint(1, 3)))
+        accept = (lambda pid: pid % 1000 < 5) if i % 4 == 0 else None
+        start = time.perf_counter()
+        index.search(query, 10, accept)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"Query latency over {queries} queries: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+def random_social_network(users, edges, seed=5):
+    """
+    SocialNetwork with the given number of users and random friendships
+    """
+    rng = random.Random(seed)
+    network = SocialNetwork()
+    for i in range(users):
+        network.add_person(f"Name {i}", f"user{i}", [f"hobby{i % 50}"])
+    added = 0
+    while added < edges:
+        u, v = rng.randrange(users), rng.randrange(users)
+        if u != v:
+            network.make_connections(f"user{u}", f"user{v}")
+            added += 1
+    return network
+
+def bench_snapshot(size=1_000_000):
+    """
+    Save and load time of a binary snapshot of a graph with size friendships
+    """
+    users = max(size // 20, 10)
+    print(f"==== Snapshot of {users:,} users and {size:,} friendships ====")
+    network = random_social_network(users, size)
+    hobby_network = HobbyNetwork()
+    trie = Trie()
+    trie.insert_many(network.usernames)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.snapshot")
+        start = time.perf_counter()
+        save_snapshot(path, network, hobby_network, trie)
+        save_time = time.perf_counter() - start
+        file_size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        load_snapshot(path)
+        load_time = time.perf_counter() - start
+    print(f"Save {save_time:.2f}s, load {load_time:.2f}s, file {format_bytes(file_size)}")
+
+def journal_events(size, users=1000, seed=9):
+    """A valid event stream: users joining, then a mix of new posts and likes on earlier posts"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    events = [("add_person", (f"User {i}", f"user{i}", ["chess"], None)) for i in range(users)]
+    posts = 0
+    while len(events) < size:
+        username = f"user{rng.randrange(users)}"
+        if posts == 0 or rng.random() < 0.3:
+            events.append(("create_post", (username, f"post {posts} about #topic{posts % 50}", now)))
+            posts += 1
+        else:
+            events.append(("like_post", (rng.randrange(posts), username, now)))
+    return events
+
+def bench_journal(size=200_000):
+    """
+    Event journal write rate under each fsync policy and group size, and replay speed
+    """
+    print(f"==== Event journal with {size:,} events ====")
+    events = journal_events(size)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.journal")
+        for policy, group_size in (("always", 1), ("always", 128), ("interval", 128), ("never", 128)):
+            count = size if group_size > 1 else min(size, 2000)  # One fsync per event is slow, sample fewer
+            if os.path.exists(path):
+                os.remove(path)
+            journal = EventJournal(path, fsync_policy=policy, group_size=group_size)
+            start = time.perf_counter()
+            for event, args in events[:count]:
+                journal.record(event, args)
+            journal.close()
+            elapsed = time.perf_counter() - start
+            print(f"fsync={policy:<8} group={group_size:<4} {count / elapsed:>12,.0f} events/s")
+
+        file_size = os.path.getsize(path)
+        start = time.perf_counter()
+        replayed = replay(path, SocialNetwork(), HobbyNetwork())
+        elapsed = time.perf_counter() - start
+        print(f"Replay {replayed:,} events in {elapsed:.2f}s ({replayed / elapsed:,.0f} events/s), "
+              f"journal {format_bytes(file_size)}")
+
+def write_dataset(directory, users, friendships, posts, seed=11, replaced=0):
+    """
+    Random users/friendships CSV files and a posts JSONL file, returns their paths. The users file ends with
+    replaced rows for existing usernames, which replace those profiles.
+    """
+    rng = random.Random(seed)
+    hobbies = [f"hobby{i}" for i in range(200)]
+    paths = {kind: os.path.join(directory, name) for kind, name in
+             (("users", "users.csv"), ("friendships", "friendships.csv"), ("posts", "posts.jsonl"))}
+    with open(paths["users"], "w", newline="") as users_file:
+        writer = csv.writer(users_file)
+        writer.writerow(("username", "name", "hobbies", "description"))
+        for i in range(users):  # Some users have no hobbies
+            writer.writerow((f"user{i}", f"Name {i}", ";".join(rng.sample(hobbies, rng.randint(0, 6))), f"About {i}" if i % 2 else ""))
+        for i in rng.sample(range(users), replaced):
+            writer.writerow((f"user{i}", f"New name {i}", ";".join(rng.sample(hobbies, rng.randint(0, 3))), ""))
+    with open(paths["friendships"], "w", newline="") as friendships_file:
+        writer = csv.writer(friendships_file)
+        writer.writerow(("user1", "user2"))
+        for _ in range(friendships):
+            u, v = rng.sample(range(users), 2)
+            writer.writerow((f"user{u}", f"user{v}"))
+    now = time.time()
+    with open(paths["posts"], "w") as posts_file:
+        for i in range(posts):
+            post = {"username": f"user{rng.randrange(users)}", "content": f"post {i} #{rng.choice(hobbies)}",
+                    "timestamp": now - rng.randrange(30 * 86400)}
+            posts_file.write(json.dumps(post) + "\n")
+    return paths
+
+def import_per_call(paths):
+    """Reference import through the public API, one call per row"""
+    network, hobby_network, trie = SocialNetwork(), HobbyNetwork(), Trie()
+    for row in read_rows(paths["users"]):
+        hobbies = [hobby.strip() for hobby in row["hobbies"].split(";") if hobby.strip()]
+        trie.insert(row["username"])
+        network.add_person(row["name"], row["username"], hobbies, row["description"] or None)
+        hobby_network.add_user_hobbies(row["username"], hobbies)
+    for row in read_rows(paths["friendships"]):
+        network.make_connections(row["user1"], row["user2"])
+    for row in read_rows(paths["posts"]):
+        network.create_post(row["username"], row["content"], datetime.fromtimestamp(row["timestamp"]))
+    return network, hobby_network, trie
+
+def state_fingerprint(network, hobby_network, trie):
+    """Everything the importers build except hobby trend samples, for comparing two imports"""
+    users = [(v.uid, v.username, v.name, v.description, sorted(v.hobbies), network.get_friends(v.username))
+             for v in network.vertices.values()]
+    posts = network.posts
+    post_columns = (list(posts.authors), list(posts.timestamps), posts.contents,
+                    [list(post_ids) for post_ids in posts.by_author])
+    index = {term: (list(p.doc_ids), list(p.term_freqs)) for term, p in network.search_index.postings.items()}
+    hobbies = {hobby: (sorted(hobby_network.get_users_by_hobby(hobby)),
+                       sorted(hobby_network.get_connections(hobby).items()))
+               for hobby in hobby_network.hobby_vertices}
+    user_hobbies = {username: sorted(vertex.hobbies) for username, vertex in hobby_network.user_vertices.items()}
+    names = []
+    trie.depth_first_search(trie.root, "", names)
+    return users, post_columns, index, hobbies, user_hobbies, sorted(names), network.get_trending_topics("hashtag", 86400)
+
+def bench_import(size=200_000):
+    """
+    Per-call import versus the streaming bulk importer for a dataset with size friendships,
+    checking that both produce the same state
+    """
+    users, posts = max(size // 10, 10), size // 4
+    print(f"==== Import of {users:,} users, {size:,} friendships and {posts:,} posts ====")
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_dataset(directory, users, size, posts)
+
+        start = time.perf_counter()
+        reference = import_per_call(paths)
+        per_call_time = time.perf_counter() - start
+
+        network, hobby_network, trie = SocialNetwork(), HobbyNetwork(), Trie()
+        start = time.perf_counter()
+        importer = import_dataset(network, hobby_network, trie, **paths)
+        bulk_time = time.perf_counter() - start
+
+    print(f"Per-call {per_call_time:.2f}s, bulk {bulk_time:.2f}s ({per_call_time / bulk_time:.1f}x)")
+    for kind, stats in importer.stats.items():
+        print(f"  {kind}: {stats['rows'] / stats['seconds']:,.0f} rows/s")
+    if state_fingerprint(*reference) != state_fingerprint(network, hobby_network, trie):
+        raise AssertionError("The bulk import built a different state from the per-call import")
+    print("Identical state: True")
+
+def bench_csr(size=1_000_000):
+    """
+    Building and refreshing the CSR snapshot of a graph with size friendships, and BFS on it
+    versus BFS over the per-Vertex friend arrays
+    """
+    users = max(size // 20, 10)
+    print(f"==== CSR snapshot of {users:,} users and {size:,} friendships ====")
+    network = random_social_network(users, size)
+
+    start = time.perf_counter()
+    csr = network.to_csr()
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(3)
+    for _ in range(size // 100):
+        network.make_connections(f"user{rng.randrange(users)}", f"user{rng.randrange(users)}")
+    start = time.perf_counter()
+    csr = network.to_csr()
+    refresh_time = time.perf_counter() - start
+    print(f"Build {build_time:.2f}s, refresh after {size // 100:,} new friendships {refresh_time:.2f}s")
+
+    start = time.perf_counter()
+    distances = csr.bfs(0)
+    csr_bfs_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vertex_by_id = network.vertex_by_id
+    seen = {0}
+    frontier = [0]
+    while frontier:
+        next_frontier = []
+        for uid in frontier:
+            for friend_uid in vertex_by_id[uid].friends:
+                if friend_uid not in seen:
+                    seen.add(friend_uid)
+                    next_frontier.append(friend_uid)
+        frontier = next_frontier
+    vertex_bfs_time = time.perf_counter() - start
+    reached = sum(1 for distance in distances if distance >= 0)
+    print(f"BFS reaching {reached:,} users: CSR {csr_bfs_time:.2f}s, Vertex friend arrays {vertex_bfs_time:.2f}s")
+    print(f"Degrees: {csr.degree_stats()}")
+
+class LegacyVertex:
+    """Vertex layout before friendships became ID arrays: a __dict__, a Vertex -> Edge dict and two queues"""
+    def __init__(self, name, username, hobbies, uid):
+        self.uid = uid
+        self.name = name
+        self.hobbies = set(hobbies)
+        self.description = None
+        self.username = username
+        self.adjacency_map = dict()
+        self.inbox = []
+        self.messages = []
+
+class LegacyEdge:
+    def __init__(self, vertex1, vertex2):
+        self.vertex1 = vertex1
+        self.vertex2 = vertex2
+
+def bench_graph_memory(size=1_000_000):
+    """
+    Memory of the social graph (users and friendships) at increasing sizes: the old Vertex/Edge object
+    layout versus slotted vertices with sorted friend ID arrays
+    """
+    print("==== Social graph memory ====")
+    print(f"{'users':>10} | {'friendships':>12} | {'Vertex+Edge':>12} | {'ID arrays':>12} | {'per edge before':>16} | {'per edge after':>15}")
+    for edges in (size // 100, size // 10, size):
+        users = max(edges // 20, 10)
+        rng = random.Random(5)
+        pairs = [tuple(rng.sample(range(users), 2)) for _ in range(edges)]
+        names = [(f"Name {i}", f"user{i}") for i in range(users)]  # Strings exist anyway, only the graph is measured
+
+        def build_legacy():
+            vertices = [LegacyVertex(name, username, ["chess"], uid) for uid, (name, username) in enumerate(names)]
+            for u, v in pairs:
+                connection = LegacyEdge(vertices[u], vertices[v])
+                vertices[u].adjacency_map[vertices[v]] = connection
+                vertices[v].adjacency_map[vertices[u]] = connection
+            return vertices
+
+        def build_slim():
+            network = SocialNetwork()
+            for name, username in names:
+                network.add_person(name, username, ["chess"])
+            for u, v in pairs:
+                network._connect(names[u][1], names[v][1])
+            return network
+
+        _, legacy_bytes = measure_memory(build_legacy)
+        _, slim_bytes = measure_memory(build_slim)
+        print(f"{users:>10,} | {edges:>12,} | {format_bytes(legacy_bytes):>12} | {format_bytes(slim_bytes):>12} | "
+              f"{format_bytes(legacy_bytes / edges):>16} | {format_bytes(slim_bytes / edges):>15}")
+
+def bench_inbox(size=100_000, operations=2_000):
+    """
+    Membership checks and accepting requests in a celebrity inbox of size pending requests:
+    the original list-backed inbox versus the hash-backed Inbox
+    """
+    print(f"==== Friend request inbox with {size:,} pending requests ====")
+    requesters = [f"fan{i}" for i in range(size)]
+    rng = random.Random(2)
+    probes = rng.sample(requesters, operations)
+
+    list_inbox = list(requesters)
+    inbox = Inbox()
+    for requester in requesters:
+        inbox.add(requester)
+
+    for name, container in (("list", list_inbox), ("Inbox", inbox)):
+        start = time.perf_counter()
+        for requester in probes:
+            requester in container
+        lookup_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for requester in probes:
+            container.remove(requester)
+        remove_time = time.perf_counter() - start
+        print(f"{name:<6} {operations / lookup_time:>14,.0f} lookups/s {operations / remove_time:>14,.0f} removals/s")
+
+    start = time.perf_counter()
+    capped = Inbox(cap=1000)
+    for requester in requesters:
+        capped.add(requester)
+    print(f"Capped at 1,000: {size / (time.perf_counter() - start):,.0f} adds/s, oldest kept {capped.page(0, 1)[0]}")
+
+def bench_messages(size=1_000_000, users=2000, partners=5, retention=50):
+    """
+    Memory and read cost of size direct messages between users who each talk to a few partners:
+    per-recipient lists of preformatted strings versus the MessageStore (unbounded and with a
+    retention-sized ring buffer per conversation)
+    """
+    print(f"==== {size:,} messages between {users:,} users ====")
+    rng = random.Random(8)
+    usernames = [f"user{i}" for i in range(users)]
+    contacts = [[rng.randrange(users) for _ in range(partners)] for _ in range(users)]
+    traffic = []
+    for i in range(size):
+        sender = rng.randrange(users)
+        traffic.append((sender, rng.choice(contacts[sender]), f"message number {i}"))
+    timestamp = datetime.now()
+
+    def build_lists():
+        inboxes = [[] for _ in range(users)]
+        for sender, recipient, body in traffic:
+            inboxes[recipient].append(f"From {usernames[sender]}: {body}")
+        return inboxes
+
+    def build_store(retention=None):
+        store = MessageStore(usernames, retention)
+        for sender, recipient, body in traffic:
+            store.append(sender, recipient, body, timestamp)
+        return store
+
+    inboxes, list_bytes = measure_memory(build_lists)
+    store, store_bytes = measure_memory(build_store)
+    _, ring_bytes = measure_memory(lambda: build_store(retention))
+    print(f"Strings per recipient {format_bytes(list_bytes)}, MessageStore {format_bytes(store_bytes)}, "
+          f"ring buffer of {retention} per conversation {format_bytes(ring_bytes)}")
+
+    start = time.perf_counter()
+    for uid in range(users):
+        list(inboxes[uid])[-20:]
+    copy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for uid in range(users):
+        store.latest(uid, contacts[uid][0], 20)
+    page_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for uid in range(users):
+        store.received(uid, 20)
+    received_time = time.perf_counter() - start
+    print(f"Latest 20 per user: copy whole inbox {copy_time * 1000 / users:.3f} ms, conversation page "
+          f"{page_time * 1000 / users:.3f} ms, received across conversations {received_time * 1000 / users:.3f} ms")
+
+def bench_affinity(size=1_000_000, users=10_000, top_n=32):
+    """
+    Memory and update rate of size interactions (likes, comments, messages) when each user interacts with a
+    long tail of partners: unbounded nested dict of counts versus the bounded, decayed AffinityStore
+    """
+    print(f"==== {size:,} interactions between {users:,} users ====")
+    rng = random.Random(12)
+    _, cum_weights = zipf_vocabulary(users)
+    others = rng.choices(range(users), cum_weights=cum_weights, k=size)  # Popular users get most interactions
+    traffic = [(rng.randrange(users), other) for other in others]
+    timestamp = datetime.now()
+
+    def build_dict():
+        history = {}
+        for uid, other in traffic:
+            partners = history.setdefault(uid, {})
+            partners[other] = partners.get(other, 0) + 1
+        return history
+
+    def build_store():
+        store = AffinityStore(top_n=top_n)
+        for uid, other in traffic:
+            store.record(uid, other, 1.0, timestamp)
+        return store
+
+    history, dict_bytes = measure_memory(build_dict)
+    store, store_bytes = measure_memory(build_store)
+    start = time.perf_counter()
+    build_store()
+    record_rate = size / (time.perf_counter() - start)
+    pairs = sum(len(partners) for partners in history.values())
+    print(f"Nested dict {format_bytes(dict_bytes)} ({pairs:,} pairs), AffinityStore top {top_n} "
+          f"{format_bytes(store_bytes)} ({len(store):,} pairs), {record_rate:,.0f} interactions/s")
+
+def bench_mutual_friends(size=200_000, users=20_000, probes=50):
+    """
+    Mutual friend counts of one user against every other user: one common_friends call per candidate versus a
+    single common_friends_many pass, and galloping versus set intersection for a hub and a low-degree user
+    """
+    print(f"==== Mutual friends with {users:,} users and {size:,} friendships ====")
+    network = random_social_network(users, size)
+    # A hub befriends a fifth of the network, so its pairs with ordinary users are very unequal
+    for uid in range(1, users, 5):
+        network.make_connections("user0", f"user{uid}")
+    rng = random.Random(13)
+    sources = [f"user{rng.randrange(1, users)}" for _ in range(probes)]
+
+    start = time.perf_counter()
+    for source in sources:
+        for candidate in network.usernames:
+            if candidate != source:
+                network.common_friends(source, candidate)
+    pairwise_time = (time.perf_counter() - start) / probes
+    start = time.perf_counter()
+    for source in sources:
+        network.common_friends_many(source, (candidate for candidate in network.usernames if candidate != source))
+    batch_time = (time.perf_counter() - start) / probes
+    print(f"Against all users: pairwise {pairwise_time * 1000:.1f} ms, single 2-hop pass {batch_time * 1000:.1f} ms")
+
+    hub = network.vertices["user0"].friends
+    rows = [network.vertices[source].friends for source in sources]
+    start = time.perf_counter()
+    for row in rows:
+        len(set(row).intersection(hub))
+    set_time = (time.perf_counter() - start) / probes
+    start = time.perf_counter()
+    for row in rows:
+        intersection_size(row, hub)
+    gallop_time = (time.perf_counter() - start) / probes
+    print(f"Hub ({len(hub):,} friends) vs user: set intersection {set_time * 1e6:.1f} us, galloping {gallop_time * 1e6:.1f} us")
+
+def bench_fof_index(size=200_000, users=20_000, probes=200, top_m=64, limit=10):
+    """
+    Top friends-of-friends reads by a 2-hop expansion versus the incrementally maintained FoF index of top_m
+    counts per user, what the index costs per friendship and in memory, and heuristic recommendations with and
+    without it, checking that the index gives the same top counts as the expansion for every user
+    """
+    print(f"==== Friends of friends with {users:,} users and {size:,} friendships (top {top_m}) ====")
+    rng = random.Random(14)
+    edges = []
+    while len(edges) < size:
+        u, v = rng.randrange(users), rng.randrange(users)
+        if u != v:
+            edges.append((f"user{u}", f"user{v}"))
+    indexed = SocialNetwork(fof_top_m=top_m)
+    for i in range(users):
+        indexed.add_person(f"Name {i}", f"user{i}", [])
+    start = time.perf_counter()
+    for u, v in edges:
+        indexed.make_connections(u, v)
+    indexed_time = time.perf_counter() - start
+    plain = SocialNetwork()
+    for i in range(users):
+        plain.add_person(f"Name {i}", f"user{i}", [])
+    start = time.perf_counter()
+    for u, v in edges:
+        plain.make_connections(u, v)
+    plain_time = time.perf_counter() - start
+    index = indexed.fof_index
+    _, index_bytes = measure_memory(lambda: index.rebuild([vertex.friends for vertex in indexed.vertex_by_id]))
+    answered = sum(index.top(uid, limit) is not None for uid in range(users))
+    print(f"make_connections {plain_time / size * 1e6:.1f} us without the index, {indexed_time / size * 1e6:.1f} us with it; "
+          f"index {format_bytes(index_bytes)} ({len(index):,} counters), top {limit} answered from the row for "
+          f"{answered / users:.1%} of users")
+
+    # The best-connected users are the ones whose 2-hop expansion is slowest
+    sources = sorted(indexed.usernames, key=lambda username: len(indexed.vertices[username].friends))[-probes:]
+    start = time.perf_counter()
+    for source in sources:
+        plain.friends_of_friends(source, limit)
+    expand_time = (time.perf_counter() - start) / probes
+    start = time.perf_counter()
+    for source in sources:
+        indexed.friends_of_friends(source, limit)
+    index_time = (time.perf_counter() - start) / probes
+    print(f"Top {limit} FoF of the {probes} best-connected users: 2-hop expansion {expand_time * 1000:.2f} ms, "
+          f"index {index_time * 1000:.2f} ms")
+
+    hobby_network = HobbyNetwork()
+    timings = []
+    for network in (plain, indexed):
+        recommender = FriendRecommender(network, hobby_network)
+        start = time.perf_counter()
+        for source in sources[-20:]:
+            recommender.get_recommendations(source)
+        timings.append((time.perf_counter() - start) / 20)
+    print(f"Recommendations: {timings[0] * 1000:.1f} ms with the 2-hop expansion, {timings[1] * 1000:.1f} ms with the index")
+
+    for username in indexed.usernames:
+        counts = plain.friends_of_friends(username)
+        top = indexed.friends_of_friends(username, limit)
+        # Same counts in the same order, users tied at the last count may differ
+        if list(top.values()) != list(plain.friends_of_friends(username, limit).values()):
+            raise AssertionError(f"The FoF index differs from the 2-hop expansion for {username}")
+        row = indexed.fof_index.row(indexed.vertices[username].uid)
+        if any(counts.get(other) != count for other, count in top.items()) or any(
+                counts.get(indexed.usernames[other]) != count for other, count in row.items()):
+            raise AssertionError(f"The FoF index holds a wrong count for {username}")
+    print(f"Same top {limit} counts as the 2-hop expansion for all {users:,} users: True")
+
+def power_law_social_network(users, links_per_user=4, seed=15):
+    """
+    SocialNetwork grown by preferential attachment (Barabasi-Albert), so friend counts follow a power law
+    """
+    rng = random.Random(seed)
+    network = SocialNetwork()
+    for i in range(users):
+        network.add_person(f"Name {i}", f"user{i}", [])
+    endpoints = list(range(links_per_user + 1))  # Every user appears once per friendship, so picks favour hubs
+    for uid in range(links_per_user + 1, users):
+        for friend_uid in {rng.choice(endpoints) for _ in range(links_per_user)}:
+            network.make_connections(f"user{uid}", f"user{friend_uid}")
+            endpoints.extend((uid, friend_uid))
+    return network
+
+def one_sided_distance(network, username1, username2):
+    """Hop distance found by a plain BFS from username1 that stops as soon as it reaches username2"""
+    source, target = network.vertices[username1].uid, network.vertices[username2].uid
+    seen = {source}
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for uid in frontier:
+            for friend_uid in network.vertex_by_id[uid].friends:
+                if friend_uid == target:
+                    return depth
+                if friend_uid not in seen:
+                    seen.add(friend_uid)
+                    next_frontier.append(friend_uid)
+        frontier = next_frontier
+    return None
+
+def bench_shortest_path(size=200_000, queries=200):
+    """
+    Degrees-of-separation latency on a power-law graph of size users: one-sided BFS versus bidirectional BFS
+    """
+    print(f"==== Shortest paths on a power-law graph of {size:,} users ====")
+    network = power_law_social_network(size)
+    rng = random.Random(16)
+    pairs = [(f"user{rng.randrange(size)}", f"user{rng.randrange(size)}") for _ in range(queries)]
+    for name, search in (("one-sided BFS", one_sided_distance),
+                         ("bidirectional BFS", lambda network, u, v: network.degrees_of_separation(u, v, max_visited=size))):
+        latencies = []
+        for username1, username2 in pairs:
+            start = time.perf_counter()
+            search(network, username1, username2)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"{name}: p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+
+def planted_partition_edges(users, communities, links_per_user=8, cross_fraction=0.1, seed=17):
+    """Friendships (as user ID pairs) that mostly join users of the same (contiguous) block of user IDs"""
+    rng = random.Random(seed)
+    block = users // communities
+    edges = []
+    for uid in range(users):
+        base = (uid // block) * block
+        for _ in range(links_per_user // 2):
+            other = rng.randrange(users) if rng.random() < cross_fraction else base + rng.randrange(block)
+            if other != uid and other < users:
+                edges.append((uid, other))
+    return edges
+
+def network_from_edges(users, edges):
+    network = SocialNetwork()
+    for i in range(users):
+        network.add_person(f"Name {i}", f"user{i}", [])
+    for uid1, uid2 in edges:
+        network.make_connections(f"user{uid1}", f"user{uid2}")
+    return network
+
+def planted_partition_network(users, communities, **options):
+    """SocialNetwork whose users mostly befriend users of their own block of user IDs"""
+    return network_from_edges(users, planted_partition_edges(users, communities, **options))
+
+def bench_components(size=1_000_000, communities=100):
+    """
+    Incremental connected components (union-find) versus a BFS per query, and label propagation
+    community detection over the CSR snapshot of a graph with about size friendships
+    """
+    users = max(size // 4, communities)
+    print(f"==== Components and communities of {users:,} users ====")
+    start = time.perf_counter()
+    network = planted_partition_network(users, communities)
+    build_time = time.perf_counter() - start
+    csr = network.to_csr()
+    print(f"{csr.num_edges:,} friendships made in {build_time:.1f}s (union-find included), "
+          f"{network.component_count():,} components")
+
+    rng = random.Random(18)
+    probes = [f"user{rng.randrange(users)}" for _ in range(1000)]
+    start = time.perf_counter()
+    for username in probes:
+        network.component_size(username)
+    union_find_time = (time.perf_counter() - start) / len(probes)
+    start = time.perf_counter()
+    for username in probes[:5]:
+        sum(1 for distance in csr.bfs(csr.id_of(username)) if distance >= 0)
+    bfs_time = (time.perf_counter() - start) / 5
+    print(f"Component size: BFS {bfs_time * 1000:.1f} ms, union-find {union_find_time * 1e6:.2f} us")
+
+    start = time.perf_counter()
+    found = network.detect_communities()
+    detect_time = time.perf_counter() - start
+    block = users // communities
+    labels = network.community_labels
+    purity = sum(max(collections.Counter(labels[c * block:(c + 1) * block]).values()) for c in range(communities)) / (block * communities)
+    print(f"Label propagation: {found:,} communities in {detect_time:.1f}s "
+          f"({csr.num_edges / detect_time:,.0f} friendships/s), {purity:.0%} of users share their block's label")
+
+def bench_ppr(size=50_000, communities=500, queries=100, limit=10):
+    """
+    Recommendation latency and quality of the heuristic scorer versus personalized PageRank (push and random walks).
+    One friendship of each query user is hidden when the graph is built, and a hit is a recommendation
+    list of limit users that contains the hidden friend.
+    """
+    print(f"==== Friend recommendations on {size:,} users ====")
+    edges = planted_partition_edges(size, communities)
+    rng = random.Random(19)
+    hidden = {}
+    for index in rng.sample(range(len(edges)), queries * 3):
+        uid1, uid2 = edges[index]
+        if uid1 not in hidden and len(hidden) < queries:
+            hidden[uid1] = uid2
+    hidden_pairs = set(hidden.items())
+    network = network_from_edges(size, [edge for edge in edges if edge not in hidden_pairs])
+    hobby_network = HobbyNetwork()
+    for engine in FriendRecommender.ENGINES:
+        recommender = FriendRecommender(network, hobby_network, engine=engine)
+        hits = 0
+        start = time.perf_counter()
+        for uid, friend_uid in hidden.items():
+            if network.are_friends(f"user{uid}", f"user{friend_uid}"):  # Also befriended through another row
+                hits += 1
+                continue
+            recommended = recommender.get_recommendations(f"user{uid}", limit)
+            hits += f"user{friend_uid}" in {username for username, _ in recommended}
+        elapsed = (time.perf_counter() - start) / len(hidden)
+        print(f"{engine:>12}: {elapsed * 1000:.1f} ms per request, hidden friend in top {limit} for {hits / len(hidden):.0%}")
+
+def bench_recommendation_cache(size=5_000, operations=2_000, active_users=300):
+    """
+    Recommendation menu opens interleaved with likes, comments, new friendships and hobby edits, at a write-heavy
+    and a read-heavy mix: recomputing every time versus the event-invalidated RecommendationCache
+    """
+    for write_share in (0.1, 0.01):
+        print(f"==== {operations:,} operations on {size:,} users, {write_share:.0%} writes ====")
+        network = planted_partition_network(size, size // 100)
+        hobby_network = HobbyNetwork()
+        for i in range(size):
+            network.create_post(f"user{i}", f"post by user{i}")
+        recommender = FriendRecommender(network, hobby_network)
+        cache = RecommendationCache(recommender)
+        network.subscribe(cache)
+        hobby_network.subscribe(cache)
+
+        rng = random.Random(20)
+        _, cum_weights = zipf_vocabulary(active_users)
+        readers = rng.choices(range(active_users), cum_weights=cum_weights, k=operations)  # A few users read often
+        uncached_time = cached_time = 0.0
+        for reader in readers:
+            username = f"user{rng.randrange(size)}"
+            roll = rng.random() / write_share  # Writes are 60% likes, 20% comments, 10% friendships, 10% hobbies
+            if roll < 0.6:
+                network.like_post(rng.randrange(size), username)
+            elif roll < 0.8:
+                network.comment_on_post(rng.randrange(size), username, "nice")
+            elif roll < 0.9:
+                network.make_connections(username, f"user{rng.randrange(size)}")
+            elif roll < 1:
+                hobby_network.add_user_hobby(username, f"hobby{rng.randrange(50)}")
+            else:
+                start = time.perf_counter()
+                recommender.get_recommendations(f"user{reader}")
+                uncached_time += time.perf_counter() - start
+                start = time.perf_counter()
+                cache.get(f"user{reader}")
+                cached_time += time.perf_counter() - start
+        stats = cache.stats()
+        print(f"Recomputing every time {uncached_time:.1f}s, cached {cached_time:.1f}s; "
+              f"hit rate {stats['hit_rate']:.0%}, {stats['invalidations']:,} invalidated, "
+              f"{stats['expirations']:,} expired, mean age of served results {stats['mean_served_age']:.1f}s")
+
+def bench_hobby_pairs(size=50_000, hobbies=2_000, per_user=8):
+    """
+    Hobby co-occurrence updates for size users with per_user hobbies each: a ChainHashMap per hobby updated with
+    get + put in both directions versus batched add_user_hobbies with the PairTable
+    """
+    print(f"==== Co-occurrence of {hobbies:,} hobbies for {size:,} users with {per_user} hobbies ====")
+    rng = random.Random(21)
+    _, cum_weights = zipf_vocabulary(hobbies)
+    profiles = [[f"hobby{h}" for h in rng.choices(range(hobbies), cum_weights=cum_weights, k=per_user)]
+                for _ in range(size)]
+
+    def per_pair_maps():
+        connections = collections.defaultdict(ChainHashMap)
+        user_hobbies = collections.defaultdict(set)
+        for uid, profile in enumerate(profiles):
+            held = user_hobbies[uid]
+            for hobby in profile:
+                if hobby in held:
+                    continue
+                held.add(hobby)
+                for existing in held:
+                    if existing != hobby:
+                        connections[hobby].put(existing, (connections[hobby].get(existing) or 0) + 1)
+                        connections[existing].put(hobby, (connections[existing].get(hobby) or 0) + 1)
+        return connections
+
+    def batched():
+        hobby_network = HobbyNetwork()
+        for uid, profile in enumerate(profiles):
+            hobby_network.add_user_hobbies(f"user{uid}", profile)
+        return hobby_network
+
+    start = time.perf_counter()
+    per_pair_maps()
+    map_time = time.perf_counter() - start
+    start = time.perf_counter()
+    hobby_network = batched()
+    batched_time = time.perf_counter() - start
+    _, map_bytes = measure_memory(per_pair_maps)
+    def batched_structures():
+        """Only the co-occurrence structures of the batched version: the pair table and the neighbour ID arrays"""
+        network = batched()
+        return network.pair_weights, [vertex.neighbours for vertex in network.hobby_vertices.values()]
+
+    _, batched_bytes = measure_memory(batched_structures)
+    print(f"get + put per direction {map_time:.1f}s, {format_bytes(map_bytes)}; "
+          f"batched PairTable {batched_time:.1f}s, {format_bytes(batched_bytes)} for {len(hobby_network.pair_weights):,} pairs")
+
+def bench_related_hobbies(size=50_000, hobbies=5_000, per_user=8, queries=2_000):
+    """
+    Related-hobby queries: scanning and sorting every connection of the hobby versus the incrementally kept
+    top-k list, and the bulk sparse-product refresh of all hobbies versus one scan per hobby
+    """
+    print(f"==== Related hobbies among {hobbies:,} hobbies of {size:,} users ====")
+    rng = random.Random(22)
+    _, cum_weights = zipf_vocabulary(hobbies)
+    hobby_network = HobbyNetwork()
+    for uid in range(size):
+        profile = rng.choices(range(hobbies), cum_weights=cum_weights, k=per_user)
+        hobby_network.add_user_hobbies(f"user{uid}", [f"hobby{h}" for h in profile])
+    names = list(hobby_network.hobby_vertices)
+    probes = rng.choices(names[:100], k=queries)  # Popular hobbies have the most connections
+
+    start = time.perf_counter()
+    for hobby in probes:
+        sorted(hobby_network.get_connections(hobby).items(), key=lambda item: (-item[1], item[0]))[:10]
+    scan_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for hobby in probes:
+        hobby_network.get_related_hobbies(hobby, 10)
+    top_k_time = time.perf_counter() - start
+    print(f"Per query: scan and sort {scan_time / queries * 1e6:,.0f} us, top-k list {top_k_time / queries * 1e6:,.0f} us "
+          f"({sum(len(hobby_network.hobby_vertices[h].neighbours) for h in probes) / queries:,.0f} connections on average)")
+
+    start = time.perf_counter()
+    for hobby in names:
+        sorted(hobby_network.get_connections(hobby).items(), key=lambda item: (-item[1], item[0]))[:10]
+    scan_time = time.perf_counter() - start
+    start = time.perf_counter()
+    hobby_network.get_all_related_hobbies(10, "jaccard")
+    bulk_time = time.perf_counter() - start
+    print(f"All hobbies: scan per hobby {scan_time:.1f}s, sparse product {bulk_time:.1f}s")
+
+def bench_hobby_trends(size=1_000_000, hobbies=1_000, days=30):
+    """
+    Hobby trend history for size joins spread over days: a deque of the last 100 (time, count) samples per hobby
+    versus the fixed ring buffers of minute, hour and day buckets
+    """
+    print(f"==== Trends of {hobbies:,} hobbies with {size:,} joins over {days} days ====")
+    rng = random.Random(23)
+    _, cum_weights = zipf_vocabulary(hobbies)
+    end = time.time()
+    timestamps = sorted(rng.uniform(end - days * 86400, end) for _ in range(size))
+    picks = rng.choices(range(hobbies), cum_weights=cum_weights, k=size)
+
+    def deques():
+        samples = [collections.deque(maxlen=100) for _ in range(hobbies)]
+        counts = [0] * hobbies
+        for timestamp, hobby in zip(timestamps, picks):
+            counts[hobby] += 1
+            samples[hobby].append((datetime.fromtimestamp(timestamp), counts[hobby]))
+        return samples
+
+    def series():
+        trends = [TrendSeries() for _ in range(hobbies)]
+        counts = [0] * hobbies
+        for timestamp, hobby in zip(timestamps, picks):
+            counts[hobby] += 1
+            trends[hobby].record(timestamp, counts[hobby])
+        return trends
+
+    start = time.perf_counter()
+    samples = deques()
+    deque_time = time.perf_counter() - start
+    start = time.perf_counter()
+    trends = series()
+    series_time = time.perf_counter() - start
+    _, deque_bytes = measure_memory(deques)
+    _, series_bytes = measure_memory(series)
+
+    cutoff = datetime.fromtimestamp(end - days * 86400)
+    start = time.perf_counter()
+    for hobby_samples in samples:
+        [(t, c) for t, c in hobby_samples if t >= cutoff]
+    deque_query = time.perf_counter() - start
+    start = time.perf_counter()
+    for trend in trends:
+        trend.buckets(end - days * 86400, end)
+    series_query = time.perf_counter() - start
+
+    busiest_history = (end - samples[0][0][0].timestamp()) / 3600  # Oldest sample of the most popular hobby
+    print(f"deque(100): record {size / deque_time:,.0f}/s, {format_bytes(deque_bytes)}, {days}-day query "
+          f"{deque_query * 1000:.1f} ms, busiest hobby keeps the last {busiest_history:.1f} hours")
+    print(f"buckets:    record {size / series_time:,.0f}/s, {format_bytes(series_bytes)}, {days}-day query "
+          f"{series_query * 1000:.1f} ms, every hobby keeps {days} days by day")
+
+def bench_trending_hobbies(size=500_000, hobbies=50_000, queries=200):
+    """
+    Rising-hobby queries over a day of Zipf-distributed joins with a few bursting hobbies: scoring and sorting
+    every hobby versus the bounded search over the indexed heap of join velocities
+    """
+    print(f"==== Trending among {hobbies:,} hobbies after {size:,} joins ====")
+    rng = random.Random(24)
+    _, cum_weights = zipf_vocabulary(hobbies)
+    end = time.time()
+    picks = rng.choices(range(hobbies), cum_weights=cum_weights, k=size)
+    timestamps = [rng.uniform(end - 86400, end) for _ in range(size)]
+    bursting = rng.sample(range(100, hobbies), 20)
+    for i in range(size // 20):  # 5% of the joins go to a few hobbies during the last hour
+        picks[i] = bursting[i % len(bursting)]
+        timestamps[i] = rng.uniform(end - 3600, end)
+    trends = TrendingHobbies()
+    start = time.perf_counter()
+    for timestamp, hobby in sorted(zip(timestamps, picks)):
+        trends.observe(hobby, timestamp)
+    observe_time = time.perf_counter() - start
+    tracker = trends.trackers[3600]
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        sorted(((tracker.score(hobby, end), hobby) for hobby in range(hobbies)), reverse=True)[:10]
+    scan_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(queries):
+        top = trends.get_trending(3600, 10, end)
+    heap_time = time.perf_counter() - start
+    found = len({hobby for hobby, _ in top} & set(bursting))
+    print(f"observe {size / observe_time:,.0f} joins/s; per query: score every hobby {scan_time / queries * 1000:.1f} ms, "
+          f"indexed heap {heap_time / queries * 1000:.2f} ms ({found} of the top 10 are bursting hobbies)")
+
+def bench_hobby_search(size=200_000, hobbies=1_000, per_user=5, queries=500):
+    """
+    Users sharing several hobbies: copying and intersecting per-hobby username sets in the caller versus lazy
+    smallest-first intersection of the integer-ID posting lists, for full results and for the first 10
+    """
+    print(f"==== Multi-hobby queries over {size:,} users and {hobbies:,} hobbies ====")
+    rng = random.Random(25)
+    _, cum_weights = zipf_vocabulary(hobbies)
+    hobby_network = HobbyNetwork()
+    name_sets = collections.defaultdict(set)  # The previous layout: hobby -> set of usernames
+    for uid in range(size):
+        profile = [f"hobby{h}" for h in rng.choices(range(hobbies), cum_weights=cum_weights, k=per_user)]
+        hobby_network.add_user_hobbies(f"user{uid}", profile)
+        for hobby in profile:
+            name_sets[hobby].add(f"user{uid}")
+    # Two or three hobbies, from the most popular ones up to the long tail
+    workload = [[f"hobby{rng.choice(range(rng.choice((5, 50, hobbies))))}" for _ in range(rng.randint(2, 3))]
+                for _ in range(queries)]
+
+    start = time.perf_counter()
+    for hobby_names in workload:
+        result = name_sets[hobby_names[0]].copy()
+        for hobby in hobby_names[1:]:
+            result &= name_sets[hobby].copy()
+    copy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for hobby_names in workload:
+        list(hobby_network.get_users_by_hobbies(all_of=hobby_names))
+    lazy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for hobby_names in workload:
+        list(hobby_network.get_users_by_hobbies(all_of=hobby_names, limit=10))
+    limited_time = time.perf_counter() - start
+
+    _, set_bytes = measure_memory(lambda: {hobby: set(users) for hobby, users in name_sets.items()})
+    _, posting_bytes = measure_memory(
+        lambda: {hobby: LikeSet.from_sorted(list(vertex.members)) for hobby, vertex in hobby_network.hobby_vertices.items()})
+    print(f"Per query: set copies {copy_time / queries * 1000:.2f} ms, posting lists {lazy_time / queries * 1000:.2f} ms, "
+          f"first 10 {limited_time / queries * 1000:.3f} ms")
+    print(f"Membership: username sets {format_bytes(set_bytes)}, posting lists {format_bytes(posting_bytes)}")
+
+BENCHMARKS = {
+    "likes": bench_like_memory,
+    "search": bench_search,
+    "snapshot": bench_snapshot,
+    "journal": bench_journal,
+    "import": bench_import,
+    "csr": bench_csr,
+    "graph": bench_graph_memory,
+    "inbox": bench_inbox,
+    "messages": bench_messages,
+    "affinity": bench_affinity,
+    "mutual": bench_mutual_friends,
+    "fof": bench_fof_index,
+    "paths": bench_shortest_path,
+    "components": bench_components,
+    "ppr": bench_ppr,
+    "cache": bench_recommendation_cache,
+    "hobbies": bench_hobby_pairs,
+    "related": bench_related_hobbies,
+    "trends": bench_hobby_trends,
+    "trending": bench_trending_hobbies,
+    "hobby_search": bench_hobby_search,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run LinkUs benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run ({', '.join(BENCHMARKS)}), default all")
+    parser.add_argument("--size", type=int, help="override the largest problem size")
+    args = parser.parse_args()
+
+    for name in args.names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            continue
+        if args.size:
+            BENCHMARKS[name](size=args.size)
+        else:
+            BENCHMARKS[name]()
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from array import array
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterator, List
+
+from auto_complete import Trie
+from hobby_network import HobbyNetwork
+from social_network import SocialNetwork, Vertex
+from union_find import UnionFind
+
+"""
+Preamble:
+    Streaming bulk importer for onboarding large datasets (users, friendships and posts).
+
+    Input files are CSV (with a header row) or JSONL (one object per line), chosen by the file extension:
+        users        username, name, hobbies, description   (CSV hobbies are separated by ';', JSONL uses a list)
+        friendships  user1, user2
+        posts        username, content, timestamp            (ISO 8601 or seconds since the epoch, empty = now)
+
+    Rows are read in chunks of chunk_size, so only one chunk of parsed rows is held at a time. Each chunk is
+    applied in one pass straight to the underlying structures, skipping the per-call work of the public API:
+    usernames go into the Trie with insert_many, and hobby memberships are recorded without touching the
+    co-occurrence table. finish() then computes every hobby co-occurrence weight in a single
+    rebuild_connections pass, which replaces add_user_hobbies' per-user pair updates.
+
+    The imported state is identical to calling add_person, add_user_hobbies, make_connections and create_post
+    row by row, except that hobby trends record the joins of a chunk in one update per hobby.
+    Listeners such as the event journal are not notified, so save a snapshot after importing.
+"""
+
+def read_rows(path: str) -> Iterator[dict]:
+    """Stream the rows of a CSV or JSONL file as dicts"""
+    with open(path, newline='', encoding='utf-8') as data_file:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in data_file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(data_file)
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[List[dict]]:
+    """Stream the rows of a file in lists of at most chunk_size rows"""
+    rows = read_rows(path)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _parse_hobbies(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [hobby.strip() for hobby in value if hobby.strip()]
+
+def _parse_timestamp(value) -> datetime:
+    if value in (None, ""):
+        return datetime.now()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    try:
+        return datetime.fromtimestamp(float(value))
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+def print_progress(kind: str, rows: int, elapsed: float) -> None:
+    """Progress callback that prints the rows imported so far and the throughput"""
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"  {kind}: {rows:,} rows ({rate:,.0f} rows/s)", flush=True)
+
+class BulkImporter:
+    """
+    Imports users, friendships and posts into an existing SocialNetwork, HobbyNetwork and Trie in chunks.
+    Call import_users before import_friendships/import_posts, then finish() once at the end.
+    progress, if given, is called as progress(kind, rows so far, seconds elapsed) after every chunk.
+    """
+    def __init__(self, network: SocialNetwork, hobby_network: HobbyNetwork, trie: Trie,
+                 chunk_size: int = 10_000, progress: Callable[[str, int, float], None] = None):
+        self.network = network
+        self.hobby_network = hobby_network
+        self.trie = trie
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats: Dict[str, Dict[str, float]] = {}  # kind -> rows, skipped and seconds
+        self._replaced_users = False  # Set when a row replaces an existing user (and drops their friendships)
+
+    def _run(self, kind: str, path: str, apply_chunk) -> int:
+        """Stream a file through apply_chunk, which returns the number of rows it skipped"""
+        stats = self.stats.setdefault(kind, {"rows": 0, "skipped": 0, "seconds": 0.0})
+        start = time.perf_counter()
+        rows = 0
+        for chunk in read_chunks(path, self.chunk_size):
+            stats["skipped"] += apply_chunk(chunk)
+            rows += len(chunk)
+            if self.progress:
+                self.progress(kind, rows, time.perf_counter() - start)
+        stats["rows"] += rows
+        stats["seconds"] += time.perf_counter() - start
+        return rows
+
+    def import_users(self, path: str) -> int:
+        """
+        Import user profiles and their hobbies, returns the number of rows read
+        Time Complexity: O(n*(L + h)) for n users with h hobbies - the co-occurrence weights are left to finish()
+        """
+        return self._run("users", path, self._apply_users)
+
+    def _apply_users(self, chunk: List[dict]) -> int:
+        network, hobby_vertices, user_vertices = self.network, self.hobby_network.hobby_vertices, self.hobby_network.user_vertices
+        touched = {}  # hobby -> users who joined it in this chunk
+        usernames = []
+        skipped = 0
+        for row in chunk:
+            username = row.get("username")
+            if not username:
+                skipped += 1
+                continue
+            hobbies = _parse_hobbies(row.get("hobbies"))
+            existing = network.vertices.get(username)
+            if existing is not None:
+                uid = existing.uid
+                network._drop_friendships(existing)
+                self._replaced_users = True
+            else:
+                uid = len(network.usernames)
+                network.usernames.append(username)
+                network.vertex_by_id.append(None)
+                network.components.add()
+            vertex = Vertex(row.get("name") or username, username, hobbies, row.get("description") or None, uid)
+            if network.track_friendship_times:
+                vertex.friend_times = array('d')
+            network.vertices[username] = network.vertex_by_id[uid] = vertex
+            usernames.append(username)
+
+            # Same normalisation and dedup as HobbyNetwork.add_user_hobbies, minus the connection updates. Like
+            # add_user_hobbies, every user is registered, with or without hobbies
+            user_vertex = user_vertices.get(username)
+            if user_vertex is None:
+                user_vertex = self.hobby_network._new_user(username)
+            for hobby in hobbies:
+                hobby = self.hobby_network._normalize_hobby(hobby)
+                if hobby in user_vertex.hobbies:
+                    continue
+                hobby_vertex = hobby_vertices.get(hobby)
+                if hobby_vertex is None:
+                    hobby_vertex = self.hobby_network._new_hobby(hobby)
+                hobby_vertex.members.add(user_vertex.uid)
+                user_vertex.hobbies.add(hobby)
+                touched[hobby] = touched.get(hobby, 0) + 1
+
+        self.trie.insert_many(usernames)
+        for hobby, joins in touched.items():  # One trend update per hobby per chunk
+            hobby_vertices[hobby].update_trend_data(joins)
+        return skipped
+
+    def import_friendships(self, path: str) -> int:
+        """
+        Import friendships between users that already exist, returns the number of rows read
+        Time Complexity: O(m) for m friendships
+        """
+        return self._run("friendships", path, self._apply_friendships)
+
+    def _apply_friendships(self, chunk: List[dict]) -> int:
+        vertices = self.network.vertices
+        skipped = 0
+        for row in chunk:
+            username1, username2 = row.get("user1"), row.get("user2")
+            if username1 not in vertices or username2 not in vertices:
+                skipped += 1
+                continue
+            self.network._connect(username1, username2)
+        return skipped
+
+    def import_posts(self, path: str) -> int:
+        """
+        Import posts by existing users, returns the number of rows read
+        Time Complexity: O(L) per post where L is the length of the content (plus the PostStore insert)
+        """
+        return self._run("posts", path, self._apply_posts)
+
+    def _apply_posts(self, chunk: List[dict]) -> int:
+        network = self.network
+        vertices, posts, search_index, trending = network.vertices, network.posts, network.search_index, network.trending
+        skipped = 0
+        for row in chunk:
+            author = vertices.get(row.get("username"))
+            content = row.get("content")
+            if author is None or content is None:
+                skipped += 1
+                continue
+            timestamp = _parse_timestamp(row.get("timestamp"))
+            post_id = posts.add(author.uid, content, timestamp)
+            search_index.add(post_id, content)
+            trending.observe(content, timestamp)  # Every post, in file order, exactly as create_post feeds it
+        return skipped
+
+    def finish(self) -> None:
+        """
+        Compute the hobby co-occurrence weights and trending hobbies for everything imported in one pass
+        (and rebuild the friendship indexes if existing users were replaced)
+        Time Complexity: O(sum of k^2) over users with k hobbies
+        """
+        self.hobby_network.rebuild_connections()
+        self.hobby_network.rebuild_trending()
+        network = self.network
+        if self._replaced_users:
+            network.components = UnionFind.from_edges(len(network.usernames), network._edges())
+            if network.fof_index is not None:
+                network.fof_index.rebuild([vertex.friends for vertex in network.vertex_by_id])
+            network._csr = None
+
+def import_dataset(network: SocialNetwork, hobby_network: HobbyNetwork, trie: Trie, users: str = None,
+                   friendships: str = None, posts: str = None, **options) -> BulkImporter:
+    """
+    Import any of the three files (in the order users, friendships, posts) and finish.
+    Extra keyword arguments are passed to BulkImporter.
+    """
+    importer = BulkImporter(network, hobby_network, trie, **options)
+    if users:
+        importer.import_users(users)
+    if friendships:
+        importer.import_friendships(friendships)
+    if posts:
+        importer.import_posts(posts)
+    importer.finish()
+    return importer
+
+def main(argv: List[str]) -> None:
+    """
+    Import a dataset into the saved LinkUs state:
+        python bulk_import.py --users users.csv --friendships friends.csv --posts posts.jsonl
+    """
+    import main as app
+
+    parser = argparse.ArgumentParser(description="Bulk import users, friendships and posts into LinkUs")
+    parser.add_argument("--users", help="CSV/JSONL file of users")
+    parser.add_argument("--friendships", help="CSV/JSONL file of friendships")
+    parser.add_argument("--posts", help="CSV/JSONL file of posts")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="rows per chunk")
+    args = parser.parse_args(argv)
+
+    app.load_state()
+    importer = import_dataset(app.network, app.hobby_network, app.trie, args.users, args.friendships, args.posts,
+                              chunk_size=args.chunk_size, progress=print_progress)
+    for kind, stats in importer.stats.items():
+        print(f"{kind}: {stats['rows']:,} rows in {stats['seconds']:.2f}s, {stats['skipped']:,} skipped")
+    app.save_state()  # The importer bypasses the journal, so the result is saved as a snapshot
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
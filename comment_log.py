@@ -0,0 +1,108 @@
+from array import array
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from segment_file import SegmentFile
+
+class CommentLog:
+    """
+    Append-only log of the comments on every post.
+
+    Every comment gets a sequential comment ID and is stored once in the log columns (author ID, timestamp, body).
+    Each post keeps an offset index - the array of its comment IDs in order - so the latest N comments or a page
+    after a cursor are read straight from that index without touching the rest of the thread.
+
+    If a spill path and a per-post hot limit are given, the bodies of the oldest comments on large threads are
+    moved to an append-only disk segment and read back on demand, keeping the memory held per post bounded.
+    """
+    def __init__(self, usernames: List[str], spill_path: str = None, hot_limit: int = None):
+        self.usernames = usernames  # Shared user ID -> username table owned by the SocialNetwork
+        self.authors = array('i')  # Author user ID per comment
+        self.timestamps = array('d')  # Creation time per comment (seconds since epoch)
+        self.bodies: List[Optional[str]] = []  # Comment text, None once spilled to disk
+        self.disk_offsets = array('q')  # Offset in the spill segment, -1 while the body is in memory
+        self.by_post: List[Optional[array]] = []  # Comment IDs per post, None until the first comment
+        self.hot_start = array('i')  # Position of the first in-memory comment in each post's index
+        self.hot_limit = hot_limit
+        self.segment = SegmentFile(spill_path) if spill_path and hot_limit else None
+
+    def _ensure_post(self, pid: int) -> None:
+        while len(self.by_post) <= pid:
+            self.by_post.append(None)
+            self.hot_start.append(0)
+
+    def append(self, pid: int, author_id: int, body: str, timestamp: datetime = None) -> int:
+        """
+        Append a comment to a post and return its comment ID
+        Time Complexity: O(1) amortized - plus one disk write when a comment is spilled
+        """
+        self._ensure_post(pid)
+        cid = len(self.bodies)
+        self.authors.append(author_id)
+        self.timestamps.append((timestamp or datetime.now()).timestamp())
+        self.bodies.append(body)
+        self.disk_offsets.append(-1)
+        if self.by_post[pid] is None:
+            self.by_post[pid] = array('i')
+        self.by_post[pid].append(cid)
+
+        if self.segment is not None and len(self.by_post[pid]) - self.hot_start[pid] > self.hot_limit:
+            self._spill_oldest(pid)
+        return cid
+
+    def spill_cold(self) -> None:
+        """
+        Spill the oldest comments of every post that is over the hot limit (used after a bulk load)
+        Time Complexity: O(P + S) where P is the number of posts and S the number of comments spilled
+        """
+        if self.segment is None:
+            return
+        for pid, comment_ids in enumerate(self.by_post):
+            if comment_ids is not None:
+                while len(comment_ids) - self.hot_start[pid] > self.hot_limit:
+                    self._spill_oldest(pid)
+
+    def _spill_oldest(self, pid: int) -> None:
+        """Move the body of the oldest in-memory comment of a post to the disk segment"""
+        cid = self.by_post[pid][self.hot_start[pid]]
+        self.disk_offsets[cid] = self.segment.append(self.bodies[cid].encode('utf-8'))
+        self.bodies[cid] = None
+        self.hot_start[pid] += 1
+
+    def _body(self, cid: int) -> str:
+        body = self.bodies[cid]
+        if body is None:
+            body = self.segment.read(self.disk_offsets[cid]).decode('utf-8')
+        return body
+
+    def _comment(self, cid: int) -> Tuple[str, str, datetime]:
+        return (self.usernames[self.authors[cid]], self._body(cid), datetime.fromtimestamp(self.timestamps[cid]))
+
+    def count(self, pid: int) -> int:
+        """Number of comments on a post"""
+        if pid < len(self.by_post) and self.by_post[pid] is not None:
+            return len(self.by_post[pid])
+        return 0
+
+    def latest(self, pid: int, limit: int = 10) -> List[Tuple[str, str, datetime]]:
+        """
+        Get the latest comments on a post, oldest first
+        Time Complexity: O(limit) - slices the post's offset index
+        """
+        total = self.count(pid)
+        return self.page(pid, max(total - limit, 0), limit)
+
+    def page(self, pid: int, cursor: int = 0, limit: int = 10) -> List[Tuple[str, str, datetime]]:
+        """
+        Get up to limit comments on a post starting at position cursor, oldest first.
+        The cursor for the next page is cursor + len(result).
+        Time Complexity: O(limit) - slices the post's offset index
+        """
+        if self.count(pid) == 0 or limit <= 0:
+            return []
+        cursor = max(cursor, 0)
+        return [self._comment(cid) for cid in self.by_post[pid][cursor:cursor + limit]]
+
+    def close(self) -> None:
+        if self.segment is not None:
+            self.segment.close()
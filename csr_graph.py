@@ -0,0 +1,234 @@
+import random
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+"""
+Preamble:
+    Immutable compressed-sparse-row (CSR) snapshot of the friendship graph for graph-wide analytics.
+
+    Users are numbered by their dense integer ID. The neighbours of user u are
+    indices[indptr[u]:indptr[u + 1]], sorted ascending, so the whole graph is two flat typed arrays
+    (8 bytes per user and 4 bytes per friendship endpoint) instead of a dict of Vertex objects per user.
+
+    A snapshot is refreshed from a change log of friendships added since it was taken (with_edges): untouched
+    runs of rows are copied as whole slices and only the touched rows are merged, so a refresh costs one linear
+    copy plus O(d log d) per touched row instead of a full rebuild from the object graph.
+
+    Graph-wide passes such as BFS and label propagation community detection run straight over the two arrays.
+
+    The arrays are exposed through read-only memoryviews. as_numpy() wraps them without copying when NumPy is installed.
+"""
+
+GALLOP_RATIO = 32  # Size ratio beyond which galloping beats a linear (set) intersection
+
+def intersection_size(row1: Sequence[int], row2: Sequence[int]) -> int:
+    """
+    Number of IDs two sorted ID arrays have in common.
+    Rows of similar length are intersected as sets. When one row is much longer, each ID of the short row is
+    found by galloping (exponential then binary search) forward through the long one.
+    Time Complexity: O(d1 + d2), or O(d1 log(d2 / d1)) when galloping with d1 << d2
+    """
+    if len(row1) > len(row2):
+        row1, row2 = row2, row1
+    if not row1:
+        return 0
+    if len(row2) < GALLOP_RATIO * len(row1):
+        return len(set(row1).intersection(row2))
+    count = 0
+    lo, end = 0, len(row2)
+    for value in row1:
+        step = 1
+        hi = lo
+        while hi < end and row2[hi] < value:  # Gallop to a window [lo, hi] that must contain value
+            lo = hi + 1
+            hi += step
+            step <<= 1
+        lo = bisect_left(row2, value, lo, min(hi + 1, end))
+        if lo == end:
+            break
+        if row2[lo] == value:
+            count += 1
+            lo += 1
+    return count
+
+class CSRGraph:
+    def __init__(self, indptr: array, indices: array, usernames: Sequence[str]):
+        self.indptr = indptr  # array('q') of num_vertices + 1 row offsets
+        self.indices = indices  # array('i') of neighbour IDs, sorted within each row
+        self.usernames = tuple(usernames)  # User ID -> username
+        self._indices_view = memoryview(indices).toreadonly()  # Also pins the array so it can no longer be resized
+        self._indptr_view = memoryview(indptr).toreadonly()
+        self._ids: Optional[Dict[str, int]] = None  # Username -> user ID, built on first use
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable[int]], usernames: Sequence[str]) -> "CSRGraph":
+        """
+        Build a snapshot from the sorted neighbour IDs of every user, in user ID order
+        Time Complexity: O(V + E)
+        """
+        indptr = array('q', [0])
+        indices = array('i')
+        for row in rows:
+            indices.extend(row)
+            indptr.append(len(indices))
+        return cls(indptr, indices, usernames)
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        """Number of friendships (each is stored once per endpoint)"""
+        return len(self.indices) // 2
+
+    def id_of(self, username: str) -> int:
+        """User ID of a username, raises KeyError if the user is not in the snapshot"""
+        if self._ids is None:
+            self._ids = {username: uid for uid, username in enumerate(self.usernames)}
+        return self._ids[username]
+
+    def neighbours(self, uid: int) -> memoryview:
+        """Sorted neighbour IDs of a user, as a read-only view. Time Complexity: O(1)"""
+        return self._indices_view[self.indptr[uid]:self.indptr[uid + 1]]
+
+    def degree(self, uid: int) -> int:
+        return self.indptr[uid + 1] - self.indptr[uid]
+
+    def degrees(self) -> array:
+        """Degree of every user. Time Complexity: O(V)"""
+        indptr = self.indptr
+        return array('i', (indptr[uid + 1] - indptr[uid] for uid in range(self.num_vertices)))
+
+    def degree_stats(self) -> Dict[str, float]:
+        """
+        Minimum, maximum, mean and median degree
+        Time Complexity: O(V log V) - dominated by sorting the degrees for the median
+        """
+        degrees = sorted(self.degrees())
+        if not degrees:
+            return {"min": 0, "max": 0, "mean": 0.0, "median": 0.0}
+        middle = len(degrees) // 2
+        median = degrees[middle] if len(degrees) % 2 else (degrees[middle - 1] + degrees[middle]) / 2
+        return {"min": degrees[0], "max": degrees[-1], "mean": len(self.indices) / len(degrees), "median": median}
+
+    def bfs(self, source: int, max_depth: int = None) -> array:
+        """
+        Hop distance from source to every user (-1 if unreachable or beyond max_depth)
+        Time Complexity: O(V + E) - level-synchronous traversal over the flat arrays
+        """
+        indptr, indices = self.indptr, self.indices
+        distances = array('i', [-1]) * self.num_vertices
+        distances[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for uid in frontier:
+                for neighbour in indices[indptr[uid]:indptr[uid + 1]]:
+                    if distances[neighbour] < 0:
+                        distances[neighbour] = depth
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return distances
+
+    def mutual_friends(self, uid1: int, uid2: int) -> int:
+        """
+        Number of friends two users have in common
+        Time Complexity: O(d1 + d2), or O(d1 log(d2 / d1)) for very unequal degrees - see intersection_size
+        """
+        return intersection_size(self.neighbours(uid1), self.neighbours(uid2))
+
+    def label_propagation(self, max_iterations: int = 20, seed: int = 0) -> array:
+        """
+        Community label of every user by asynchronous label propagation: every user starts in its own community
+        and, visiting users in a random order each round, takes the label most common among its neighbours
+        (keeping its own on a tie, otherwise the smallest tied label) until a round changes nothing.
+        Only users with a neighbour that changed label in the previous round are visited again, so the later
+        rounds, where few labels still move, touch a small part of the graph.
+        Users with no friends keep their own ID as label.
+        Time Complexity: O(I * (V + E)) worst case for I rounds, far less once most labels settle - O(V) memory
+                         besides the graph
+        """
+        indptr, indices = self.indptr, self.indices
+        labels = array('i', range(self.num_vertices))
+        pending = array('i', (uid for uid in range(self.num_vertices) if indptr[uid + 1] > indptr[uid]))
+        queued = bytearray(self.num_vertices)  # 1 if the user is already in the next round's pending list
+        rng = random.Random(seed)
+        for _ in range(max_iterations):
+            if not pending:
+                break
+            rng.shuffle(pending)
+            next_pending = array('i')
+            for uid in pending:
+                neighbours = indices[indptr[uid]:indptr[uid + 1]]
+                counts = Counter(map(labels.__getitem__, neighbours))
+                best = max(counts.values())
+                if counts.get(labels[uid], 0) == best:
+                    continue
+                labels[uid] = min(label for label, count in counts.items() if count == best)
+                for neighbour in neighbours:
+                    if not queued[neighbour]:
+                        queued[neighbour] = 1
+                        next_pending.append(neighbour)
+            for uid in next_pending:
+                queued[uid] = 0
+            pending = next_pending
+        return labels
+
+    def with_edges(self, edge_log: array, usernames: Sequence[str]) -> "CSRGraph":
+        """
+        New snapshot with the friendships in edge_log (packed uid pairs) added and the users in usernames.
+        Duplicate friendships are ignored.
+        Time Complexity: O(V + E) memory copy plus O(d log d) per row touched by the log
+        """
+        added: Dict[int, List[int]] = defaultdict(list)
+        for i in range(0, len(edge_log), 2):
+            uid1, uid2 = edge_log[i], edge_log[i + 1]
+            added[uid1].append(uid2)
+            if uid1 != uid2:
+                added[uid2].append(uid1)
+
+        old_indptr, old_indices = self.indptr, self.indices
+        old_count = self.num_vertices
+        new_count = len(usernames)
+        indptr = array('q', [0])
+        indices = array('i')
+        row = 0  # First row not yet copied
+        for uid in sorted(added):
+            # Copy the untouched rows before uid in bulk, shifting their offsets
+            end = min(uid, old_count)
+            if row < end:
+                shift = len(indices) - old_indptr[row]
+                indices.extend(old_indices[old_indptr[row]:old_indptr[end]])
+                indptr.extend(offset + shift for offset in old_indptr[row + 1:end + 1])
+            while len(indptr) <= uid:  # New users with no friendships yet
+                indptr.append(len(indices))
+            current = old_indices[old_indptr[uid]:old_indptr[uid + 1]] if uid < old_count else ()
+            indices.extend(sorted(set(current).union(added[uid])))
+            indptr.append(len(indices))
+            row = uid + 1
+
+        end = min(new_count, old_count)
+        if row < end:
+            shift = len(indices) - old_indptr[row]
+            indices.extend(old_indices[old_indptr[row]:old_indptr[end]])
+            indptr.extend(offset + shift for offset in old_indptr[row + 1:end + 1])
+        while len(indptr) <= new_count:
+            indptr.append(len(indices))
+        return CSRGraph(indptr, indices, usernames)
+
+    def as_numpy(self):
+        """
+        (indptr, indices) as NumPy arrays sharing memory with the snapshot (read-only)
+        Raises ImportError if NumPy is not installed.
+        """
+        import numpy
+        return (numpy.frombuffer(self._indptr_view, dtype=numpy.int64),
+                numpy.frombuffer(self._indices_view, dtype=numpy.int32))
+
+    def __repr__(self) -> str:
+        return f"CSRGraph({self.num_vertices} users, {self.num_edges} friendships)"
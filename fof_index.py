@@ -0,0 +1,206 @@
+import heapq
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from csr_graph import intersection_size
+
+"""
+Preamble:
+    Materialized friends-of-friends table: for each user, the number of friends they share with the users two
+    hops away who are not already their friends, kept up to date as friendships change instead of recomputed
+    by a 2-hop expansion per read.
+
+    When u and v become friends, u gains one mutual friend (v) with every friend w of v, and v with every
+    friend of u, so the update touches O(d_u + d_v) counters. Pairs that are friends hold no counter: the
+    counter of u and v is dropped when they become friends, and a friend of v who is also a friend of u is
+    skipped. Ending a friendship applies the same updates in reverse and restores the counter of the pair.
+
+    Each row is bounded to the top_m largest counts (it may grow to 2 * top_m before it is cut back), and every
+    count it holds is exact. Alongside the row, floor bounds every count the row does not hold:
+        - a pair whose count is above floor is always in the row
+        - while floor is 0 the row holds every pair two hops away
+    Trimming raises floor to the largest count it dropped. A pair outside the row can only enter it by rising
+    above floor, so on an increment its exact count is taken from the two friend arrays (an intersection) and
+    it is added only if that count is above floor. The k users sharing the most friends with a user (k <= top_m)
+    are therefore read from the row whenever it holds at least k counts of at least floor, which trimming leaves
+    it with. Otherwise the caller recomputes the row with a 2-hop expansion (refresh). Self-friendships are
+    ignored, as by the 2-hop expansion.
+"""
+
+def _contains(ids: Sequence[int], uid: int) -> bool:
+    """Binary search in a sorted ID array"""
+    idx = bisect_left(ids, uid)
+    return idx < len(ids) and ids[idx] == uid
+
+class FoFIndex:
+    def __init__(self, top_m: int, friends_of: Callable[[int], Sequence[int]]):
+        if top_m < 1:
+            raise ValueError("top_m must be at least 1")
+        self.top_m = top_m
+        self.friends_of = friends_of  # User ID -> sorted friend IDs, for the exact count of a pair outside a row
+        self.rows: List[Optional[Dict[int, int]]] = []  # User ID -> {non-friend two hops away: mutual friends}
+        self.floors: List[int] = []  # User ID -> upper bound of every count missing from the row
+
+    def _grow(self, uid: int) -> None:
+        while len(self.rows) <= uid:
+            self.rows.append(None)
+            self.floors.append(0)
+
+    def _insert(self, uid: int, other: int, count: int) -> None:
+        """Hold the exact count of a pair in the row, trimming it back to top_m counts once it has 2 * top_m"""
+        row = self.rows[uid]
+        if row is None:
+            row = self.rows[uid] = {}
+        row[other] = count
+        if len(row) > 2 * self.top_m:
+            kept = heapq.nlargest(self.top_m + 1, row.items(), key=lambda item: item[1])
+            self.floors[uid] = max(self.floors[uid], kept[-1][1])  # Largest count dropped
+            self.rows[uid] = dict(kept[:-1])
+
+    def _increment_pair(self, uid1: int, uid2: int, friends1: Set[int]) -> None:
+        """
+        One more mutual friend for a pair who are not friends, given the friend IDs of uid1 as a set (both rows
+        must exist, see _update)
+        """
+        exact = None
+        rows, floors = self.rows, self.floors
+        for uid, other in ((uid1, uid2), (uid2, uid1)):
+            row, floor = rows[uid], floors[uid]
+            if row is not None and other in row:
+                row[other] += 1
+            elif floor == 0:  # Every pair two hops away is held, so the pair had no mutual friend
+                self._insert(uid, other, 1)
+            else:
+                if exact is None:
+                    friends2 = self.friends_of(uid2)
+                    # A count never exceeds the smaller friend count, which rules pairs out without intersecting
+                    exact = len(friends1.intersection(friends2)) if min(len(friends1), len(friends2)) > floor else 0
+                if exact > floor:
+                    self._insert(uid, other, exact)
+
+    def _decrement_pair(self, uid1: int, uid2: int, friends1: Set[int]) -> None:
+        """One less mutual friend for a pair who are not friends. A count outside the row stays below its floor"""
+        for uid, other in ((uid1, uid2), (uid2, uid1)):
+            row = self.rows[uid] if uid < len(self.rows) else None
+            if row is None or other not in row:
+                continue
+            if row[other] > 1:
+                row[other] -= 1
+            else:
+                del row[other]
+
+    def _discard(self, uid: int, other: int) -> None:
+        row = self.rows[uid] if uid < len(self.rows) else None
+        if row is not None:
+            row.pop(other, None)
+
+    def add_friendship(self, uid1: int, uid2: int, friends1: Sequence[int], friends2: Sequence[int]) -> None:
+        """
+        Account for a new friendship between uid1 and uid2, given the sorted friend IDs of each (including the new
+        friendship)
+        Time Complexity: O(d1 + d2), plus an O(d) intersection for each pair that may rise above the floor of its row
+        """
+        if uid1 == uid2:
+            return
+        self._update(uid1, uid2, friends1, friends2, self._increment_pair)
+        self._discard(uid1, uid2)  # Friends hold no counter
+        self._discard(uid2, uid1)
+
+    def remove_friendship(self, uid1: int, uid2: int, friends1: Sequence[int], friends2: Sequence[int]) -> None:
+        """
+        Account for a friendship between uid1 and uid2 ending, given the sorted friend IDs of each (the ended
+        friendship may or may not be included)
+        Time Complexity: O(d1 + d2)
+        """
+        if uid1 == uid2:
+            return
+        self._update(uid1, uid2, friends1, friends2, self._decrement_pair)
+        mutual = intersection_size(friends1, friends2)
+        for uid in (uid1, uid2):  # Neither user is a mutual friend of the pair
+            mutual -= _contains(friends1, uid) and _contains(friends2, uid)
+        for uid, other in ((uid1, uid2), (uid2, uid1)):  # The pair are two hops apart again if they share friends
+            self._grow(uid)
+            if mutual > self.floors[uid] or (mutual > 0 and self.floors[uid] == 0):
+                self._insert(uid, other, mutual)
+
+    def _update(self, uid1: int, uid2: int, friends1: Sequence[int], friends2: Sequence[int], apply) -> None:
+        self._grow(max(uid1, uid2, friends1[-1] if friends1 else 0, friends2[-1] if friends2 else 0))
+        set1, set2 = set(friends1), set(friends2)
+        for other in friends2:  # uid2 is a mutual friend of uid1 and each friend of uid2 who is not a friend of uid1
+            if other != uid1 and other != uid2 and other not in set1:
+                apply(uid1, other, set1)
+        for other in friends1:
+            if other != uid1 and other != uid2 and other not in set2:
+                apply(uid2, other, set2)
+
+    def refresh(self, uid: int, counts: Dict[int, int]) -> None:
+        """
+        Replace the row of a user with their top_m counts out of every exact count from a 2-hop expansion
+        Time Complexity: O(F log M) for F entries in counts
+        """
+        self._grow(uid)
+        kept = heapq.nlargest(self.top_m + 1, counts.items(), key=lambda item: item[1])
+        self.floors[uid] = kept[-1][1] if len(kept) > self.top_m else 0
+        self.rows[uid] = dict(kept[:self.top_m]) or None
+
+    def rebuild(self, friend_rows: Sequence[Sequence[int]]) -> None:
+        """
+        Recompute every row from the sorted friend IDs of all users (indexed by user ID), e.g. after loading a
+        snapshot
+        Time Complexity: O(S + N*F log M) where S is the number of 2-hop paths in the graph
+        """
+        self.rows, self.floors = [], []
+        for uid, friends in enumerate(friend_rows):
+            counts: Dict[int, int] = {}
+            for friend in friends:
+                if friend == uid:  # Self-friendships are ignored, as by add_friendship
+                    continue
+                for other in friend_rows[friend]:
+                    if other != friend:
+                        counts[other] = counts.get(other, 0) + 1
+            counts.pop(uid, None)
+            for friend in friends:
+                counts.pop(friend, None)
+            self.refresh(uid, counts)
+
+    def count(self, uid: int, other: int) -> int:
+        """
+        Mutual friends of two users who are not friends (0 for friends)
+        Time Complexity: O(1) when the pair is in the row or the row is complete, O(d log d) otherwise
+        """
+        row = self.rows[uid] if uid < len(self.rows) else None
+        if row is not None and other in row:
+            return row[other]
+        if self.floor(uid) == 0:
+            return 0
+        friends = self.friends_of(uid)
+        if uid == other or _contains(friends, other):
+            return 0
+        return intersection_size(friends, self.friends_of(other))
+
+    def row(self, uid: int) -> Dict[int, int]:
+        """The exact counts held for a user (read-only), every count above floor(uid) among them"""
+        row = self.rows[uid] if uid < len(self.rows) else None
+        return row if row is not None else {}
+
+    def floor(self, uid: int) -> int:
+        """Upper bound of the count of every pair missing from the row of a user (0: the row holds every pair)"""
+        return self.floors[uid] if uid < len(self.floors) else 0
+
+    def top(self, uid: int, limit: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        The limit users sharing the most friends with a user, as (user ID, count) by count then ID, or None if the
+        row holds fewer than limit counts of at least its floor (then refresh it from a 2-hop expansion). Users
+        missing from the row share at most floor friends, so among users tied at the last count the ones held
+        are returned
+        Time Complexity: O(M log limit)
+        """
+        floor = self.floor(uid)
+        entries = [(other, count) for other, count in self.row(uid).items() if count >= floor]
+        if floor > 0 and len(entries) < limit:
+            return None
+        return heapq.nsmallest(limit, entries, key=lambda item: (-item[1], item[0]))
+
+    def __len__(self) -> int:
+        """Number of counters held"""
+        return sum(len(row) for row in self.rows if row is not None)
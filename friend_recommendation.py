@@ -5,13 +5,27 @@ from collections import defaultdict
 from max_heap import MaxHeap
 from social_network import SocialNetwork
 from hobby_network import HobbyNetwork
+from ppr import push_ppr, random_walk_ppr
 
 class FriendRecommender:
-    def __init__(self, social_network: SocialNetwork, hobby_network: HobbyNetwork):
+    # "heuristic" scores every user on 2-hop structure, hobbies and popularity,
+    # "ppr" and "random_walk" rank by personalized PageRank (push-based or Monte-Carlo, see ppr.py)
+    ENGINES = ("heuristic", "ppr", "random_walk")
+
+    def __init__(self, social_network: SocialNetwork, hobby_network: HobbyNetwork, engine: str = "heuristic",
+                 alpha: float = 0.15, epsilon: float = 1e-4, walks: int = 2000, max_walk_length: int = 50):
+        if engine not in self.ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(self.ENGINES)}")
         # Initialize with instances of SocialNetwork and HobbyNetwork
         self.social_network = social_network
         self.hobby_network = hobby_network
         self.popularity_cache = {}   # Cache to store calculated popularity scores for faster access
+        self.max_popularity = 0.0   # Largest popularity seen by the last heuristic ranking
+        self.engine = engine  # Default engine of get_recommendations
+        self.alpha = alpha  # PPR restart probability
+        self.epsilon = epsilon  # Residual threshold of push_ppr, bounds the pushes to 1 / (epsilon * alpha)
+        self.walks = walks  # Walk budget of random_walk_ppr
+        self.max_walk_length = max_walk_length
 
     """
         (method) def calculate_popularity_score(
@@ -30,16 +44,15 @@ class FriendRecommender:
         if not user:
             return 0.0 # Return 0 if the user doesn't exist
             
-        # Get user's posts
-        posts = self.social_network.get_user_posts(username)  # List[(pid, post obj)]
+        # Read the user's post IDs and their like/comment counts straight from the post store columns
+        posts = self.social_network.posts
         total_engagement = 0
         
-        for _, post in posts:
-            total_engagement += len(post.likes) * 2  # Weighted score for likes
-            total_engagement += len(post.comments) * 3  # Weighted score for Comments
+        for pid in posts.posts_by(user.uid):
+            total_engagement += posts.engagement(pid)  # 2 per like, 3 per comment
             
         # Combine friend count and engagement
-        friend_count = len(user.adjacency_map)
+        friend_count = len(user.friends)
         popularity = (friend_count * 0.6) + (total_engagement * 0.4)
         
         # Cache the result
@@ -56,23 +69,15 @@ class FriendRecommender:
         """
             Get friends of friends and their frequency
 
-            Time Complexity:  O(F * F') where F is number of friends of the user and F' is average number of friends per friend
+            Time Complexity:  O(F * F') where F is number of friends of the user and F' is average number of friends per friend,
+                              or O(M log F) when the network keeps a friends-of-friends index of M entries per user
             Justification: Must examine every friend (F) and then every friend of each friend (F') to build complete 
-                           friends-of-friends list.
+                           friends-of-friends list, unless the counts are already materialized. The frequency of a
+                           friend of friend is its mutual friend count.
         """
-        user = self.social_network.vertices.get(username) # Get the user object corresponding to the username
-        if not user:
+        if username not in self.social_network.vertices:
             return {}
-            
-        fof_count = defaultdict(int)
-        # Iterate through each friend and get their friends (friends of friends)
-        for friend in user.adjacency_map:
-            for friend_of_friend in friend.adjacency_map:
-                # Count only if they’re not the user and are not a direct friend
-                if friend_of_friend.username != username and friend_of_friend not in user.adjacency_map:
-                    fof_count[friend_of_friend.username] += 1
-                    
-        return fof_count
+        return defaultdict(int, self.social_network.friends_of_friends(username))
         
     """
         (method) def calculate_hobby_similarity(
@@ -102,51 +107,70 @@ class FriendRecommender:
             limit: int = 5
         ) -> List[Tuple[str, float]]
     """
-    def get_recommendations(self, username: str, limit: int = 5) -> List[Tuple[str, float]]:
+    def get_recommendations(self, username: str, limit: int = 5, engine: str = None) -> List[Tuple[str, float]]:
         """
-            Get friend recommendations with scores
+            Get friend recommendations with scores, using the given engine (default: the recommender's engine)
 
-            Time Complexity: O(N * (F*F' + P + H)) where N is no. of users in the network, F is no. of friends per user,
-                                F' is average no. of friends of friends, P is average no. of posts per user and 
-                                H is average no. of hobbies per user.
+            Time Complexity: O(N * H + S + P) where N is no. of users in the network, S is the no. of 2-hop paths from
+                                the user, P is the total no. of posts and H is average no. of hobbies per user.
             Justification: Must calculate comprehensive scores for every user in the network (N), with each score 
-                           calculation requiring friends-of-friends lookup, post analysis, and hobby comparison.
+                           calculation requiring a hobby comparison. Mutual friend counts for all candidates come from
+                           the single 2-hop pass of get_friends_of_friends, and popularity for all users comes from one
+                           pass over the post store columns. With the friends-of-friends index, the counts come from
+                           the user's row instead: users outside it are scored with the row's floor (an upper bound),
+                           and only those that reach the top are rescored with their exact count, so the result is the
+                           same as with the 2-hop pass.
         """
+        engine = engine or self.engine
+        if engine != "heuristic":
+            return self.get_ppr_recommendations(username, limit, engine)
         user = self.social_network.vertices.get(username)
         if not user:
             return []
             
         # Initialize scoring components
         candidates = {}
-        fof_counts = self.get_friends_of_friends(username)
+        fof_index = self.social_network.fof_index
+        if fof_index is None:
+            fof_counts = self.get_friends_of_friends(username)
+            fof_floor = 0
+        else:
+            usernames = self.social_network.usernames
+            fof_counts = defaultdict(int, {usernames[uid]: count for uid, count in fof_index.row(user.uid).items()})
+            fof_floor = fof_index.floor(user.uid)  # Every count missing from the row is at most this
+        estimated = {}  # Candidates scored with fof_floor -> (hobby score, popularity score)
+        
+        # Popularity of every user from a single scan over the post columns
+        engagement_totals = self.social_network.posts.author_engagement()
+        for other_username, other in self.social_network.vertices.items():
+            popularity = (len(other.friends) * 0.6) + (engagement_totals[other.uid] * 0.4)
+            self.popularity_cache[other_username] = popularity
+        max_popularity = max(self.popularity_cache[u] for u in self.social_network.vertices.keys())
+        self.max_popularity = max_popularity
         
         # Calculate scores for each candidate
+        friend_ids = set(user.friends)
         for candidate_username, candidate in self.social_network.vertices.items():
             # Skip if candidate is the user themselves or already a friend
-            if candidate_username == username or candidate in user.adjacency_map:
+            if candidate_username == username or candidate.uid in friend_ids:
                 continue
                 
-            # Initialize base score
-            score = 0.0
-            
-            # 1. Friends of friends score (30% weight)
-            fof_score = fof_counts[candidate_username] * 0.3
-            
-            # 2. Mutual friends score (25% weight)
-            mutual_friends = self.social_network.common_friends(username, candidate_username)
-            mutual_score = (mutual_friends / max(len(candidate.adjacency_map), 1)) * 0.25
+            # Friends of friends count, a non-friend's mutual friends are exactly its FoF paths
+            bounded = fof_floor > 0 and candidate_username not in fof_counts
+            # Outside the index row only an upper bound is known, made exact if the candidate reaches the top
+            mutual_friends = fof_floor if bounded else fof_counts[candidate_username]
             
             # 3. Hobby similarity score (25% weight)
             hobby_score = self.calculate_hobby_similarity(user.hobbies, candidate.hobbies) * 0.25
             
             # 4. Popularity score (20% weight)
-            popularity = self.calculate_popularity_score(candidate_username)
-            max_popularity = max(self.calculate_popularity_score(u) for u in self.social_network.vertices.keys())
+            popularity = self.popularity_cache[candidate_username]
             popularity_score = (popularity / max_popularity if max_popularity > 0 else 0) * 0.20
             
             # Combine all scores
-            total_score = fof_score + mutual_score + hobby_score + popularity_score
-            candidates[candidate_username] = total_score
+            candidates[candidate_username] = self.combine_scores(mutual_friends, candidate, hobby_score, popularity_score)
+            if bounded:
+                estimated[candidate_username] = (hobby_score, popularity_score)
         
         # Use MaxHeap for getting top recommendations
         recommendation_heap = MaxHeap()
@@ -155,10 +179,81 @@ class FriendRecommender:
         
         # Extract recommendations in descending order
         recommendations = []
-        for _ in range(min(limit, len(candidates))):
-            if recommendation_heap.is_empty():
-                break
+        while len(recommendations) < limit and not recommendation_heap.is_empty():
             score, username = recommendation_heap.extract_max()
+            if username in estimated:  # Scored from an upper bound, so rescore with the exact count and requeue
+                hobby_score, popularity_score = estimated.pop(username)
+                candidate = self.social_network.vertices[username]
+                mutual_friends = fof_index.count(user.uid, candidate.uid)
+                recommendation_heap.insert((self.combine_scores(mutual_friends, candidate, hobby_score, popularity_score), username))
+                continue
             recommendations.append((username, score))
             
         return recommendations
+
+    """
+        (method) def combine_scores(
+            mutual_friends: int,
+            candidate: Vertex,
+            hobby_score: float,
+            popularity_score: float
+        ) -> float
+    """
+    @staticmethod
+    def combine_scores(mutual_friends: int, candidate, hobby_score: float, popularity_score: float) -> float:
+        """
+            Final heuristic score of a candidate from their FoF count and their weighted hobby and popularity scores
+
+            Time Complexity: O(1)
+        """
+        # 1. Friends of friends score (30% weight)
+        fof_score = mutual_friends * 0.3
+        
+        # 2. Mutual friends score (25% weight)
+        mutual_score = (mutual_friends / max(len(candidate.friends), 1)) * 0.25
+        
+        return fof_score + mutual_score + hobby_score + popularity_score
+
+    """
+        (method) def get_ppr_recommendations(
+            self: Self@FriendRecommender,
+            username: str,
+            limit: int = 5,
+            engine: str = "ppr"
+        ) -> List[Tuple[str, float]]
+    """
+    def get_ppr_recommendations(self, username: str, limit: int = 5, engine: str = "ppr") -> List[Tuple[str, float]]:
+        """
+            Get friend recommendations ranked by personalized PageRank from the user, with scores relative to the
+            best candidate (1.0). Candidates any number of hops away can be found.
+
+            Time Complexity: O(1 / (epsilon * alpha) * d) for "ppr", O(walks / alpha) for "random_walk"
+            Justification: Both approximations only explore the part of the graph the walks from the user reach with
+                           noticeable probability, so the cost does not grow with the number of users in the network.
+        """
+        if engine not in self.ENGINES[1:]:
+            raise ValueError(f"engine must be one of {', '.join(self.ENGINES[1:])}")
+        user = self.social_network.vertices.get(username)
+        if not user:
+            return []
+
+        vertex_by_id = self.social_network.vertex_by_id
+        neighbours = lambda uid: vertex_by_id[uid].friends
+        if engine == "ppr":
+            scores = push_ppr(neighbours, user.uid, self.alpha, self.epsilon)
+        else:
+            scores = random_walk_ppr(neighbours, user.uid, self.alpha, self.walks, self.max_walk_length)
+
+        # Rank everyone the walks reached who is not the user or already a friend
+        recommendation_heap = MaxHeap()
+        for uid, score in scores.items():
+            if uid != user.uid and not user.is_friend(uid):
+                recommendation_heap.insert((score, uid))
+
+        recommendations = []
+        best = None
+        while len(recommendations) < limit and not recommendation_heap.is_empty():
+            score, uid = recommendation_heap.extract_max()
+            best = best or score
+            recommendations.append((self.social_network.usernames[uid], score / best))
+        return recommendations
@@ -1,53 +1,83 @@
-from collections import deque
+import heapq
+import math
+import time
+from array import array
 from datetime import datetime, timedelta
-from typing import List, Set, Tuple, Dict
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Dict
+from like_set import LikeSet  # Sorted array / bitmap set of user IDs, the posting list of a hobby
 from max_heap import MaxHeap  # MaxHeap used for prioritizing top counts
-from hash_map import ChainHashMap  # ChainHashMap chosen for efficient key-value mapping
+from pair_table import PairTable  # Compact co-occurrence counts keyed by pairs of hobby IDs
+from trend_series import TrendSeries  # Membership history in fixed-size ring buffers of time buckets
+from trending import TrendingHobbies  # Join velocity against a baseline, kept in an indexed heap
 
 class HobbyVertex:
     """Node representing a hobby in the hobby graph"""
-    def __init__(self, hobby_name: str):
+    def __init__(self, hobby_name: str, hid: int = 0, created: Optional[float] = None):
         self.hobby_name = hobby_name
-        self.users = set()  # Set of usernames
-        self.connections = ChainHashMap()  # Map to store related hobbies and their weights
-        self.trend_data = deque(maxlen=100)  # Limited to last 100 entries
-        self.update_trend_data()  # Logs the current trend data
+        self.hid = hid  # Dense hobby ID, index into HobbyNetwork.hobby_names
+        self.members = LikeSet()  # IDs of the users who have the hobby, index into HobbyNetwork.usernames
+        self.neighbours = array('i')  # IDs of the hobbies it co-occurs with, weights are in HobbyNetwork.pair_weights
+        self.top_ids = array('i')  # IDs of the (up to related_k) hobbies it co-occurs with most
+        self.top_weights = array('i')  # Their co-occurrence weights
+        self.top_floor = 0  # Smallest weight in the list once it is full, weights up to it cannot enter
+        self.trend = TrendSeries()  # Joins and user counts per minute, hour and day
+        self.update_trend_data(joins=0, timestamp=created)  # Logs the trend data at creation (now by default)
 
-    def update_trend_data(self) -> None:
+    def update_trend_data(self, joins: int = 1, timestamp: Optional[float] = None) -> None:
         """
-        Add current timestamp and user count to trend data
-        Time Complexity: O(1) - appending to the deque is constant time.
+        Record that joins users joined (now, or at a Unix timestamp) along with the current user count
+        Time Complexity: O(1) - one bucket per resolution is updated.
         """
-        self.trend_data.append((datetime.now(), len(self.users)))
-
-    def add_connection(self, other_hobby: str) -> None:
-        """
-        Increment connection weight with another hobby
-        Time Complexity: O(1) - ChainHashMap provides average O(1) access and update time
-        """
-        current_weight = self.connections.get(other_hobby) or 0
-        self.connections.put(other_hobby, current_weight + 1)
+        self.trend.record(time.time() if timestamp is None else timestamp, len(self.members), joins)
 
 class UserVertex:
     """Node representing a user in the hobby graph"""
-    def __init__(self, username: str):
+    def __init__(self, username: str, uid: int = 0):
         self.username = username # Initialize a user vertex with the username
+        self.uid = uid  # Dense user ID of the hobby network, index into HobbyNetwork.usernames
         self.hobbies = set()  # Set of hobby names
 
 class HobbyNetwork:
     """Graph-based implementation of hobby relationships"""
-    def __init__(self):
+    # Similarity of two hobbies a and b held by n_a and n_b of the N users, c of them holding both:
+    # "count" is c, "jaccard" is c / (n_a + n_b - c), "pmi" (pointwise mutual information) is log(c * N / (n_a * n_b))
+    RELATED_METRICS = ("count", "jaccard", "pmi")
+
+    def __init__(self, related_k: int = 32):
+        self.related_k = related_k  # Most co-occurring hobbies kept per hobby for get_related_hobbies
         # Dictionary mappings for hobby vertices and user vertices
         self.hobby_vertices: Dict[str, HobbyVertex] = {}
         self.user_vertices: Dict[str, UserVertex] = {}
+        self.hobby_names: List[str] = []  # Hobby ID -> normalized hobby name
+        self.usernames: List[str] = []  # User ID -> username
+        self.pair_weights = PairTable()  # (hobby ID, hobby ID) -> number of users holding both
+        self.trending = TrendingHobbies()  # Fastest-rising hobbies, fed by every join
+        self.listeners = []  # Callables notified with (event, args) after every membership change
+
+    def subscribe(self, listener) -> None:
+        """
+        Register a listener called as listener(event, args) after every membership change,
+        where getattr(hobby_network, event)(*args) replays the change
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener) -> None:
+        """Remove a listener registered with subscribe"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, event: str, *args) -> None:
+        for listener in self.listeners:
+            listener(event, args)
 
     def _normalize_hobby(self, hobby: str) -> str:
         """Normalize hobby name for consistent storage"""
         return hobby.lower().strip()
 
-    def add_hobby(self, hobby_name: str) -> HobbyVertex:
+    def add_hobby(self, hobby_name: str, timestamp: datetime = None) -> HobbyVertex:
         """
-        Add a new hobby or return existing one
+        Add a new hobby (created at timestamp, now by default) or return existing one
         Time Complexity: O(n) - where n is the length of the string (strip and lower)
         """
         hobby = self._normalize_hobby(hobby_name)
@@ -55,10 +85,17 @@ class HobbyNetwork:
             raise ValueError("Hobby name cannot be empty")
             
         if hobby not in self.hobby_vertices:
-            self.hobby_vertices[hobby] = HobbyVertex(hobby)
+            return self._new_hobby(hobby, timestamp)
             
         return self.hobby_vertices[hobby]
 
+    def _new_hobby(self, hobby: str, timestamp: datetime = None) -> HobbyVertex:
+        """Register a vertex for a normalized hobby name that is not in the network yet, with the next hobby ID"""
+        created = timestamp.timestamp() if timestamp is not None else None
+        vertex = self.hobby_vertices[hobby] = HobbyVertex(hobby, len(self.hobby_names), created)
+        self.hobby_names.append(hobby)
+        return vertex
+
     def add_user(self, username: str) -> UserVertex:
         """
         Add a new user or return existing one
@@ -68,52 +105,212 @@ class HobbyNetwork:
             raise ValueError("Username cannot be empty")
             
         if username not in self.user_vertices:
-            self.user_vertices[username] = UserVertex(username)
+            return self._new_user(username)
             
         return self.user_vertices[username]
 
-    def add_user_hobby(self, username: str, hobby_name: str) -> None:
+    def _new_user(self, username: str) -> UserVertex:
+        """Register a vertex for a username that is not in the network yet, with the next user ID"""
+        vertex = self.user_vertices[username] = UserVertex(username, len(self.usernames))
+        self.usernames.append(username)
+        return vertex
+
+    def add_user_hobby(self, username: str, hobby_name: str, timestamp: datetime = None) -> None:
         """
-        Connect a user to a hobby and update relationships
+        Connect a user to a hobby (joined at timestamp, now by default) and update relationships
         Time Complexity: O(k) for each user hobby, where k is the number of user's hobbies.
         """
         if not username or not hobby_name:
             raise ValueError("Username and hobby name must not be empty")
 
-        hobby = self._normalize_hobby(hobby_name)
+        self._add_hobbies(username, [hobby_name], timestamp)
+
+    def add_user_hobbies(self, username: str, hobbies: List[str], timestamp: datetime = None) -> None:
+        """
+        Add multiple hobbies for a user, updating the co-occurrence weights of all new pairs in one batch
+        Time Complexity: O(m*(k + m)) where m is the number of new hobbies and k is the number the user already has.
+        """
+        if not username:
+            raise ValueError("Username cannot be empty")
         
-        # Get or create vertices
-        hobby_vertex = self.add_hobby(hobby)
-        user_vertex = self.add_user(username)
+        self._add_hobbies(username, [hobby for hobby in hobbies if hobby and hobby.strip()], timestamp)  # Skip blank names
 
-        # Skip if connection already exists
-        if hobby in user_vertex.hobbies:
-            return
+    def _add_hobbies(self, username: str, hobby_names: Iterable[str], timestamp: datetime = None) -> None:
+        """
+        Connect a user to the hobbies they do not have yet, then count every new pair once: each new hobby
+        with each hobby the user already had, and each pair of new hobbies. The joins are recorded at timestamp
+        (now by default) in the trend buckets and join velocities, and journaled so a replay restores both.
+        """
+        hobby_names = [self._normalize_hobby(hobby_name) for hobby_name in hobby_names]
+        if not all(hobby_names):  # Checked before any change, so a blank name leaves no partial state
+            raise ValueError("Hobby name cannot be empty")
 
-        # Create new connections
-        hobby_vertex.users.add(username)
-        user_vertex.hobbies.add(hobby)
-        
-        # Update trend data
-        hobby_vertex.update_trend_data()
+        timestamp = timestamp or datetime.now()
+        joined = timestamp.timestamp()
+        user_vertex = self.add_user(username)
+        existing = [self.hobby_vertices[hobby].hid for hobby in user_vertex.hobbies]
+        added = []
+        for hobby_name in hobby_names:
+            # Get or create the hobby vertex, skipping hobbies the user already has (or repeats in the list)
+            hobby_vertex = self.add_hobby(hobby_name, timestamp)
+            if hobby_vertex.hobby_name in user_vertex.hobbies:
+                continue
+            hobby_vertex.members.add(user_vertex.uid)
+            user_vertex.hobbies.add(hobby_vertex.hobby_name)
+            hobby_vertex.update_trend_data(timestamp=joined)
+            self.trending.observe(hobby_vertex.hid, joined)
+            added.append(hobby_vertex)
 
         # Update hobby connections
-        for existing_hobby in user_vertex.hobbies:
-            if existing_hobby != hobby:
-                self.hobby_vertices[hobby].add_connection(existing_hobby)
-                self.hobby_vertices[existing_hobby].add_connection(hobby)
+        for i, hobby_vertex in enumerate(added):
+            hid = hobby_vertex.hid
+            for other in existing:
+                self._count_pair(hid, other)
+            for other_vertex in added[:i]:
+                self._count_pair(hid, other_vertex.hid)
+
+        for hobby_vertex in added:
+            self._notify("add_user_hobby", username, hobby_vertex.hobby_name, timestamp)
+
+    def _count_pair(self, hid1: int, hid2: int) -> None:
+        """Add one co-occurrence of two hobbies. Time Complexity: O(K) for the related_k list of each hobby"""
+        weight = self.pair_weights.increment(hid1, hid2)
+        vertex1 = self.hobby_vertices[self.hobby_names[hid1]]
+        vertex2 = self.hobby_vertices[self.hobby_names[hid2]]
+        if weight == 1:  # First user holding both
+            vertex1.neighbours.append(hid2)
+            vertex2.neighbours.append(hid1)
+        if weight > vertex1.top_floor:
+            self._offer_related(vertex1, hid2, weight)
+        if weight > vertex2.top_floor:
+            self._offer_related(vertex2, hid1, weight)
 
-    def add_user_hobbies(self, username: str, hobbies: List[str]) -> None:
+    def _offer_related(self, vertex: HobbyVertex, other: int, weight: int) -> None:
         """
-        Add multiple hobbies for a user
-        Time Complexity: O(m*k) where m is the number of hobbies and k is time per hobby addition.
+        Keep other in the hobby's top_ids if its new weight is among the related_k largest. Weights only grow,
+        so a hobby can only enter the list when its own weight changes, and the list stays exact. Callers skip
+        weights up to top_floor: a listed hobby had at least that weight before its increment.
         """
-        if not username:
-            raise ValueError("Username cannot be empty")
-        
-        for hobby in hobbies:
-            if hobby:  # Skip empty hobby names
-                self.add_user_hobby(username, hobby)
+        top_ids, top_weights = vertex.top_ids, vertex.top_weights
+        if weight > 1 and other in top_ids:
+            top_weights[top_ids.index(other)] = weight
+        elif len(top_ids) < self.related_k:
+            top_ids.append(other)
+            top_weights.append(weight)
+        else:
+            i = top_weights.index(vertex.top_floor)
+            top_ids[i] = other
+            top_weights[i] = weight
+        if len(top_ids) == self.related_k:
+            vertex.top_floor = min(top_weights)
+
+    def get_connections(self, hobby: str) -> Dict[str, int]:
+        """
+        Hobbies that co-occur with a hobby and the number of users holding both
+        Time Complexity: O(c) for the c hobbies it co-occurs with
+        """
+        vertex = self.hobby_vertices.get(self._normalize_hobby(hobby))
+        if vertex is None:
+            return {}
+        names, weight = self.hobby_names, self.pair_weights.get
+        return {names[other]: weight(vertex.hid, other) for other in vertex.neighbours}
+
+    def rebuild_connections(self) -> None:
+        """
+        Recompute all hobby co-occurrence weights from the current user-hobby memberships in one pass
+        (used after bulk loads instead of replaying add_user_hobby call by call)
+        Time Complexity: O(sum of k^2) over users with k hobbies, plus O(C) to write the C distinct pairs once.
+        """
+        pair_counts = {}
+        vertices = self.hobby_vertices
+        for user_vertex in self.user_vertices.values():
+            hobbies = sorted(vertices[hobby].hid for hobby in user_vertex.hobbies)
+            for i, first in enumerate(hobbies):
+                for second in hobbies[i + 1:]:
+                    pair = (first << 32) | second  # Same packing as PairTable, smaller ID first
+                    pair_counts[pair] = pair_counts.get(pair, 0) + 1
+
+        # Pre-size the table so it never grows while it is filled
+        self.pair_weights = weights = PairTable(len(pair_counts))
+        neighbours = [array('i') for _ in self.hobby_names]
+        for pair, weight in pair_counts.items():
+            first, second = pair >> 32, pair & 0xFFFFFFFF
+            weights.increment(first, second, weight)
+            neighbours[first].append(second)
+            neighbours[second].append(first)
+
+        for vertex in vertices.values():
+            vertex.neighbours = neighbours[vertex.hid]
+            top = heapq.nlargest(self.related_k, ((weights.get(vertex.hid, other), other) for other in vertex.neighbours))
+            vertex.top_ids = array('i', (other for _, other in top))
+            vertex.top_weights = array('i', (weight for weight, _ in top))
+            vertex.top_floor = top[-1][0] if len(top) == self.related_k else 0
+
+    def _similarity(self, metric: str, weight: int, size1: int, size2: int) -> float:
+        """Similarity of two hobbies held by size1 and size2 users, weight of them holding both (see RELATED_METRICS)"""
+        if metric == "count":
+            return weight
+        if metric == "jaccard":
+            return weight / (size1 + size2 - weight)
+        return math.log(weight * len(self.user_vertices) / (size1 * size2))
+
+    def get_related_hobbies(self, hobby: str, limit: int = 10, metric: str = "count") -> List[Tuple[str, float]]:
+        """
+        Hobbies most related to a hobby with their similarity, strongest first (ties by name). Candidates are the
+        related_k hobbies it co-occurs with most, so "jaccard" and "pmi" re-rank those rather than every neighbour.
+        Time Complexity: O(K log K) for K = related_k, independent of the number of neighbours
+        """
+        if metric not in self.RELATED_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(self.RELATED_METRICS)}")
+        vertex = self.hobby_vertices.get(self._normalize_hobby(hobby))
+        if vertex is None:
+            return []
+        names, vertices = self.hobby_names, self.hobby_vertices
+        size = len(vertex.members)
+        related = [
+            (names[other], self._similarity(metric, weight, size, len(vertices[names[other]].members)))
+            for other, weight in zip(vertex.top_ids, vertex.top_weights)
+        ]
+        related.sort(key=lambda item: (-item[1], item[0]))
+        return related[:limit]
+
+    def get_all_related_hobbies(self, limit: int = 10, metric: str = "count") -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Exact related hobbies of every hobby over all of its neighbours, for offline refreshes. The co-occurrence
+        matrix is the sparse product H^T H of the user x hobby incidence matrix H, computed one hobby row at a
+        time (Gustavson's algorithm): the rows of H for the hobby's users are summed into a dense accumulator.
+        Time Complexity: O(sum of k^2) over users with k hobbies, plus O(c log l) per hobby with c neighbours
+        """
+        if metric not in self.RELATED_METRICS:
+            raise ValueError(f"metric must be one of {', '.join(self.RELATED_METRICS)}")
+        names, vertices = self.hobby_names, self.hobby_vertices
+        # H by rows (user -> hobby IDs) and by columns (hobby ID -> user indexes)
+        user_rows = []
+        columns = [array('i') for _ in names]
+        for user_index, user_vertex in enumerate(self.user_vertices.values()):
+            row = array('i', (vertices[hobby].hid for hobby in user_vertex.hobbies))
+            user_rows.append(row)
+            for hid in row:
+                columns[hid].append(user_index)
+
+        sizes = [len(column) for column in columns]
+        accumulator = array('i', bytes(4 * len(names)))
+        related = {}
+        for hid, column in enumerate(columns):
+            touched = []
+            for user_index in column:
+                for other in user_rows[user_index]:
+                    if not accumulator[other]:
+                        touched.append(other)
+                    accumulator[other] += 1
+            scored = []
+            for other in touched:
+                weight = accumulator[other]
+                accumulator[other] = 0
+                if other != hid:
+                    scored.append((names[other], self._similarity(metric, weight, sizes[hid], sizes[other])))
+            related[names[hid]] = heapq.nsmallest(limit, scored, key=lambda item: (-item[1], item[0]))
+        return related
 
     def get_hobby_counts(self) -> Dict[str, int]:
         """
@@ -121,7 +318,7 @@ class HobbyNetwork:
         Time Complexity: O(h) where h is the number of hobbies.
         """
         return {
-            hobby: len(vertex.users)
+            hobby: len(vertex.members)
             for hobby, vertex in self.hobby_vertices.items()
         }
 
@@ -132,7 +329,7 @@ class HobbyNetwork:
         """
         heap = MaxHeap()
         for hobby, vertex in self.hobby_vertices.items():
-            heap.insert((len(vertex.users), hobby))
+            heap.insert((len(vertex.members), hobby))
 
         result = []
         while len(result) < limit and not heap.is_empty():
@@ -157,22 +354,89 @@ class HobbyNetwork:
 
         return result
 
-    def get_hobby_trends(self, days: int = 30) -> Dict[str, List[Tuple[datetime, int]]]:
+    def get_hobby_trends(self, days: float = 30, resolution: Optional[str] = None) -> Dict[str, List[Tuple[datetime, int]]]:
         """
-        Get trend data for all hobbies
-        Time Complexity: O(h*t) where h is the number of hobbies, t is trend data length.
+        Get trend data for all hobbies: the start of every time bucket over the last days and the user count at its
+        end, by minute, hour or day (default: the finest resolution that reaches back that far)
+        Time Complexity: O(h*b) where h is the number of hobbies, b is the number of buckets in the range.
         """
-        cutoff = datetime.now() - timedelta(days=days)
+        now = datetime.now()
+        start, end = (now - timedelta(days=days)).timestamp(), now.timestamp()
         return {
-            hobby: [(t, c) for t, c in vertex.trend_data if t >= cutoff]
+            hobby: [(datetime.fromtimestamp(t), c) for t, c, _ in vertex.trend.buckets(start, end, resolution)]
             for hobby, vertex in self.hobby_vertices.items()
         }
 
+    def get_trending_hobbies(self, window: int = 3600, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Hobbies rising fastest over a window (3600 or 86400 seconds), as (hobby, joins over the window above its
+        usual pace). The usual pace is a moving average over 24 windows.
+        Time Complexity: O(k log k) where k is the number of hobbies read before the remaining ones cannot rank.
+        """
+        names = self.hobby_names
+        return [(names[hid], score) for hid, score in self.trending.get_trending(window, limit)]
+
+    def rebuild_trending(self) -> None:
+        """
+        Re-seed the trending hobbies from the joins kept in the trend buckets (after a snapshot load or bulk import)
+        Time Complexity: O(h*B*W log h) for h hobbies, B trend buckets each and W trending windows.
+        """
+        self.trending = TrendingHobbies(self.trending.windows)
+        history = sorted((timestamp, vertex.hid, joins) for vertex in self.hobby_vertices.values()
+                         for timestamp, joins in vertex.trend.joins_history())
+        for timestamp, hid, joins in history:
+            self.trending.observe(hid, timestamp, joins)
+
     def get_users_by_hobby(self, hobby: str) -> Set[str]:
         """
         Get all users who have a specific hobby
-        Time Complexity: O(1) average, dictionary access and set copy.
+        Time Complexity: O(n) for the n users of the hobby, which are copied into a new set.
         """
         hobby = self._normalize_hobby(hobby)
         vertex = self.hobby_vertices.get(hobby)
-        return vertex.users.copy() if vertex else set()
+        return {self.usernames[uid] for uid in vertex.members} if vertex else set()
+
+    def get_users_by_hobbies(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (),
+                             limit: Optional[int] = None) -> Iterator[str]:
+        """
+        Lazily iterate over the users who have every hobby in all_of and at least one in any_of (either may be
+        empty, not both), in the order they joined the hobby network, stopping after limit users
+        Time Complexity: O(c * h log n) for the c candidates read from the smaller side - the smallest all_of
+                         posting list, or the merged any_of lists - each probed against the h other lists.
+        """
+        required = []
+        for hobby in set(map(self._normalize_hobby, all_of)):
+            vertex = self.hobby_vertices.get(hobby)
+            if vertex is None:  # Nobody has every hobby
+                return iter(())
+            required.append(vertex.members)
+        wanted = set(map(self._normalize_hobby, any_of))
+        optional = [self.hobby_vertices[hobby].members for hobby in wanted if hobby in self.hobby_vertices]
+        if (wanted and not optional) or (not required and not optional):  # Nobody has any of them, or no condition
+            return iter(())
+
+        required.sort(key=len)  # Smallest first, so most candidates are rejected by the first probe
+        optional.sort(key=len, reverse=True)  # Largest first, so most candidates are accepted by the first probe
+        if optional and (not required or sum(map(len, optional)) < len(required[0])):
+            matches = self._match_optional_first(required, optional)  # The any_of lists hold fewer candidates
+        else:
+            matches = self._match_required_first(required, optional)
+        usernames = self.usernames
+        return islice((usernames[uid] for uid in matches), limit)
+
+    @staticmethod
+    def _match_required_first(required: List[LikeSet], optional: List[LikeSet]) -> Iterator[int]:
+        """User IDs of the smallest required list that are in every other required list and any optional list"""
+        others = required[1:]
+        for uid in required[0]:
+            if all(uid in members for members in others) and (not optional or any(uid in members for members in optional)):
+                yield uid
+
+    @staticmethod
+    def _match_optional_first(required: List[LikeSet], optional: List[LikeSet]) -> Iterator[int]:
+        """User IDs of the merged optional lists (each once) that are in every required list"""
+        previous = -1
+        for uid in heapq.merge(*optional):
+            if uid != previous and all(uid in members for members in required):
+                yield uid
+            previous = uid
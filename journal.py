@@ -0,0 +1,334 @@
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+"""
+Preamble:
+    Append-only write-ahead journal of every mutation made to the SocialNetwork and HobbyNetwork.
+
+    The journal subscribes to both networks and receives (event, args) pairs, where event is the name of
+    the mutating method and args the arguments that replay it. Each event is encoded as a compact binary record:
+
+        length (u32) | crc32 of payload (u32) | payload = op code (u8) + fields
+
+    Strings are length-prefixed UTF-8, post IDs are i64, weights are f64 and timestamps are f64 seconds since the epoch.
+    A torn or corrupt record at the tail (e.g. after a crash mid-write) fails its CRC and marks the end of the journal.
+
+    Records are buffered and written as a group (one write call per group). The fsync policy decides when the
+    written groups are forced to disk:
+        "always"    fsync after every group commit
+        "interval"  fsync at most once every fsync_interval seconds, and no later than fsync_interval seconds
+                    after a group is written
+        "never"     leave flushing to the operating system
+    A background timer commits a group that waits group_interval seconds and runs the pending interval fsync,
+    so both deadlines hold even when no further record arrives.
+
+    The file starts with a header holding the format version and a random journal ID. A journal written in
+    another format version is rejected when it is opened or replayed instead of being decoded with the wrong
+    layout. A snapshot records (journal ID, offset) when it is taken, so on startup only the records written
+    after the snapshot are replayed, and after the journal is rotated (new ID) following a snapshot, it is
+    replayed from the start.
+"""
+
+MAGIC = b"LINKUSJ1"
+VERSION = 1  # Format version, a journal written in another one is rejected
+FILE_HEADER = struct.Struct('<8sIq')  # magic, format version, journal ID
+RECORD_HEADER = struct.Struct('<II')  # payload length, crc32 of payload
+
+# Event name -> field types: s = string, S = optional string, L = list of strings, i = int, f = float, t = timestamp
+# New events are appended so existing op codes stay stable
+EVENT_FIELDS = {
+    "add_person": "ssLS",
+    "make_connections": "sst",
+    "send_friend_request": "sst",
+    "accept_friend_request": "sst",
+    "send_message": "ssst",
+    "create_post": "sst",
+    "like_post": "ist",
+    "unlike_post": "is",
+    "comment_on_post": "isst",
+    "add_user_hobby": "sst",
+    "record_interaction": "ssft",
+}
+EVENT_CODES = {event: code for code, event in enumerate(EVENT_FIELDS)}
+EVENT_NAMES = list(EVENT_FIELDS)
+HOBBY_EVENTS = {"add_user_hobby"}  # Replayed on the HobbyNetwork, everything else on the SocialNetwork
+
+U32 = struct.Struct('<I')
+I32 = struct.Struct('<i')
+I64 = struct.Struct('<q')
+F64 = struct.Struct('<d')
+
+def _encode_string(out: bytearray, text: str) -> None:
+    data = text.encode('utf-8')
+    out += U32.pack(len(data))
+    out += data
+
+def encode_event(event: str, args: tuple) -> bytes:
+    """
+    Encode an event as a journal record (header + payload)
+    Time Complexity: O(L) where L is the total length of the arguments
+    """
+    payload = bytearray((EVENT_CODES[event],))
+    for field, value in zip(EVENT_FIELDS[event], args):
+        if field == 's':
+            _encode_string(payload, value)
+        elif field == 'S':
+            if value is None:
+                payload += I32.pack(-1)
+            else:
+                data = value.encode('utf-8')
+                payload += I32.pack(len(data))
+                payload += data
+        elif field == 'L':
+            payload += U32.pack(len(value))
+            for item in value:
+                _encode_string(payload, item)
+        elif field == 'i':
+            payload += I64.pack(value)
+        elif field == 'f':
+            payload += F64.pack(value)
+        elif field == 't':
+            payload += F64.pack(value.timestamp())
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def decode_payload(payload: bytes) -> Tuple[str, tuple]:
+    """Decode a record payload back into (event, args). Time Complexity: O(L)"""
+    event = EVENT_NAMES[payload[0]]
+    pos = 1
+    args = []
+    for field in EVENT_FIELDS[event]:
+        if field in 'sL':
+            count = 1
+            if field == 'L':
+                (count,) = U32.unpack_from(payload, pos)
+                pos += U32.size
+            items = []
+            for _ in range(count):
+                (length,) = U32.unpack_from(payload, pos)
+                pos += U32.size
+                items.append(payload[pos:pos + length].decode('utf-8'))
+                pos += length
+            args.append(items if field == 'L' else items[0])
+        elif field == 'S':
+            (length,) = I32.unpack_from(payload, pos)
+            pos += I32.size
+            if length < 0:
+                args.append(None)
+            else:
+                args.append(payload[pos:pos + length].decode('utf-8'))
+                pos += length
+        elif field == 'i':
+            (value,) = I64.unpack_from(payload, pos)
+            pos += I64.size
+            args.append(value)
+        elif field in 'ft':
+            (value,) = F64.unpack_from(payload, pos)
+            pos += F64.size
+            args.append(datetime.fromtimestamp(value) if field == 't' else value)
+    return event, tuple(args)
+
+def read_header(path: str) -> Optional[int]:
+    """
+    Journal ID stored in the file header, or None if the file is missing or not a journal.
+    Raises ValueError for a journal written in another format version.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as journal_file:
+        header = journal_file.read(FILE_HEADER.size)
+    if len(header) < FILE_HEADER.size:
+        return None
+    magic, version, journal_id = FILE_HEADER.unpack(header)
+    if magic != MAGIC:
+        return None
+    if version != VERSION:
+        raise ValueError(f"Unsupported journal version {version} (expected {VERSION})")
+    return journal_id
+
+def read_events(path: str, start: int = None) -> Iterator[Tuple[int, str, tuple]]:
+    """
+    Iterate over (end offset, event, args) for every intact record, starting at byte offset start
+    (default: right after the header). Stops at the end of the file or at the first torn/corrupt record.
+    Time Complexity: O(B) where B is the number of bytes read
+    """
+    with open(path, 'rb') as journal_file:
+        data = journal_file.read()
+    pos = FILE_HEADER.size if start is None else start
+    while pos + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, pos)
+        payload_start = pos + RECORD_HEADER.size
+        payload = data[payload_start:payload_start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        pos = payload_start + length
+        event, args = decode_payload(payload)
+        yield pos, event, args
+
+def replay(path: str, network, hobby_network, trie=None, after: Tuple[int, int] = None) -> int:
+    """
+    Re-apply the journal at path on top of the given state and return the number of events replayed.
+    after is the (journal ID, offset) recorded by a snapshot: if it matches this journal, only the records
+    written after that offset are replayed. The journal must not be subscribed to the networks while replaying.
+    Time Complexity: O(B + R) where B is the journal size and R the cost of re-applying the events
+    """
+    journal_id = read_header(path)
+    if journal_id is None:
+        return 0
+    start = after[1] if after is not None and after[0] == journal_id else None
+    count = 0
+    for _, event, args in read_events(path, start):
+        if event in HOBBY_EVENTS:
+            getattr(hobby_network, event)(*args)
+        else:
+            getattr(network, event)(*args)
+            if event == "add_person" and trie is not None:
+                trie.insert(args[1])
+        count += 1
+    return count
+
+class EventJournal:
+    """
+    Group-committing writer for the event journal. Subscribe an instance to the networks:
+
+        journal = EventJournal("linkus.journal")
+        network.subscribe(journal)
+        hobby_network.subscribe(journal)
+
+    A group is committed when group_size records are pending, when group_bytes are buffered, or when the oldest
+    pending record has waited group_interval seconds (by a daemon timer if no other record arrives). Call
+    commit() to force one. The writer is safe to call from the timer thread and the caller's thread.
+    """
+    FSYNC_POLICIES = ("always", "interval", "never")
+
+    def __init__(self, path: str, fsync_policy: str = "interval", group_size: int = 128, group_bytes: int = 1 << 16,
+                 group_interval: float = 0.05, fsync_interval: float = 1.0):
+        if fsync_policy not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {', '.join(self.FSYNC_POLICIES)}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.group_size = group_size
+        self.group_bytes = group_bytes
+        self.group_interval = group_interval
+        self.fsync_interval = fsync_interval
+        self._buffer = bytearray()
+        self._pending = 0
+        self._first_pending = 0.0
+        self._last_fsync = time.monotonic()
+        self._unsynced = False  # Groups written since the last fsync
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._deadline = 0.0  # When the timer fires
+        self._open()
+
+    def _open(self) -> None:
+        """Open the journal for appending, dropping a torn tail left by a crash"""
+        self.journal_id = read_header(self.path)
+        if self.journal_id is None:
+            self._create()
+            return
+        end = FILE_HEADER.size
+        for end, _, _ in read_events(self.path):
+            pass
+        self._file = open(self.path, 'r+b')
+        self._file.truncate(end)
+        self._file.seek(end)
+        self.position = end
+
+    def _create(self) -> None:
+        self.journal_id = random.getrandbits(63)
+        self._file = open(self.path, 'w+b')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, self.journal_id))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.position = FILE_HEADER.size
+
+    def __call__(self, event: str, args: tuple) -> None:
+        """Listener entry point used by SocialNetwork/HobbyNetwork.subscribe"""
+        self.record(event, args)
+
+    def record(self, event: str, args: tuple) -> None:
+        """
+        Buffer an event and commit the group if it is full or old enough
+        Time Complexity: O(L) amortized, plus one write per group
+        """
+        payload = encode_event(event, args)
+        with self._lock:
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._buffer += payload
+            self._pending += 1
+            if (self._pending >= self.group_size or len(self._buffer) >= self.group_bytes
+                    or time.monotonic() - self._first_pending >= self.group_interval):
+                self._commit()
+            elif self._pending == 1:
+                self._schedule(self.group_interval)
+
+    def commit(self, sync: bool = False) -> None:
+        """
+        Write all buffered records in a single write and fsync according to the policy (or always if sync is True)
+        """
+        with self._lock:
+            self._commit(sync)
+
+    def _commit(self, sync: bool = False) -> None:
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self.position += len(self._buffer)
+            self._buffer = bytearray()
+            self._pending = 0
+            self._unsynced = True
+        if not self._unsynced:
+            return
+        now = time.monotonic()
+        if sync or self.fsync_policy == "always" or (
+                self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self._unsynced = False
+        elif self.fsync_policy == "interval":  # Sync these groups once the interval is up, even if the journal goes idle
+            self._schedule(self._last_fsync + self.fsync_interval - now)
+
+    def _schedule(self, delay: float) -> None:
+        """Make the timer fire within delay seconds, keeping an earlier pending one"""
+        deadline = time.monotonic() + delay
+        if self._timer is not None:
+            if self._deadline <= deadline:
+                return
+            self._timer.cancel()
+        self._deadline = deadline
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True  # Never keeps the program alive, close() syncs whatever is left
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            if threading.current_thread() is not self._timer or self._file.closed:
+                return  # Replaced by an earlier timer, or the journal was closed meanwhile
+            self._timer = None
+            self._commit()  # Reschedules itself if the interval fsync is still due
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def rotate(self) -> None:
+        """Start an empty journal with a new ID (called once a snapshot holds everything recorded so far)"""
+        with self._lock:
+            self._commit(sync=True)
+            self._cancel_timer()
+            self._file.close()
+            self._create()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit(sync=True)
+            self._cancel_timer()
+            self._file.close()
@@ -0,0 +1,196 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterator
+
+SMALL_LIMIT = 4096  # Largest set kept as a single sorted array
+CHUNK_ARRAY_LIMIT = 4096  # Largest chunk kept as a sorted array before switching to a bitmap
+CHUNK_BITS = 16  # Low bits stored inside a chunk, high bits select the chunk
+
+class BitmapChunk:
+    """Fixed-size bitmap holding the low 16 bits of up to 65536 IDs"""
+    __slots__ = ("bits", "count")
+
+    def __init__(self, lows=()):
+        self.bits = bytearray(1 << (CHUNK_BITS - 3))
+        self.count = 0
+        for low in lows:
+            self.add(low)
+
+    def __contains__(self, low: int) -> bool:
+        return bool(self.bits[low >> 3] & (1 << (low & 7)))
+
+    def add(self, low: int) -> bool:
+        """Set a bit, returns True if it was not set before"""
+        byte, mask = low >> 3, 1 << (low & 7)
+        if self.bits[byte] & mask:
+            return False
+        self.bits[byte] |= mask
+        self.count += 1
+        return True
+
+    def discard(self, low: int) -> bool:
+        """Clear a bit, returns True if it was set before"""
+        byte, mask = low >> 3, 1 << (low & 7)
+        if not self.bits[byte] & mask:
+            return False
+        self.bits[byte] &= ~mask
+        self.count -= 1
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_idx, byte in enumerate(self.bits):
+            while byte:
+                lowest = byte & -byte
+                yield (byte_idx << 3) | (lowest.bit_length() - 1)
+                byte ^= lowest
+
+class LikeSet:
+    """
+    Compact adaptive set of integer user IDs, used to store the likes of a post.
+
+    Small sets are a single sorted array of 32-bit IDs. Once a set grows past SMALL_LIMIT it is converted
+    into a roaring-style chunked bitmap: IDs are grouped by their high 16 bits, and every chunk stores the
+    low 16 bits either as a sorted array of 16-bit ints (sparse chunks) or as an 8 KB bitmap (dense chunks).
+    The size is tracked on every change, so len() is O(1).
+    """
+    __slots__ = ("_small", "_chunks", "_size")
+
+    def __init__(self, user_ids=()):
+        self._small = array('I')  # Sorted IDs while the set is small
+        self._chunks = None  # high bits -> array('H') or BitmapChunk once the set is large
+        self._size = 0
+        for user_id in user_ids:
+            self.add(user_id)
+
+    @classmethod
+    def from_sorted(cls, user_ids) -> "LikeSet":
+        """
+        Build a set from IDs that are already sorted and unique (e.g. loaded from a snapshot)
+        Time Complexity: O(n) - no searching or shifting
+        """
+        like_set = cls()
+        like_set._small = array('I', user_ids)
+        like_set._size = len(like_set._small)
+        if like_set._size > SMALL_LIMIT:
+            like_set._to_chunks()
+        return like_set
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, user_id: int) -> bool:
+        """
+        Check if a user ID is in the set
+        Time Complexity: O(log n) for arrays, O(1) for bitmap chunks
+        """
+        if self._chunks is None:
+            idx = bisect_left(self._small, user_id)
+            return idx < len(self._small) and self._small[idx] == user_id
+        chunk = self._chunks.get(user_id >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = user_id & 0xFFFF
+        if isinstance(chunk, BitmapChunk):
+            return low in chunk
+        idx = bisect_left(chunk, low)
+        return idx < len(chunk) and chunk[idx] == low
+
+    def add(self, user_id: int) -> bool:
+        """
+        Add a user ID, returns True if it was not already present
+        Time Complexity: O(log n) search in arrays (plus a C-level shift), O(1) for bitmap chunks
+        """
+        if self._chunks is None:
+            idx = bisect_left(self._small, user_id)
+            if idx < len(self._small) and self._small[idx] == user_id:
+                return False
+            self._small.insert(idx, user_id)
+            self._size += 1
+            if self._size > SMALL_LIMIT:
+                self._to_chunks()
+            return True
+
+        high, low = user_id >> CHUNK_BITS, user_id & 0xFFFF
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            self._chunks[high] = array('H', [low])
+            self._size += 1
+            return True
+        if isinstance(chunk, BitmapChunk):
+            added = chunk.add(low)
+        else:
+            idx = bisect_left(chunk, low)
+            added = not (idx < len(chunk) and chunk[idx] == low)
+            if added:
+                chunk.insert(idx, low)
+                if len(chunk) > CHUNK_ARRAY_LIMIT:
+                    self._chunks[high] = BitmapChunk(chunk)
+        if added:
+            self._size += 1
+        return added
+
+    def discard(self, user_id: int) -> bool:
+        """
+        Remove a user ID if present, returns True if it was removed
+        Time Complexity: O(log n) search in arrays (plus a C-level shift), O(1) for bitmap chunks
+        """
+        if self._chunks is None:
+            idx = bisect_left(self._small, user_id)
+            if idx < len(self._small) and self._small[idx] == user_id:
+                del self._small[idx]
+                self._size -= 1
+                return True
+            return False
+
+        high, low = user_id >> CHUNK_BITS, user_id & 0xFFFF
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            return False
+        if isinstance(chunk, BitmapChunk):
+            removed = chunk.discard(low)
+            if removed and chunk.count <= CHUNK_ARRAY_LIMIT // 2:
+                self._chunks[high] = array('H', chunk)
+        else:
+            idx = bisect_left(chunk, low)
+            removed = idx < len(chunk) and chunk[idx] == low
+            if removed:
+                del chunk[idx]
+                if not chunk:
+                    del self._chunks[high]
+        if removed:
+            self._size -= 1
+            if self._size <= SMALL_LIMIT // 2:
+                self._to_small()
+        return removed
+
+    def _to_chunks(self) -> None:
+        """Convert the sorted array into chunks"""
+        self._chunks = {}
+        for user_id in self._small:
+            high = user_id >> CHUNK_BITS
+            chunk = self._chunks.get(high)
+            if chunk is None:
+                chunk = self._chunks[high] = array('H')
+            chunk.append(user_id & 0xFFFF)  # Input is sorted, so each chunk stays sorted
+        for high, chunk in self._chunks.items():
+            if len(chunk) > CHUNK_ARRAY_LIMIT:
+                self._chunks[high] = BitmapChunk(chunk)
+        self._small = array('I')
+
+    def _to_small(self) -> None:
+        """Convert the chunks back into a single sorted array"""
+        self._small = array('I', iter(self))
+        self._chunks = None
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate over the user IDs in ascending order"""
+        if self._chunks is None:
+            return iter(self._small)
+        return (
+            (high << CHUNK_BITS) | low
+            for high in sorted(self._chunks)
+            for low in self._chunks[high]
+        )
+
+    def __repr__(self) -> str:
+        return f"LikeSet({len(self)} ids)"
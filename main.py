@@ -1,16 +1,58 @@
+import os
 import re
+from itertools import islice
 
 # Required Classes are imported from other files
 from social_network import SocialNetwork
 from hobby_network import HobbyNetwork
 from friend_recommendation import FriendRecommender
+from recommendation_cache import RecommendationCache
 from auto_complete import Trie
+from snapshot import load_snapshot, save_snapshot, snapshot_journal_position
+from journal import EventJournal, replay
+
+SNAPSHOT_PATH = "linkus.snapshot" # Saved system state, loaded on startup and written on exit
+JOURNAL_PATH = "linkus.journal" # Every change made since the last snapshot, replayed on startup
+FOF_TOP_M = 64 # Friends-of-friends counts kept per user for recommendations (see fof_index.py)
 
 # Imported Classes are initialised
-network = SocialNetwork()
+network = SocialNetwork(fof_top_m=FOF_TOP_M)
 hobby_network = HobbyNetwork()
 recommender = FriendRecommender(network, hobby_network)
+recommendation_cache = RecommendationCache(recommender)
 trie = Trie()
+journal = None
+
+def load_state():
+    """
+    Function to restore the saved system state from the snapshot file and the journal of changes made after it
+    """
+    global network, hobby_network, recommender, recommendation_cache, trie, journal
+    journal_position = None
+    if os.path.exists(SNAPSHOT_PATH):
+        network, hobby_network, trie = load_snapshot(SNAPSHOT_PATH, fof_top_m=FOF_TOP_M)
+        journal_position = snapshot_journal_position(SNAPSHOT_PATH)
+    replayed = replay(JOURNAL_PATH, network, hobby_network, trie, journal_position) if os.path.exists(JOURNAL_PATH) else 0
+    recommender = FriendRecommender(network, hobby_network)
+    # Recommendations are reused until a change that affects them (see recommendation_cache.py)
+    recommendation_cache = RecommendationCache(recommender)
+    network.subscribe(recommendation_cache)
+    hobby_network.subscribe(recommendation_cache)
+    if network.vertices:
+        print(f"Loaded {len(network.vertices)} users and {len(network.posts)} posts ({replayed} journaled changes replayed).")
+
+    # Every change is written to the journal as it happens (fsynced at most once a second), so a crash loses at most that
+    journal = EventJournal(JOURNAL_PATH, group_size=1)
+    network.subscribe(journal)
+    hobby_network.subscribe(journal)
+
+def save_state():
+    """
+    Function to write the whole system state to the snapshot file and start a fresh journal
+    """
+    save_snapshot(SNAPSHOT_PATH, network, hobby_network, trie, journal)
+    journal.rotate()
+    journal.close()
 
 def validate_username(username):
     """
@@ -66,16 +108,24 @@ def get_username(input_msg, current_username=None):
         if confirmed_username: # If desired username is got, return it, else repeat
             return confirmed_username
         
+COMMENTS_SHOWN = 5 # Number of latest comments shown under a post
+REQUESTS_PER_PAGE = 10 # Number of friend requests shown per inbox page
+MESSAGES_PER_PAGE = 20 # Number of messages shown per page
+USERS_PER_PAGE = 50 # Number of users shown per page when viewing users by hobbies
+
 def display_post(post):
     """
     Function to display details of a post. (Designed to remove repeated code)
     """
     print("-----------------------------------------------------------------------------------")
     print(post)
-    print("Liked by:", ", ".join(post.likes) if post.likes else "No likes yet") # Print Like Details
-    if post.comments: # If post.comments exist, print the comment details
+    print("Liked by:", ", ".join(post.liked_by()) if post.likes else "No likes yet") # Print Like Details
+    if post.comment_count: # If comments exist, print the latest ones
         print("\nComments:")
-        for commenter, comment, timestamp in post.comments:
+        older = post.comment_count - COMMENTS_SHOWN
+        if older > 0:
+            print(f"  ... {older} older {'comment' if older == 1 else 'comments'}")
+        for commenter, comment, timestamp in post.latest_comments(COMMENTS_SHOWN):
             print(f"  {commenter} ({timestamp.strftime('%Y-%m-%d %H:%M')}): {comment}")
 
 def handle_post_menu(network, username):
@@ -86,7 +136,9 @@ def handle_post_menu(network, username):
         print("3. View Friend Posts")
         print("4. Like/Unlike Post")
         print("5. Comment on Post")
-        print("6. Back to Main Menu")
+        print("6. Search Posts")
+        print("7. Trending Topics")
+        print("8. Back to Main Menu")
         
         choice = input("Choose an option: ")
         
@@ -119,8 +171,8 @@ def handle_post_menu(network, username):
             post_id = input("Enter Post ID: ")
             post = network.get_post(post_id)
             if post:
-                if (network.vertices[post.author] in network.vertices[username].adjacency_map) or (post.author == username):
-                    if username in post.likes:
+                if network.are_friends(username, post.author) or (post.author == username):
+                    if network.has_liked(post_id, username):
                         if network.unlike_post(post_id, username):
                             print("Post Unliked!")
                     else:
@@ -136,7 +188,7 @@ def handle_post_menu(network, username):
             post_id = input("Enter Post ID: ")
             post = network.get_post(post_id)
             if post:
-                if (network.vertices[post.author] in network.vertices[username].adjacency_map) or (post.author == username):
+                if network.are_friends(username, post.author) or (post.author == username):
                     display_post(post)
                     comment = input("Enter your comment: ")
                     if network.comment_on_post(post_id, username, comment):
@@ -150,12 +202,33 @@ def handle_post_menu(network, username):
                 print("Post not Found!")
                 
         elif choice == "6":
+            query = input("Enter search terms: ")
+            results = network.search_posts(query, limit=10, visible_to=username) # Only your own and friends' posts are searched
+            if results:
+                print("\nSearch Results:")
+                for pid, post in results:
+                    print(f"\nPost ID: {pid}")
+                    display_post(post)
+            else:
+                print("No matching posts found!")
+                
+        elif choice == "7":
+            for kind, title in (("hashtag", "Hashtags"), ("mention", "Mentions")):
+                trending = network.get_trending_topics(kind, window=86400, limit=5) # Last 24 hours
+                print(f"\nTrending {title} (Last 24 Hours):")
+                if not trending:
+                    print("  Nothing trending yet!")
+                for tag, count in trending:
+                    print(f"  {'#' if kind == 'hashtag' else '@'}{tag}: {count} {'post' if count == 1 else 'posts'}")
+                
+        elif choice == "8":
             break
         
         else:
             print("Invalid option!")
 
 def main():
+    load_state()
     while True:
         print("\n======== LinkUs ========")
         print("1. Create Account")
@@ -200,7 +273,7 @@ def main():
                 if choice == "1":
                     print("\n==== Friend Recommendations ====")
                     # Retrieve friend recommendations based on username
-                    recommendations = recommender.get_recommendations(username)
+                    recommendations = recommendation_cache.get(username)
                     
                     # If no recommendations are available, provide guidance to the user
                     if not recommendations:
@@ -210,12 +283,13 @@ def main():
                         
                     # If recommendations are found display each recommendation with details
                     print("\nHere are some people you might know:")
+                    # Common friends of every recommendation in one pass
+                    common_friend_counts = network.common_friends_many(username, [user for user, _ in recommendations])
                     for i, (recommended_user, score) in enumerate(recommendations, 1):
                         #Get the person's details from network
                         person = network.vertices[recommended_user]
                         
-                        # Calculate common friends for display
-                        common_friends = network.common_friends(username, recommended_user)
+                        common_friends = common_friend_counts[recommended_user]
                         match_percentage = int(score * 100)
                         
                         # Display recommendation details
@@ -260,16 +334,19 @@ def main():
                             print(f"Description: {person.description}")
                         
                         # Show connection status
-                        is_friend = person in network.vertices[username].adjacency_map
-                        has_pending_request = search_username in network.vertices[username].inbox
-                        received_request = username in person.inbox
+                        is_friend = network.are_friends(username, search_username)
+                        has_pending_request = network.has_friend_request(username, search_username)
+                        received_request = network.has_friend_request(search_username, username)
                         
                         if is_friend:
                             print("\nStatus: Friend ✓")
-                            common_friends_count = network.common_friends(username, search_username)
+                            common_friends_count = network.common_friends_many(username, [search_username])[search_username]
                             print(f"Common Friends: {common_friends_count}")
                         else:
                             print("\nStatus: Not Connected")
+                            connection = network.shortest_path(username, search_username, max_depth=4)
+                            if connection:
+                                print(f"How you're connected: {' → '.join(connection)}")
                             
                         while True:
                             if is_friend:
@@ -298,12 +375,7 @@ def main():
                                         print("\nUser Posts:")
                                         for pid, post in posts:
                                             print(f"\nPost ID: {pid}")
-                                            print(post)
-                                            print("Liked by:", ", ".join(post.likes) if post.likes else "No likes yet")
-                                            if post.comments:
-                                                print("\nComments:")
-                                                for commenter, comment, timestamp in post.comments:
-                                                    print(f"  {commenter} ({timestamp.strftime('%Y-%m-%d %H:%M')}): {comment}")
+                                            display_post(post)
                                     else:
                                         print("No posts to show!")
                                 elif sub_choice == "2":
@@ -348,8 +420,9 @@ def main():
                         print("2. Show most popular hobbies")
                         print("3. Find users with most hobbies")
                         print("4. View hobby trends")
-                        print("5. View users for any hobby")
-                        print("6. Back to Main Menu")
+                        print("5. View users by hobbies")
+                        print("6. View related hobbies")
+                        print("7. Back to Main Menu")
 
                         hobby_choice = input("Choose an option: ")
 
@@ -376,26 +449,52 @@ def main():
 
                         elif hobby_choice == "4":
                             # Option 4: Show recent trends in hobbies over the last 30 days
-                            trends = hobby_network.get_hobby_trends(days=30)  # Fetches trend data for each hobby for the past 30 days
+                            trending = hobby_network.get_trending_hobbies(window=86400, limit=5)  # Hobbies gaining users faster than usual today
+                            print("\nRising Hobbies (Last 24 Hours):")
+                            if not trending:
+                                print("Nothing rising right now!")
+                            for hobby, extra_joins in trending:
+                                print(f"{hobby}: {extra_joins:.1f} more joins than usual")
+
+                            trends = hobby_network.get_hobby_trends(days=30)  # Fetches daily user counts for each hobby for the past 30 days
                             print("\nHobby Trends (Last 30 Days):")
                             for hobby, trend_data in trends.items():  # Iterates over each hobby and its trend data
                                 if trend_data:  # Checks if there's any trend data available
-                                    latest = trend_data[-1]  # Gets the most recent trend entry (timestamp and user count)
-                                    print(f"{hobby}: {latest[1]} users (as of {latest[0].strftime('%Y-%m-%d %H:%M')})")  # Displays latest user count with date and time
+                                    first, latest = trend_data[0], trend_data[-1]  # Oldest and current day (start of day, user count)
+                                    print(f"{hobby}: {latest[1]} users ({latest[1] - first[1]:+d} since {first[0].strftime('%Y-%m-%d')})")  # Displays current user count and the change over the period
 
                         elif hobby_choice == "5":
-                            # Option 5: View users interested in a specific hobby
-                            hobby = input("Enter hobby name: ")  # Prompts for hobby name input
-                            users = hobby_network.get_users_by_hobby(hobby)  # Retrieves set of users who like this hobby
-                            if users:  # Checks if there are any users for the entered hobby
-                                print(f"\nUsers interested in {hobby}:")
-                                for user in users:  # Loops through each user interested in the hobby
-                                    print(user)  # Prints each user's name
+                            # Option 5: View users interested in one or more hobbies (all of them)
+                            hobby = input("Enter hobby name(s), separated by commas: ")
+                            hobbies = [name.strip() for name in hobby.split(",") if name.strip()]
+                            users = hobby_network.get_users_by_hobbies(all_of=hobbies) if hobbies else iter(())  # Lazy, read a page at a time
+                            page = list(islice(users, USERS_PER_PAGE))
+                            if page:  # Checks if there are any users for the entered hobbies
+                                print(f"\nUsers interested in {', '.join(hobbies)}:")
+                                shown = 0
+                                while page:
+                                    for user in page:  # Loops through each user interested in the hobbies
+                                        print(user)  # Prints each user's name
+                                    shown += len(page)
+                                    page = list(islice(users, USERS_PER_PAGE))
+                                    if page and input(f"Shown {shown} users. Show more? (yes/no): ").lower() not in {"y", "yes"}:
+                                        break
                             else:
-                                print("No users found for this hobby.")  # Informs if no users are interested in the given hobby
+                                print("No users found for this hobby.")  # Informs if no users are interested in the given hobbies
 
                         elif hobby_choice == "6":
-                            # Option 6: Return to the main menu
+                            # Option 6: Hobbies most often held together with a given hobby
+                            hobby = input("Enter hobby name: ")
+                            related = hobby_network.get_related_hobbies(hobby, limit=10, metric="jaccard")
+                            if related:
+                                print(f"\nHobbies related to {hobby}:")
+                                for other, similarity in related:  # Share of the users of either hobby who have both
+                                    print(f"{other}: {similarity:.0%} overlap")
+                            else:
+                                print("No related hobbies found.")
+
+                        elif hobby_choice == "7":
+                            # Option 7: Return to the main menu
                             break  # Exits the Hobby Management Menu loop, returning to main menu
 
                         else:
@@ -404,20 +503,28 @@ def main():
 
                     
                 elif choice == "4":
-                    friend_requests = network.get_friend_requests(username)
-                    if friend_requests:
+                    cursor = 0
+                    while True:
+                        friend_requests = network.get_friend_requests(username, limit=REQUESTS_PER_PAGE, cursor=cursor) # One page at a time
+                        if not friend_requests:
+                            print("No pending Friend Requests.")
+                            break
                         print("Pending friend requests:")
                         for i, requester in enumerate(friend_requests, start=1):
                             print(f"{i}. {requester}")
-                        selected = input("Enter number to accept request (or 0 to skip): ")
+                        has_more = bool(network.get_friend_requests(username, limit=1, cursor=cursor + REQUESTS_PER_PAGE))
+                        prompt = "Enter number to accept request, n for the next page (or 0 to skip): " if has_more else "Enter number to accept request (or 0 to skip): "
+                        selected = input(prompt)
+                        if has_more and selected.lower() == "n":
+                            cursor += REQUESTS_PER_PAGE
+                            continue
                         if selected.isdigit() and 1 <= int(selected) <= len(friend_requests):
                             requester = friend_requests[int(selected) - 1]
                             if network.accept_friend_request(username, requester):
                                 print(f"Yay! You are now friends with {requester}!")
                             else:
                                 print("Failed to Accept Friend Request.")
-                    else:
-                        print("No pending Friend Requests.")
+                        break
                 
                 elif choice == "5":
                     to_user = get_username("Enter the Username of the recipient: ", username)
@@ -428,13 +535,18 @@ def main():
                         print("Failed to send message. Check if the user is your friend.")
                 
                 elif choice == "6":
-                    messages = network.get_messages(username)
-                    if messages:
-                        print("\nYour Messages:")
-                        for msg in messages:
-                            print(msg)
-                    else:
-                        print("\nNo messages found.")
+                    skip = 0
+                    while True:
+                        messages = network.get_messages(username, limit=MESSAGES_PER_PAGE, cursor=skip) # Latest received first page
+                        if not messages:
+                            print("\nNo messages found." if skip == 0 else "\nNo older messages.")
+                            break
+                        print("\nYour Messages:" if skip == 0 else "\nOlder Messages:")
+                        for sender, body, timestamp in messages:
+                            print(f"From {sender} ({timestamp.strftime('%Y-%m-%d %H:%M')}): {body}")
+                        if len(messages) < MESSAGES_PER_PAGE or input("Show older messages? (yes/no): ").lower() not in {"y", "yes"}:
+                            break
+                        skip += MESSAGES_PER_PAGE
 
                 elif choice=="7":
                     handle_post_menu(network, username)
@@ -447,6 +559,7 @@ def main():
                     print("Invalid option. Please try again!")
         
         elif option == "3":
+            save_state()
             print("\nThanks for using LinkUs....")
             break
         
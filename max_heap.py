@@ -1,3 +1,5 @@
+import heapq
+
 class MaxHeap:
     """
     MaxHeap implementation for getting top K hobbies efficiently
@@ -75,3 +77,112 @@ class MaxHeap:
     def is_empty(self) -> bool:
         """Check if heap is empty"""
         return len(self.heap) == 0
+
+class IndexedMaxHeap:
+    """
+    MaxHeap of keys with priorities that can be changed or removed in place
+    A position index maps every key to its slot, so a key is never stored twice
+    """
+    def __init__(self):
+        self.heap = []  # (priority, key) pairs
+        self.positions = {}  # key -> index in heap
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, key) -> bool:
+        return key in self.positions
+
+    def priority(self, key):
+        """Current priority of a key"""
+        return self.heap[self.positions[key]][0]
+
+    def _swap(self, idx1: int, idx2: int) -> None:
+        """Swap two elements in the heap and their positions"""
+        heap = self.heap
+        heap[idx1], heap[idx2] = heap[idx2], heap[idx1]
+        self.positions[heap[idx1][1]] = idx1
+        self.positions[heap[idx2][1]] = idx2
+
+    def update(self, key, priority) -> None:
+        """
+        Insert a key, or change its priority if it is already in the heap
+        Time Complexity: O(log n)
+        """
+        idx = self.positions.get(key)
+        if idx is None:
+            self.heap.append((priority, key))
+            self.positions[key] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+            return
+        old_priority = self.heap[idx][0]
+        self.heap[idx] = (priority, key)
+        if priority > old_priority:
+            self._sift_up(idx)
+        else:
+            self._sift_down(idx)
+
+    def remove(self, key) -> None:
+        """Remove a key if present. Time Complexity: O(log n)"""
+        idx = self.positions.pop(key, None)
+        if idx is None:
+            return
+        last = self.heap.pop()
+        if idx < len(self.heap):
+            self.heap[idx] = last
+            self.positions[last[1]] = idx
+            self._sift_up(idx)
+            self._sift_down(self.positions[last[1]])
+
+    def peek(self):
+        """(priority, key) with the largest priority, None if empty"""
+        return self.heap[0] if self.heap else None
+
+    def extract_max(self):
+        """Remove and return the (priority, key) with the largest priority"""
+        if not self.heap:
+            return None
+        top = self.heap[0]
+        self.remove(top[1])
+        return top
+
+    def _sift_up(self, idx: int) -> None:
+        """Move a node up to its proper position"""
+        heap = self.heap
+        while idx > 0:
+            parent_idx = (idx - 1) // 2
+            if heap[parent_idx][0] >= heap[idx][0]:
+                break
+            self._swap(idx, parent_idx)
+            idx = parent_idx
+
+    def _sift_down(self, idx: int) -> None:
+        """Move a node down to its proper position"""
+        heap = self.heap
+        size = len(heap)
+        while True:
+            max_idx = idx
+            for child_idx in (2 * idx + 1, 2 * idx + 2):
+                if child_idx < size and heap[child_idx][0] > heap[max_idx][0]:
+                    max_idx = child_idx
+            if max_idx == idx:
+                break
+            self._swap(idx, max_idx)
+            idx = max_idx
+
+    def descending(self):
+        """
+        Yield (priority, key) pairs from the largest priority down, without modifying the heap. Only the part of
+        the tree that is read is visited: a frontier heap holds the children of the nodes yielded so far.
+        Time Complexity: O(k log k) for the first k pairs
+        """
+        heap = self.heap
+        if not heap:
+            return
+        frontier = [(-heap[0][0], 0)]
+        while frontier:
+            _, idx = heapq.heappop(frontier)
+            yield heap[idx]
+            for child_idx in (2 * idx + 1, 2 * idx + 2):
+                if child_idx < len(heap):
+                    heapq.heappush(frontier, (-heap[child_idx][0], child_idx))
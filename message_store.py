@@ -0,0 +1,179 @@
+import heapq
+import struct
+from array import array
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from segment_file import SegmentFile
+
+SPILL_HEADER = struct.Struct('<id')  # Sender user ID and timestamp of a spilled message, followed by the UTF-8 body
+
+class Conversation:
+    """
+    Messages exchanged between two users, addressed by position (0 = first message ever sent).
+
+    The in-memory messages are a ring buffer of structured records (sender ID, timestamp, body) in parallel
+    columns. Once the ring is full, the oldest record is overwritten, and it is either dropped or first
+    appended to the spill segment. Positions [first, start) are on disk and [start, len) in memory.
+    """
+    __slots__ = ("senders", "times", "bodies", "head", "start", "first", "spilled")
+
+    def __init__(self):
+        self.senders = array('i')  # Sender user ID per in-memory message
+        self.times = array('d')  # Timestamp per in-memory message (seconds since epoch)
+        self.bodies: List[str] = []
+        self.head = 0  # Ring index of the oldest in-memory message
+        self.start = 0  # Position of the oldest in-memory message
+        self.first = 0  # Position of the oldest message still retrievable (older ones were dropped)
+        self.spilled = None  # array('q') of segment offsets of the spilled positions [first, start), once any are
+
+    def __len__(self) -> int:
+        """Number of messages ever sent in the conversation"""
+        return self.start + len(self.bodies)
+
+class MessageStore:
+    """
+    Direct messages grouped per conversation (one Conversation per pair of users).
+
+    With a retention limit, each conversation keeps at most that many messages in memory. Older messages are
+    dropped, or written to an append-only disk segment if a spill path is given and read back when paged to.
+    Pages are read by position straight from the ring buffer, so reading a page never copies the history.
+    """
+    def __init__(self, usernames: List[str], retention: int = None, spill_path: str = None):
+        self.usernames = usernames  # Shared user ID -> username table owned by the SocialNetwork
+        self.retention = retention
+        self.segment = SegmentFile(spill_path) if spill_path and retention else None
+        self.conversations: Dict[int, Conversation] = {}  # Packed (smaller uid, larger uid) -> Conversation
+        self.by_user: List[Optional[List[Conversation]]] = []  # Conversations of each user, None until the first
+
+    @staticmethod
+    def _key(uid1: int, uid2: int) -> int:
+        return (min(uid1, uid2) << 32) | max(uid1, uid2)
+
+    def conversation(self, uid1: int, uid2: int) -> Optional[Conversation]:
+        return self.conversations.get(self._key(uid1, uid2))
+
+    def _get_or_create(self, uid1: int, uid2: int) -> Conversation:
+        key = self._key(uid1, uid2)
+        conversation = self.conversations.get(key)
+        if conversation is None:
+            conversation = self.conversations[key] = Conversation()
+            for uid in {uid1, uid2}:
+                while len(self.by_user) <= uid:
+                    self.by_user.append(None)
+                if self.by_user[uid] is None:
+                    self.by_user[uid] = []
+                self.by_user[uid].append(conversation)
+        return conversation
+
+    def append(self, sender_id: int, recipient_id: int, body: str, timestamp: datetime = None) -> int:
+        """
+        Record a message and return its position in the conversation
+        Time Complexity: O(1) amortized - plus one disk write when the oldest message is spilled
+        """
+        conversation = self._get_or_create(sender_id, recipient_id)
+        self._push(conversation, sender_id, (timestamp or datetime.now()).timestamp(), body)
+        return len(conversation) - 1
+
+    def _push(self, conversation: Conversation, sender_id: int, ts: float, body: str) -> None:
+        if self.retention is None or len(conversation.bodies) < self.retention:
+            conversation.senders.append(sender_id)
+            conversation.times.append(ts)
+            conversation.bodies.append(body)
+            return
+
+        # Ring is full: the oldest in-memory message is spilled or dropped, then overwritten
+        idx = conversation.head
+        if self.segment is not None:
+            record = SPILL_HEADER.pack(conversation.senders[idx], conversation.times[idx]) + conversation.bodies[idx].encode('utf-8')
+            if conversation.spilled is None:
+                conversation.spilled = array('q')
+            conversation.spilled.append(self.segment.append(record))
+        else:
+            conversation.first += 1
+        conversation.senders[idx] = sender_id
+        conversation.times[idx] = ts
+        conversation.bodies[idx] = body
+        conversation.head = (idx + 1) % self.retention
+        conversation.start += 1
+
+    def load(self, uid1: int, uid2: int, first: int, senders, times, bodies) -> None:
+        """
+        Restore a conversation whose retrievable messages start at position first (used by snapshot loading)
+        Time Complexity: O(n) for n messages - plus one disk write per spilled message
+        """
+        conversation = self._get_or_create(uid1, uid2)
+        conversation.first = conversation.start = first
+        for sender_id, ts, body in zip(senders, times, bodies):
+            self._push(conversation, sender_id, ts, body)
+
+    def _record(self, conversation: Conversation, pos: int) -> Tuple[int, float, str]:
+        """(sender ID, timestamp, body) of the message at a position"""
+        if pos >= conversation.start:
+            idx = (conversation.head + pos - conversation.start) % len(conversation.bodies)
+            return conversation.senders[idx], conversation.times[idx], conversation.bodies[idx]
+        data = self.segment.read(conversation.spilled[pos - conversation.first])
+        sender_id, ts = SPILL_HEADER.unpack_from(data)
+        return sender_id, ts, data[SPILL_HEADER.size:].decode('utf-8')
+
+    def _message(self, conversation: Conversation, pos: int) -> Tuple[str, str, datetime]:
+        sender_id, ts, body = self._record(conversation, pos)
+        return self.usernames[sender_id], body, datetime.fromtimestamp(ts)
+
+    def records(self, conversation: Conversation) -> Iterator[Tuple[int, float, str]]:
+        """All retrievable messages of a conversation as (sender ID, timestamp, body), oldest first"""
+        return (self._record(conversation, pos) for pos in range(conversation.first, len(conversation)))
+
+    def count(self, uid1: int, uid2: int) -> int:
+        """Number of messages ever sent between two users"""
+        conversation = self.conversation(uid1, uid2)
+        return len(conversation) if conversation is not None else 0
+
+    def page(self, uid1: int, uid2: int, cursor: int = 0, limit: int = 20) -> List[Tuple[str, str, datetime]]:
+        """
+        Get up to limit messages between two users starting at position cursor, oldest first, as
+        (sender username, body, timestamp). Messages that fell out of the retention window are skipped.
+        Time Complexity: O(limit)
+        """
+        conversation = self.conversation(uid1, uid2)
+        if conversation is None or limit <= 0:
+            return []
+        start = max(cursor, conversation.first)
+        end = min(cursor + limit, len(conversation))
+        return [self._message(conversation, pos) for pos in range(start, end)]
+
+    def latest(self, uid1: int, uid2: int, limit: int = 20) -> List[Tuple[str, str, datetime]]:
+        """
+        Get the latest messages between two users, oldest first
+        Time Complexity: O(limit)
+        """
+        return self.page(uid1, uid2, max(self.count(uid1, uid2) - limit, 0), limit)
+
+    def _newest_received(self, uid: int, conversation: Conversation) -> Iterator[Tuple[float, int, Conversation]]:
+        for pos in range(len(conversation) - 1, conversation.first - 1, -1):
+            sender_id, ts, _ = self._record(conversation, pos)
+            if sender_id != uid:
+                yield -ts, pos, conversation
+
+    def received(self, uid: int, limit: int = 20, skip: int = 0) -> List[Tuple[str, str, datetime]]:
+        """
+        Get the latest messages received by a user across all conversations, oldest first, after skipping
+        the skip most recent ones
+        Time Complexity: O(C + (skip + limit + s) log C) for C conversations, where s is the number of
+                         messages sent by the user that are passed over
+        """
+        if uid >= len(self.by_user) or self.by_user[uid] is None or limit <= 0:
+            return []
+        streams = [self._newest_received(uid, conversation) for conversation in self.by_user[uid]]
+        newest = islice(heapq.merge(*streams, key=lambda item: item[0]), skip, skip + limit)
+        return [self._message(conversation, pos) for _, pos, conversation in reversed(list(newest))]
+
+    def clear_spilled(self) -> None:
+        """Discard the spill segment (its records are obsolete once the store is rebuilt from a snapshot)"""
+        if self.segment is not None:
+            self.segment.clear()
+
+    def close(self) -> None:
+        if self.segment is not None:
+            self.segment.close()
@@ -0,0 +1,83 @@
+from array import array
+from typing import Iterator, Tuple
+
+"""
+Preamble:
+    Compact counter table for unordered pairs of dense integer IDs, used for the hobby co-occurrence weights.
+
+    A pair (a, b) is stored once, with the smaller ID in the high 32 bits and the larger in the low 32 bits of a
+    single 64-bit key. Keys and counts live in two flat typed arrays addressed by open addressing with linear
+    probing, so a pair costs 12 bytes per slot instead of two hash map entries (one in each direction) of boxed
+    Python objects. increment() finds the slot and updates it in a single probe sequence, with no separate lookup
+    and store. The table doubles when it becomes half full.
+"""
+
+EMPTY = -1  # Key of an unused slot
+HASH_MULTIPLIER = 0x9E3779B1  # Knuth's multiplicative hashing constant (2^32 / golden ratio)
+
+class PairTable:
+    def __init__(self, capacity: int = 16):
+        size = 16
+        while size < 2 * capacity:  # Room for capacity pairs below the load factor
+            size <<= 1
+        self.keys = array('q', [EMPTY]) * size
+        self.counts = array('i', bytes(4 * size))
+        self.mask = size - 1
+        self.size = 0  # Number of pairs stored
+
+    @staticmethod
+    def pack(a: int, b: int) -> int:
+        """Key of the unordered pair (a, b)"""
+        return (a << 32) | b if a < b else (b << 32) | a
+
+    def _slot(self, key: int) -> int:
+        """Slot holding key, or the empty slot where it would go"""
+        keys, mask = self.keys, self.mask
+        slot = ((key ^ (key >> 29)) * HASH_MULTIPLIER >> 16) & mask
+        while keys[slot] != key and keys[slot] != EMPTY:
+            slot = (slot + 1) & mask
+        return slot
+
+    def increment(self, a: int, b: int, delta: int = 1) -> int:
+        """
+        Add delta to the count of the pair (a, b) and return the new count (equal to delta for a new pair)
+        Time Complexity: O(1) expected, amortized over doublings
+        """
+        key = (a << 32) | b if a < b else (b << 32) | a
+        slot = self._slot(key)
+        if self.keys[slot] == EMPTY:
+            self.keys[slot] = key
+            self.size += 1
+            if 2 * self.size > self.mask + 1:
+                self.counts[slot] = delta
+                self._grow()
+                return delta
+        self.counts[slot] += delta
+        return self.counts[slot]
+
+    def get(self, a: int, b: int) -> int:
+        """Count of the pair (a, b), 0 if it was never incremented. Time Complexity: O(1) expected"""
+        slot = self._slot(self.pack(a, b))
+        return self.counts[slot] if self.keys[slot] != EMPTY else 0
+
+    def _grow(self) -> None:
+        """Double the table and reinsert every pair. Time Complexity: O(n)"""
+        old_keys, old_counts = self.keys, self.counts
+        size = 2 * (self.mask + 1)
+        self.keys = array('q', [EMPTY]) * size
+        self.counts = array('i', bytes(4 * size))
+        self.mask = size - 1
+        for key, count in zip(old_keys, old_counts):
+            if key != EMPTY:
+                slot = self._slot(key)
+                self.keys[slot] = key
+                self.counts[slot] = count
+
+    def items(self) -> Iterator[Tuple[int, int, int]]:
+        """Every stored pair as (smaller ID, larger ID, count). Time Complexity: O(table size)"""
+        for key, count in zip(self.keys, self.counts):
+            if key != EMPTY:
+                yield key >> 32, key & 0xFFFFFFFF, count
+
+    def __len__(self) -> int:
+        return self.size
@@ -1,36 +1,229 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-from typing import List, Set, Tuple
+from typing import Iterator, List, Optional, Tuple
+
+from comment_log import CommentLog
+from like_set import LikeSet
 
 class Post:
-    """Represents a social network post with content, likes, and comments"""
-    current_post_id = 0
-    def __init__(self, content: str, author: str, timestamp: datetime = None):
-        self.pid = Post.current_post_id
-        Post.current_post_id += 1
-        self.content = content
-        self.author = author
-        self.timestamp = timestamp or datetime.now()
-        self.likes: Set[str] = set()  # Set of usernames who liked the post
-        self.comments: List[Tuple[str, str, datetime]] = []  # List of (username, comment, timestamp)
-        
-    def add_like(self, username: str) -> None:
-        """Add a like to the post"""
-        self.likes.add(username)
-        
-    def remove_like(self, username: str) -> None:
+    """
+    Lightweight view of a single post held in a PostStore.
+    The post's data lives in the store's columns, the view only carries the post ID.
+    """
+    __slots__ = ("_store", "pid")
+
+    def __init__(self, store: "PostStore", pid: int):
+        self._store = store
+        self.pid = pid
+
+    @property
+    def content(self) -> str:
+        return self._store.contents[self.pid]
+
+    @property
+    def author(self) -> str:
+        return self._store.usernames[self._store.authors[self.pid]]
+
+    @property
+    def author_id(self) -> int:
+        return self._store.authors[self.pid]
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self._store.timestamps[self.pid])
+
+    @property
+    def likes(self) -> LikeSet:
+        """User IDs of everyone who liked the post"""
+        return self._store.likes[self.pid] or LikeSet()
+
+    def liked_by(self) -> List[str]:
+        """Usernames of everyone who liked the post"""
+        return [self._store.usernames[user_id] for user_id in self.likes]
+
+    @property
+    def comment_count(self) -> int:
+        return self._store.comment_counts[self.pid]
+
+    def latest_comments(self, limit: int = 10) -> List[Tuple[str, str, datetime]]:
+        """Latest (username, comment, timestamp) entries on the post, oldest first"""
+        return self._store.comments.latest(self.pid, limit)
+
+    def comments_page(self, cursor: int = 0, limit: int = 10) -> List[Tuple[str, str, datetime]]:
+        """Page of (username, comment, timestamp) entries starting at position cursor"""
+        return self._store.comments.page(self.pid, cursor, limit)
+
+    def add_like(self, user_id: int) -> bool:
+        """Add a like to the post, returns False if the user already liked it"""
+        return self._store.add_like(self.pid, user_id)
+
+    def remove_like(self, user_id: int) -> None:
         """Remove a like from the post"""
-        self.likes.discard(username)
-        
-    def add_comment(self, username: str, comment: str) -> None:
+        self._store.remove_like(self.pid, user_id)
+
+    def add_comment(self, user_id: int, comment: str, timestamp: datetime = None) -> None:
         """Add a comment to the post"""
-        self.comments.append((username, comment, datetime.now()))
-        
+        self._store.add_comment(self.pid, user_id, comment, timestamp)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Post) and self._store is other._store and self.pid == other.pid
+
+    def __hash__(self) -> int:
+        return hash(self.pid)
+
     def __repr__(self) -> str:
-        likes_count = len(self.likes)
-        comments_count = len(self.comments)
+        likes_count = self._store.like_counts[self.pid]
+        comments_count = self._store.comment_counts[self.pid]
         return f"""
 [Post by {self.author} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}]
 {self.content}
 
 ❤️   {likes_count} {'like' if likes_count == 1 else 'likes'} | 💬 {comments_count} {'comment' if comments_count == 1 else 'comments'}
 """
+
+class PostStore:
+    """
+    Columnar storage for all posts, keyed by dense integer post IDs.
+
+    Post i lives at index i of every column, so lookups are plain list/array indexing with no hashing.
+    The hot fields (author ID, timestamp, like count, comment count) are kept in typed arrays, which
+    expose the buffer protocol and can be scanned in bulk (e.g. wrapped with numpy.frombuffer) without copying.
+    Content and likes are held in separate lists, comments in an append-only CommentLog.
+    """
+    def __init__(self, usernames: List[str], comment_spill_path: str = None, hot_comments_per_post: int = None):
+        self.usernames = usernames  # Shared user ID -> username table owned by the SocialNetwork
+        self.authors = array('i')  # Author user ID per post
+        self.timestamps = array('d')  # Creation time per post (seconds since epoch)
+        self.like_counts = array('i')  # Number of likes per post
+        self.comment_counts = array('i')  # Number of comments per post
+        self.contents: List[str] = []  # Post text, kept out of the hot columns
+        self.likes: List[Optional[LikeSet]] = []  # User IDs who liked each post, None until the first like
+        self.comments = CommentLog(usernames, comment_spill_path, hot_comments_per_post)
+        self.by_author: List[array] = []  # Post IDs per author user ID, sorted by timestamp
+        self.author_times: List[array] = []  # Timestamps matching by_author, the per-author binary search index
+
+    def add(self, author_id: int, content: str, timestamp: datetime = None) -> int:
+        """
+        Store a new post and return its ID
+        Time Complexity: O(1) amortized - appends to every column
+        """
+        pid = len(self.contents)
+        created = (timestamp or datetime.now()).timestamp()
+        self.authors.append(author_id)
+        self.timestamps.append(created)
+        self.like_counts.append(0)
+        self.comment_counts.append(0)
+        self.contents.append(content)
+        self.likes.append(None)
+        while len(self.by_author) <= author_id:
+            self.by_author.append(array('i'))
+            self.author_times.append(array('d'))
+
+        # Posts normally arrive in time order and are appended, older timestamps are inserted in place
+        times = self.author_times[author_id]
+        if not times or times[-1] <= created:
+            times.append(created)
+            self.by_author[author_id].append(pid)
+        else:
+            idx = bisect_right(times, created)
+            times.insert(idx, created)
+            self.by_author[author_id].insert(idx, pid)
+        return pid
+
+    def _index(self, post_id) -> Optional[int]:
+        """Convert a post ID (int or numeric string) into a valid column index, or None"""
+        try:
+            pid = int(post_id)
+        except (TypeError, ValueError):
+            return None
+        return pid if 0 <= pid < len(self.contents) else None
+
+    def get(self, post_id) -> Optional[Post]:
+        """
+        Get a view of the post with the given ID
+        Time Complexity: O(1) - direct index into the columns
+        """
+        pid = self._index(post_id)
+        return Post(self, pid) if pid is not None else None
+
+    def add_like(self, pid: int, user_id: int) -> bool:
+        """
+        Add a like to a post and keep the like count column in sync, returns False if the user already liked it
+        Time Complexity: O(log n) - see LikeSet.add
+        """
+        if self.likes[pid] is None:
+            self.likes[pid] = LikeSet()
+        added = self.likes[pid].add(user_id)
+        self.like_counts[pid] = len(self.likes[pid])
+        return added
+
+    def remove_like(self, pid: int, user_id: int) -> None:
+        """
+        Remove a like from a post and keep the like count column in sync
+        Time Complexity: O(log n) - see LikeSet.discard
+        """
+        likes = self.likes[pid]
+        if likes is not None:
+            likes.discard(user_id)
+            self.like_counts[pid] = len(likes)
+
+    def has_liked(self, pid: int, user_id: int) -> bool:
+        """Check if a user liked a post"""
+        likes = self.likes[pid]
+        return likes is not None and user_id in likes
+
+    def add_comment(self, pid: int, user_id: int, comment: str, timestamp: datetime = None) -> None:
+        """
+        Append a comment to a post and keep the comment count column in sync
+        Time Complexity: O(1) amortized - see CommentLog.append
+        """
+        self.comments.append(pid, user_id, comment, timestamp)
+        self.comment_counts[pid] += 1
+
+    def posts_by(self, author_id: int) -> array:
+        """
+        Get the IDs of all posts by an author, oldest first
+        Time Complexity: O(1) - returns the author's ID array without copying
+        """
+        if author_id < len(self.by_author):
+            return self.by_author[author_id]
+        return array('i')
+
+    def posts_between(self, author_id: int, since: datetime = None, until: datetime = None, limit: int = None) -> array:
+        """
+        Get the IDs of an author's posts with since <= timestamp < until, oldest first.
+        With a limit, only the most recent limit posts in the range are returned.
+        Time Complexity: O(log P + k) where P is the author's post count and k the number of posts returned
+        """
+        if author_id >= len(self.by_author):
+            return array('i')
+        times = self.author_times[author_id]
+        start = bisect_left(times, since.timestamp()) if since is not None else 0
+        end = bisect_left(times, until.timestamp()) if until is not None else len(times)
+        if limit is not None:
+            start = max(start, end - limit)
+        return self.by_author[author_id][start:end]
+
+    def engagement(self, pid: int) -> int:
+        """
+        Weighted engagement of a post (2 per like, 3 per comment)
+        Time Complexity: O(1) - reads two columns
+        """
+        return self.like_counts[pid] * 2 + self.comment_counts[pid] * 3
+
+    def author_engagement(self) -> array:
+        """
+        Total engagement of every author, indexed by user ID
+        Time Complexity: O(N) where N is the number of posts - a single pass over the author and count columns
+        """
+        totals = array('i', bytes(4 * len(self.usernames)))
+        for author_id, likes, comments in zip(self.authors, self.like_counts, self.comment_counts):
+            totals[author_id] += likes * 2 + comments * 3
+        return totals
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __iter__(self) -> Iterator[Post]:
+        return (Post(self, pid) for pid in range(len(self.contents)))
@@ -0,0 +1,72 @@
+import random
+from collections import deque
+from typing import Callable, Dict, Sequence
+
+"""
+Preamble:
+    Personalized PageRank (PPR) from a single user over the friendship graph, for recommendations beyond 2 hops.
+
+    The PPR score of v for source s is the probability that a random walk from s, which at every step stops with
+    probability alpha and otherwise moves to a uniformly random friend, stops at v. Two approximations are given,
+    and the cost of both depends only on their parameters, not on the size of the graph:
+
+        push_ppr         Forward push (Andersen, Chung and Lang): probability mass flows from a residual to the
+                         estimate, and a user pushes its residual to its friends only while the residual is at least
+                         epsilon times its degree. At most 1 / (epsilon * alpha) pushes happen in total.
+        random_walk_ppr  Monte-Carlo walks with restart: the share of walks stopping at each user, from a fixed
+                         number of walks each capped at max_length steps.
+
+    The graph is given as neighbours(uid) -> sorted friend IDs, e.g. the friend arrays of the Vertex objects.
+"""
+
+def push_ppr(neighbours: Callable[[int], Sequence[int]], source: int, alpha: float = 0.15,
+             epsilon: float = 1e-4, max_pushes: int = 1_000_000) -> Dict[int, float]:
+    """
+    Approximate PPR from source as user ID -> score. Every score is below the true value by less than epsilon
+    times the user's degree.
+    Time Complexity: O(1 / (epsilon * alpha)) pushes, each O(d) for the pushing user's d friends
+    """
+    estimates: Dict[int, float] = {}
+    residuals: Dict[int, float] = {source: 1.0}
+    queue = deque([source])
+    queued = {source}
+    pushes = 0
+    while queue and pushes < max_pushes:
+        uid = queue.popleft()
+        queued.discard(uid)
+        residual = residuals.pop(uid, 0.0)
+        friends = neighbours(uid)
+        estimates[uid] = estimates.get(uid, 0.0) + alpha * residual
+        if not friends:  # A walk at a user with no friends can only stop there
+            estimates[uid] += (1 - alpha) * residual
+            continue
+        pushes += 1
+        share = (1 - alpha) * residual / len(friends)
+        for friend_uid in friends:
+            value = residuals.get(friend_uid, 0.0) + share
+            residuals[friend_uid] = value
+            if friend_uid not in queued and value >= epsilon * max(len(neighbours(friend_uid)), 1):
+                queued.add(friend_uid)
+                queue.append(friend_uid)
+    return estimates
+
+def random_walk_ppr(neighbours: Callable[[int], Sequence[int]], source: int, alpha: float = 0.15,
+                    walks: int = 2000, max_length: int = 50, seed: int = None) -> Dict[int, float]:
+    """
+    Monte-Carlo estimate of the PPR from source as user ID -> score (share of walks that stopped at the user).
+    A walk that reaches max_length steps stops where it is.
+    Time Complexity: O(walks / alpha) expected steps, at most O(walks * max_length)
+    """
+    rng = random.Random(seed)
+    stops: Dict[int, int] = {}
+    for _ in range(walks):
+        uid = source
+        for _ in range(max_length):
+            if rng.random() < alpha:
+                break
+            friends = neighbours(uid)
+            if not friends:
+                break
+            uid = friends[rng.randrange(len(friends))]
+        stops[uid] = stops.get(uid, 0) + 1
+    return {uid: count / walks for uid, count in stops.items()}
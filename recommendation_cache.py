@@ -0,0 +1,189 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from csr_graph import intersection_size
+from friend_recommendation import FriendRecommender
+
+"""
+Preamble:
+    Per-user cache of FriendRecommender results, invalidated by the events that change the scores.
+
+    The cache subscribes to the SocialNetwork and the HobbyNetwork like the event journal does, and drops
+    exactly the entries an event can affect:
+
+        make_connections / accept_friend_request
+            Both users and everyone within two hops of either. Their friend sets, friends-of-friends and
+            mutual friend counts are the ones that change.
+        add_person
+            Cached users who share a profile hobby with the new user, the only ones it can score against.
+            Replacing an existing user clears the cache.
+        add_user_hobby
+            The user and the cached users who hold that hobby.
+        like_post / unlike_post / comment_on_post
+            These only move the popularity term of the post author (20% of the heuristic score, normalized by
+            the largest popularity). Instead of dropping everything on every like, the total popularity change
+            since an entry was computed bounds how far any one score, or the difference between two scores
+            (three times as far, since the largest popularity may move too), can have moved. The entry is kept
+            while that cannot reorder the limit + 1 best candidates it was computed from (so the ranking is the
+            one a recomputation would give), or while no score can have moved by more than popularity_tolerance.
+
+    Entries also expire after ttl seconds, which covers the far-away friendship changes that personalized
+    PageRank (see ppr.py) is sensitive to. At most capacity entries are kept, evicting the least recently used.
+"""
+
+LIKE_POPULARITY = 2 * 0.4  # Popularity gained by a post author per like (engagement weight 2, popularity weight 0.4)
+COMMENT_POPULARITY = 3 * 0.4  # Per comment
+FRIEND_POPULARITY = 0.6  # Per friend
+POPULARITY_WEIGHT = 0.2  # Share of the heuristic score given to normalized popularity
+
+class RecommendationCache:
+    def __init__(self, recommender: FriendRecommender, ttl: float = 300.0, capacity: int = 10_000,
+                 popularity_tolerance: float = 0.01):
+        self.recommender = recommender
+        self.network = recommender.social_network
+        self.hobby_network = recommender.hobby_network
+        self.ttl = ttl  # Seconds an entry is served for at most
+        self.capacity = capacity  # Most entries kept
+        self.popularity_tolerance = popularity_tolerance  # Largest score drift tolerated from popularity changes
+        # (username, engine, limit) -> (results, created at, popularity drift at creation, score change per drift,
+        #                               smallest score gap among the limit + 1 best candidates)
+        self.entries: "OrderedDict[Tuple[str, str, int], tuple]" = OrderedDict()
+        self.by_user: Dict[str, List[Tuple[str, str, int]]] = {}  # username -> keys of their entries
+        self.popularity_drift = 0.0  # Total absolute popularity change of all users so far
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0  # Entries dropped by events
+        self.expirations = 0  # Entries dropped for their age or popularity drift
+        self.evictions = 0  # Entries dropped for capacity
+        self.served_age = 0.0  # Sum of the ages of the entries served on hits
+        self.max_served_age = 0.0
+
+    def get(self, username: str, limit: int = 5, engine: str = None) -> List[Tuple[str, float]]:
+        """
+        Recommendations for a user, from the cache if a valid entry exists
+        Time Complexity: O(1) on a hit, the recommender's cost on a miss
+        """
+        engine = engine or self.recommender.engine
+        key = (username, engine, limit)
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            results, created, drift, scale, gap = entry
+            age = now - created
+            moved = (self.popularity_drift - drift) * scale  # Most any single score can have changed
+            if age <= self.ttl and (moved <= self.popularity_tolerance or 3 * moved < gap):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.served_age += age
+                self.max_served_age = max(self.max_served_age, age)
+                return list(results)
+            self._drop(key)
+            self.expirations += 1
+
+        self.misses += 1
+        ranked = self.recommender.get_recommendations(username, limit + 1, engine)
+        results = ranked[:limit]
+        scale = 0.0  # Personalized PageRank does not use popularity
+        if engine == "heuristic" and self.recommender.max_popularity > 0:
+            scale = POPULARITY_WEIGHT / self.recommender.max_popularity
+        gap = min((ranked[i][1] - ranked[i + 1][1] for i in range(len(ranked) - 1)), default=float('inf'))
+        self.entries[key] = (tuple(results), now, self.popularity_drift, scale, gap)
+        self.by_user.setdefault(username, []).append(key)
+        while len(self.entries) > self.capacity:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+        return results
+
+    def _drop(self, key: Tuple[str, str, int]) -> None:
+        del self.entries[key]
+        keys = self.by_user[key[0]]
+        keys.remove(key)
+        if not keys:
+            del self.by_user[key[0]]
+
+    def invalidate(self, username: str) -> None:
+        """Drop every cached entry of a user. Time Complexity: O(k) for the user's k entries"""
+        for key in self.by_user.get(username, ())[:]:
+            self._drop(key)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+        self.by_user.clear()
+
+    def __call__(self, event: str, args: tuple) -> None:
+        """Listener entry point used by SocialNetwork/HobbyNetwork.subscribe"""
+        if not self.entries:
+            return
+        if event in ("make_connections", "accept_friend_request"):
+            self._friendship_changed(args[0], args[1])
+        elif event == "add_person":
+            self._user_added(args[1], args[2])
+        elif event == "add_user_hobby":
+            self._hobby_added(args[0], args[1])
+        elif event in ("like_post", "unlike_post"):
+            self.popularity_drift += LIKE_POPULARITY
+        elif event == "comment_on_post":
+            self.popularity_drift += COMMENT_POPULARITY
+
+    def _friendship_changed(self, username1: str, username2: str) -> None:
+        """
+        Drop the entries of both users and of everyone within two hops of either
+        Time Complexity: O(min(S, c * d)) - walks the 2-hop neighbourhoods (S paths), or checks each of the c
+                         cached users against both users when that is cheaper
+        """
+        self.popularity_drift += 2 * FRIEND_POPULARITY
+        vertices, vertex_by_id = self.network.vertices, self.network.vertex_by_id
+        person1, person2 = vertices[username1], vertices[username2]
+        paths = sum(len(vertex_by_id[uid].friends) for uid in person1.friends) + \
+            sum(len(vertex_by_id[uid].friends) for uid in person2.friends)
+        if paths > len(self.by_user):
+            for username in list(self.by_user):
+                user = vertices[username]
+                if any(user is person or user.is_friend(person.uid) or intersection_size(user.friends, person.friends)
+                       for person in (person1, person2)):
+                    self.invalidate(username)
+            return
+        usernames = self.network.usernames
+        for person in (person1, person2):
+            self.invalidate(person.username)
+            for friend_uid in person.friends:
+                self.invalidate(usernames[friend_uid])
+                for uid in vertex_by_id[friend_uid].friends:
+                    self.invalidate(usernames[uid])
+
+    def _user_added(self, username: str, hobbies: List[str]) -> None:
+        if username in self.by_user or self.network.vertices[username].uid != len(self.network.usernames) - 1:
+            self.clear()  # An existing user was replaced
+            return
+        hobbies = set(hobbies)
+        vertices = self.network.vertices
+        for cached in list(self.by_user):
+            if vertices[cached].hobbies & hobbies:
+                self.invalidate(cached)
+
+    def _hobby_added(self, username: str, hobby_name: str) -> None:
+        self.invalidate(username)
+        hobby = self.hobby_network._normalize_hobby(hobby_name)
+        user_vertices = self.hobby_network.user_vertices
+        for cached in list(self.by_user):
+            user_vertex = user_vertices.get(cached)
+            if user_vertex is not None and hobby in user_vertex.hobbies:
+                self.invalidate(cached)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate and staleness of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "mean_served_age": self.served_age / self.hits if self.hits else 0.0,
+            "max_served_age": self.max_served_age,
+        }
@@ -0,0 +1,98 @@
+import heapq
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens (letters, digits and underscores).
+    Time Complexity: O(L) where L is the length of the text
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+class PostingList:
+    """Integer post IDs containing a term, with the term frequency in each post"""
+    __slots__ = ("doc_ids", "term_freqs")
+
+    def __init__(self):
+        self.doc_ids = array('i')  # Ascending, since post IDs are assigned in order
+        self.term_freqs = array('i')
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+class InvertedIndex:
+    """
+    Inverted index over post content with BM25 ranking.
+
+    Every term maps to a posting list of integer post IDs, appended to as posts are created,
+    so indexing a post costs O(L) and a query only touches the posting lists of its terms.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1  # Term frequency saturation
+        self.b = b  # Document length normalisation
+        self.postings: Dict[str, PostingList] = {}
+        self.doc_lengths = array('i')  # Token count per post ID, 0 for posts that were never indexed
+        self.doc_count = 0
+        self.total_length = 0
+
+    def add(self, pid: int, text: str) -> None:
+        """
+        Index the content of a post
+        Time Complexity: O(L) where L is the length of the text
+        """
+        tokens = tokenize(text)
+        while len(self.doc_lengths) <= pid:
+            self.doc_lengths.append(0)
+        self.doc_lengths[pid] = len(tokens)
+        self.doc_count += 1
+        self.total_length += len(tokens)
+
+        for term, freq in Counter(tokens).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = PostingList()
+            posting.doc_ids.append(pid)
+            posting.term_freqs.append(freq)
+
+    def search(self, query: str, limit: int = 10, accept: Callable[[int], bool] = None) -> List[Tuple[int, float]]:
+        """
+        Rank posts matching any query term by BM25 and return the top (post ID, score) pairs.
+        If accept is given, only post IDs for which accept(pid) is True are scored.
+
+        Time Complexity: O(M + M' log(limit)) where M is the total length of the query terms' posting lists
+                         and M' the number of distinct matching posts
+        """
+        if not self.doc_count or limit <= 0:
+            return []
+        avg_length = self.total_length / self.doc_count
+        k1, b = self.k1, self.b
+        doc_lengths = self.doc_lengths
+        scores: Dict[int, float] = {}
+        allowed: Dict[int, bool] = {}  # accept() is evaluated once per post
+
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for pid, tf in zip(posting.doc_ids, posting.term_freqs):
+                if accept is not None:
+                    ok = allowed.get(pid)
+                    if ok is None:
+                        ok = allowed[pid] = accept(pid)
+                    if not ok:
+                        continue
+                norm = k1 * (1 - b + b * doc_lengths[pid] / avg_length)
+                scores[pid] = scores.get(pid, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def __len__(self) -> int:
+        """Number of distinct terms"""
+        return len(self.postings)
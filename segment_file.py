@@ -0,0 +1,61 @@
+import os
+import struct
+
+RECORD_HEADER = struct.Struct('<I')  # Length prefix of every record
+
+class SegmentFile:
+    """
+    Append-only file of length-prefixed records, used to spill cold data out of memory.
+    Records are addressed by the byte offset returned from append().
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None  # Opened lazily on first use
+        self._size = 0
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a+b')
+            self._size = os.path.getsize(self.path)
+        return self._file
+
+    def append(self, record: bytes) -> int:
+        """
+        Append a record and return its offset
+        Time Complexity: O(r) where r is the record size
+        """
+        segment = self._open()
+        offset = self._size
+        segment.seek(0, os.SEEK_END)
+        segment.write(RECORD_HEADER.pack(len(record)))
+        segment.write(record)
+        self._size += RECORD_HEADER.size + len(record)
+        return offset
+
+    def read(self, offset: int) -> bytes:
+        """
+        Read the record stored at an offset
+        Time Complexity: O(r) where r is the record size (one seek + read)
+        """
+        segment = self._open()
+        segment.flush()
+        segment.seek(offset)
+        (length,) = RECORD_HEADER.unpack(segment.read(RECORD_HEADER.size))
+        return segment.read(length)
+
+    def clear(self) -> None:
+        """Discard every record (used when the owner is rebuilt from a snapshot)"""
+        self.close()
+        self._file = open(self.path, 'w+b')
+        self._size = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __len__(self) -> int:
+        """Size of the segment in bytes"""
+        if self._file is None and os.path.exists(self.path):
+            return os.path.getsize(self.path)
+        return self._size
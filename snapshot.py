@@ -0,0 +1,448 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from auto_complete import Trie
+from hobby_network import HobbyNetwork
+from like_set import LikeSet
+from search_index import PostingList
+from social_network import Inbox, SocialNetwork, Vertex
+from trend_series import RESOLUTIONS, TOTAL_BUCKETS, TrendSeries
+from union_find import UnionFind
+
+"""
+Preamble:
+    Binary snapshot persistence for the whole LinkUs state (SocialNetwork, HobbyNetwork and the username Trie).
+
+    File layout (little-endian):
+        header     magic (8 bytes), format version (u32), section count (u32)
+        directory  one (name: 16 bytes, offset: u64, length: u64) entry per section
+        sections   raw packed arrays, each aligned to 8 bytes
+
+    Every string is stored once in a string table (a UTF-8 blob plus an array of offsets) and referenced
+    everywhere else by its integer ID, so users, edges, posts, likes and comments are all packed int/double
+    arrays. Loading maps the file with mmap, copies each section straight into a typed array and rebuilds
+    the in-memory indexes in bulk instead of replaying add_person/make_connections calls one by one.
+"""
+
+MAGIC = b"LINKUSSN"
+VERSION = 1  # Format version, a snapshot written in another one is rejected
+HEADER = struct.Struct('<8sII')  # magic, version, section count
+DIRECTORY_ENTRY = struct.Struct('<16sQQ')  # section name, offset, length in bytes
+NO_STRING = -1  # String ID used for None
+
+class SnapshotWriter:
+    """Collects string-table entries and packed array sections, then writes them out as one snapshot file"""
+    def __init__(self):
+        self.sections: Dict[str, array] = {}
+        self._string_ids: Dict[str, int] = {}
+        self._string_blob = bytearray()
+        self._string_offsets = array('q', [0])
+
+    def string_id(self, text) -> int:
+        """Intern a string in the string table and return its ID. Time Complexity: O(L)"""
+        if text is None:
+            return NO_STRING
+        sid = self._string_ids.get(text)
+        if sid is None:
+            sid = self._string_ids[text] = len(self._string_ids)
+            self._string_blob.extend(text.encode('utf-8'))
+            self._string_offsets.append(len(self._string_blob))
+        return sid
+
+    def add(self, name: str, values) -> None:
+        """Add a packed array section"""
+        if len(name.encode('ascii')) > 16:
+            raise ValueError(f"Section name too long: {name}")
+        self.sections[name] = values
+
+    def write(self, path: str) -> None:
+        """
+        Write the snapshot atomically (to a temporary file that then replaces path)
+        Time Complexity: O(B) where B is the total size of the sections
+        """
+        self.add("strings", self._string_blob)
+        self.add("string_offsets", self._string_offsets)
+
+        names = list(self.sections)
+        offset = HEADER.size + DIRECTORY_ENTRY.size * len(names)
+        directory = []
+        for name in names:
+            offset += -offset % 8
+            length = memoryview(self.sections[name]).nbytes
+            directory.append((name, offset, length))
+            offset += length
+
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as snapshot_file:
+            snapshot_file.write(HEADER.pack(MAGIC, VERSION, len(names)))
+            for name, offset, length in directory:
+                snapshot_file.write(DIRECTORY_ENTRY.pack(name.encode('ascii'), offset, length))
+            for name, offset, length in directory:
+                snapshot_file.write(bytes(offset - snapshot_file.tell()))  # Alignment padding
+                values = self.sections[name]
+                if sys.byteorder == 'big' and isinstance(values, array):
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                snapshot_file.write(values)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, path)
+
+class SnapshotReader:
+    """Memory-maps a snapshot file and hands out its sections as typed arrays"""
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a LinkUs snapshot")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {version} (expected {VERSION})")
+        self._directory = {}
+        for i in range(count):
+            name, offset, length = DIRECTORY_ENTRY.unpack_from(self._map, HEADER.size + i * DIRECTORY_ENTRY.size)
+            self._directory[name.rstrip(b'\0').decode('ascii')] = (offset, length)
+
+    def array(self, name: str, typecode: str) -> array:
+        """
+        Copy a section into a typed array (a single memcpy from the mapped file)
+        Time Complexity: O(B) where B is the size of the section
+        """
+        values = array(typecode)
+        if name not in self._directory:
+            return values
+        offset, length = self._directory[name]
+        with memoryview(self._map) as view:
+            values.frombytes(view[offset:offset + length])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def strings(self) -> List[str]:
+        """
+        Decode the whole string table
+        Time Complexity: O(B) where B is the size of the string blob
+        """
+        offsets = self.array("string_offsets", 'q')
+        blob_start, _ = self._directory["strings"]
+        with memoryview(self._map) as view:
+            return [
+                str(view[blob_start + start:blob_start + end], 'utf-8')
+                for start, end in zip(offsets, offsets[1:])
+            ]
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+def _offsets(lengths) -> array:
+    """Prefix sums of lengths, so item i owns the range [offsets[i], offsets[i + 1])"""
+    offsets = array('q', [0])
+    total = 0
+    for length in lengths:
+        total += length
+        offsets.append(total)
+    return offsets
+
+def _save_social(writer: SnapshotWriter, network: SocialNetwork) -> None:
+    users = [network.vertices[username] for username in network.usernames]
+    sid = writer.string_id
+
+    writer.add("user_names", array('i', (sid(user.username) for user in users)))
+    writer.add("user_display", array('i', (sid(user.name) for user in users)))
+    writer.add("user_desc", array('i', (sid(user.description) for user in users)))
+    writer.add("user_hobby_offs", _offsets(len(user.hobbies) for user in users))
+    writer.add("user_hobbies", array('i', (sid(hobby) for user in users for hobby in user.hobbies)))
+
+    # Every friendship once, as a packed (uid, uid) pair with the smaller ID first (a self-friendship is stored once too)
+    edges = array('i')
+    edge_times = array('d')
+    for user in users:
+        start = bisect_left(user.friends, user.uid)
+        for friend_uid in user.friends[start:]:
+            edges.append(user.uid)
+            edges.append(friend_uid)
+        if user.friend_times is not None:
+            edge_times.extend(user.friend_times[start:])
+    writer.add("edges", edges)
+    if network.track_friendship_times:
+        writer.add("edge_times", edge_times)
+
+    writer.add("inbox_offs", _offsets(len(user.inbox) if user.inbox else 0 for user in users))
+    writer.add("inbox", array('i', (sid(requester) for user in users if user.inbox for requester in user.inbox)))
+    writer.add("inbox_times", array('d', (t for user in users if user.inbox for t in user.inbox.requests.values())))
+    # Every conversation's retrievable messages (in memory and spilled), oldest first
+    message_store = network.messages
+    conversations = list(message_store.conversations.items())
+    writer.add("conv_users", array('q', (key for key, _ in conversations)))
+    writer.add("conv_firsts", array('q', (conversation.first for _, conversation in conversations)))
+    writer.add("conv_offs", _offsets(len(conversation) - conversation.first for _, conversation in conversations))
+    records = [record for _, conversation in conversations for record in message_store.records(conversation)]
+    writer.add("msg_senders", array('i', (sender_id for sender_id, _, _ in records)))
+    writer.add("msg_times", array('d', (ts for _, ts, _ in records)))
+    writer.add("msg_bodies", array('i', (sid(body) for _, _, body in records)))
+
+    # Affinity rows as stored (forward-decayed scores relative to the epoch)
+    affinity = network.affinity
+    writer.add("affinity_epoch", array('d', (affinity.epoch,)))
+    writer.add("affinity_offs", _offsets(len(row) if row is not None else 0 for row in affinity.partners))
+    writer.add("affinity_users", array('i', (uid for row in affinity.partners if row is not None for uid in row)))
+    writer.add("affinity_scores", array('d', (score for row in affinity.scores if row is not None for score in row)))
+
+    posts = network.posts
+    writer.add("post_authors", posts.authors)
+    writer.add("post_times", posts.timestamps)
+    writer.add("post_content", array('i', (sid(content) for content in posts.contents)))
+    writer.add("post_like_offs", _offsets(posts.like_counts))
+    writer.add("post_likes", array('i', (user_id for likes in posts.likes if likes is not None for user_id in likes)))
+    writer.add("author_post_offs", _offsets(len(post_ids) for post_ids in posts.by_author))
+    writer.add("author_posts", array('i', (pid for post_ids in posts.by_author for pid in post_ids)))
+
+    comments = posts.comments
+    comment_posts = array('i', bytes(4 * len(comments.bodies)))
+    for pid, comment_ids in enumerate(comments.by_post):
+        if comment_ids is not None:
+            for cid in comment_ids:
+                comment_posts[cid] = pid
+    writer.add("comment_posts", comment_posts)
+    writer.add("comment_authors", comments.authors)
+    writer.add("comment_times", comments.timestamps)
+    writer.add("comment_bodies", array('i', (sid(comments._body(cid)) for cid in range(len(comments.bodies)))))
+
+    index = network.search_index
+    terms = list(index.postings)
+    writer.add("index_terms", array('i', (sid(term) for term in terms)))
+    writer.add("index_offs", _offsets(len(index.postings[term]) for term in terms))
+    writer.add("index_docs", array('i', (pid for term in terms for pid in index.postings[term].doc_ids)))
+    writer.add("index_freqs", array('i', (tf for term in terms for tf in index.postings[term].term_freqs)))
+    writer.add("index_doc_lens", index.doc_lengths)
+    writer.add("index_stats", array('q', (index.doc_count, index.total_length)))
+
+def _load_social(reader: SnapshotReader, strings: List[str], network_options: dict) -> SocialNetwork:
+    network = SocialNetwork(**network_options)
+
+    user_names = reader.array("user_names", 'i')
+    user_display = reader.array("user_display", 'i')
+    user_desc = reader.array("user_desc", 'i')
+    hobby_offs = reader.array("user_hobby_offs", 'q')
+    user_hobbies = reader.array("user_hobbies", 'i')
+    users = []
+    for uid, username_sid in enumerate(user_names):
+        username = strings[username_sid]
+        hobbies = [strings[h] for h in user_hobbies[hobby_offs[uid]:hobby_offs[uid + 1]]]
+        description = strings[user_desc[uid]] if user_desc[uid] != NO_STRING else None
+        vertex = Vertex(strings[user_display[uid]], username, hobbies, description, uid)
+        network.vertices[username] = vertex
+        network.usernames.append(username)
+        users.append(vertex)
+    network.vertex_by_id = users
+
+    # Friend lists are collected per user and sorted once, instead of inserting every friendship in order
+    edges = reader.array("edges", 'i')
+    edge_times = reader.array("edge_times", 'd') if network.track_friendship_times else None
+    rows = [[] for _ in users]
+    for i in range(0, len(edges), 2):
+        uid1, uid2 = edges[i], edges[i + 1]
+        since = edge_times[i // 2] if edge_times else 0.0
+        rows[uid1].append((uid2, since))
+        if uid1 != uid2:
+            rows[uid2].append((uid1, since))
+    for user, row in zip(users, rows):
+        row.sort()
+        user.friends = array('i', (uid for uid, _ in row))
+        if network.track_friendship_times:
+            user.friend_times = array('d', (since for _, since in row))
+    network.components = UnionFind.from_edges(len(users), zip(edges[0::2], edges[1::2]))
+    if network.fof_index is not None:
+        network.fof_index.rebuild([user.friends for user in users])
+
+    inbox_offs = reader.array("inbox_offs", 'q')
+    inbox = reader.array("inbox", 'i')
+    inbox_times = reader.array("inbox_times", 'd')
+    for uid, user in enumerate(users):
+        if inbox_offs[uid + 1] > inbox_offs[uid]:
+            user.inbox = Inbox(network.inbox_cap)
+            user.inbox.requests.update(
+                (strings[requester], t) for requester, t in
+                zip(inbox[inbox_offs[uid]:inbox_offs[uid + 1]], inbox_times[inbox_offs[uid]:inbox_offs[uid + 1]])
+            )
+            while network.inbox_cap is not None and len(user.inbox) > network.inbox_cap:
+                user.inbox.requests.popitem(last=False)
+
+    message_store = network.messages
+    message_store.clear_spilled()  # Every message came from the snapshot, old spilled records are obsolete
+    conv_offs = reader.array("conv_offs", 'q')
+    msg_senders = reader.array("msg_senders", 'i')
+    msg_times = reader.array("msg_times", 'd')
+    msg_bodies = reader.array("msg_bodies", 'i')
+    for i, (key, first) in enumerate(zip(reader.array("conv_users", 'q'), reader.array("conv_firsts", 'q'))):
+        start, end = conv_offs[i], conv_offs[i + 1]
+        message_store.load(key >> 32, key & 0xFFFFFFFF, first, msg_senders[start:end], msg_times[start:end],
+                           (strings[b] for b in msg_bodies[start:end]))
+
+    affinity_epoch = reader.array("affinity_epoch", 'd')
+    if affinity_epoch:
+        affinity_offs = reader.array("affinity_offs", 'q')
+        affinity_users = reader.array("affinity_users", 'i')
+        affinity_scores = reader.array("affinity_scores", 'd')
+        rows = range(len(affinity_offs) - 1)
+        network.affinity.load(
+            affinity_epoch[0],
+            [affinity_users[affinity_offs[u]:affinity_offs[u + 1]] if affinity_offs[u + 1] > affinity_offs[u] else None for u in rows],
+            [affinity_scores[affinity_offs[u]:affinity_offs[u + 1]] if affinity_offs[u + 1] > affinity_offs[u] else None for u in rows],
+        )
+
+    # Post columns are copied straight from the file, the per-author index comes back already sorted
+    posts = network.posts
+    posts.authors = reader.array("post_authors", 'i')
+    posts.timestamps = reader.array("post_times", 'd')
+    posts.contents = [strings[c] for c in reader.array("post_content", 'i')]
+    like_offs = reader.array("post_like_offs", 'q')
+    likes = reader.array("post_likes", 'i')
+    posts.like_counts = array('i', (like_offs[pid + 1] - like_offs[pid] for pid in range(len(posts.contents))))
+    posts.likes = [
+        LikeSet.from_sorted(likes[like_offs[pid]:like_offs[pid + 1]]) if posts.like_counts[pid] else None
+        for pid in range(len(posts.contents))
+    ]
+    author_offs = reader.array("author_post_offs", 'q')
+    author_posts = reader.array("author_posts", 'i')
+    timestamps = posts.timestamps
+    posts.by_author = [author_posts[author_offs[a]:author_offs[a + 1]] for a in range(len(author_offs) - 1)]
+    posts.author_times = [array('d', (timestamps[pid] for pid in post_ids)) for post_ids in posts.by_author]
+
+    comments = posts.comments
+    comment_posts = reader.array("comment_posts", 'i')
+    comments.authors = reader.array("comment_authors", 'i')
+    comments.timestamps = reader.array("comment_times", 'd')
+    comments.bodies = [strings[b] for b in reader.array("comment_bodies", 'i')]
+    comments.disk_offsets = array('q', [-1]) * len(comments.bodies)
+    comments.by_post = [None] * len(posts.contents)
+    comments.hot_start = array('i', bytes(4 * len(posts.contents)))
+    posts.comment_counts = array('i', bytes(4 * len(posts.contents)))
+    for cid, pid in enumerate(comment_posts):
+        if comments.by_post[pid] is None:
+            comments.by_post[pid] = array('i')
+        comments.by_post[pid].append(cid)
+        posts.comment_counts[pid] += 1
+    if comments.segment is not None:
+        comments.segment.clear()  # Every body came from the snapshot, old spilled records are obsolete
+        comments.spill_cold()
+
+    index = network.search_index
+    index_offs = reader.array("index_offs", 'q')
+    index_docs = reader.array("index_docs", 'i')
+    index_freqs = reader.array("index_freqs", 'i')
+    for i, term_sid in enumerate(reader.array("index_terms", 'i')):
+        posting = PostingList()
+        posting.doc_ids = index_docs[index_offs[i]:index_offs[i + 1]]
+        posting.term_freqs = index_freqs[index_offs[i]:index_offs[i + 1]]
+        index.postings[strings[term_sid]] = posting
+    index.doc_lengths = reader.array("index_doc_lens", 'i')
+    index.doc_count, index.total_length = reader.array("index_stats", 'q') or (0, 0)
+
+    # Trending windows only need the posts that are still inside the largest window
+    cutoff = datetime.now().timestamp() - max(network.trending.windows)
+    recent = sorted((ts, pid) for pid, ts in enumerate(timestamps) if ts >= cutoff)
+    for ts, pid in recent:
+        network.trending.observe(posts.contents[pid], datetime.fromtimestamp(ts))
+    return network
+
+def _save_hobbies(writer: SnapshotWriter, hobby_network: HobbyNetwork) -> None:
+    sid = writer.string_id
+    hobbies = list(hobby_network.hobby_vertices)
+    hobby_ids = {hobby: i for i, hobby in enumerate(hobbies)}
+    writer.add("hobby_names", array('i', (sid(hobby) for hobby in hobbies)))
+
+    users = list(hobby_network.user_vertices.values())
+    writer.add("hobby_users", array('i', (sid(user.username) for user in users)))
+    writer.add("hobby_user_offs", _offsets(len(user.hobbies) for user in users))
+    writer.add("hobby_user_hobs", array('i', (hobby_ids[hobby] for user in users for hobby in user.hobbies)))
+
+    # Every hobby's trend buckets have the same fixed size, so they are stored back to back without offsets
+    vertices = [hobby_network.hobby_vertices[hobby] for hobby in hobbies]
+    writer.add("trend_last", array('q', (bucket for vertex in vertices for bucket in vertex.trend.last)))
+    writer.add("trend_levels", array('i', (level for vertex in vertices for level in vertex.trend.levels)))
+    writer.add("trend_joins", array('i', (joins for vertex in vertices for joins in vertex.trend.joins)))
+
+def _load_hobbies(reader: SnapshotReader, strings: List[str]) -> HobbyNetwork:
+    hobby_network = HobbyNetwork()
+    hobbies = [strings[h] for h in reader.array("hobby_names", 'i')]
+    trend_last = reader.array("trend_last", 'q')
+    trend_levels = reader.array("trend_levels", 'i')
+    trend_joins = reader.array("trend_joins", 'i')
+    resolutions = len(RESOLUTIONS)
+    for i, hobby in enumerate(hobbies):
+        vertex = hobby_network._new_hobby(hobby)  # Hobby IDs follow the saved order
+        vertex.trend = TrendSeries.load(trend_last[i * resolutions:(i + 1) * resolutions],
+                                        trend_levels[i * TOTAL_BUCKETS:(i + 1) * TOTAL_BUCKETS],
+                                        trend_joins[i * TOTAL_BUCKETS:(i + 1) * TOTAL_BUCKETS])
+
+    user_offs = reader.array("hobby_user_offs", 'q')
+    user_hobs = reader.array("hobby_user_hobs", 'i')
+    members = [[] for _ in hobbies]  # Hobby ID -> user IDs, ascending since users are loaded in ID order
+    for i, username_sid in enumerate(reader.array("hobby_users", 'i')):
+        user_vertex = hobby_network._new_user(strings[username_sid])
+        for hobby_id in user_hobs[user_offs[i]:user_offs[i + 1]]:
+            user_vertex.hobbies.add(hobbies[hobby_id])
+            members[hobby_id].append(user_vertex.uid)
+    for hobby, user_ids in zip(hobbies, members):
+        hobby_network.hobby_vertices[hobby].members = LikeSet.from_sorted(user_ids)
+
+    hobby_network.rebuild_connections()
+    hobby_network.rebuild_trending()
+    return hobby_network
+
+def _trie_names(trie: Trie) -> List[str]:
+    names = []
+    trie.depth_first_search(trie.root, "", names)
+    return names
+
+def save_snapshot(path: str, network: SocialNetwork, hobby_network: HobbyNetwork, trie: Trie, journal=None) -> None:
+    """
+    Save the whole system state to a binary snapshot file.
+    If the event journal is given, it is committed first and its (journal ID, offset) is recorded,
+    so only the events written after the snapshot are replayed on startup.
+    Time Complexity: O(V + E + P + C + L) - one pass over users, edges, posts, comments and likes
+    """
+    writer = SnapshotWriter()
+    _save_social(writer, network)
+    _save_hobbies(writer, hobby_network)
+    writer.add("trie_names", array('i', (writer.string_id(name) for name in _trie_names(trie))))
+    if journal is not None:
+        journal.commit(sync=True)
+        writer.add("journal_pos", array('q', (journal.journal_id, journal.position)))
+    writer.write(path)
+
+def snapshot_journal_position(path: str) -> Optional[Tuple[int, int]]:
+    """(journal ID, offset) recorded by save_snapshot, or None if the snapshot was saved without a journal"""
+    reader = SnapshotReader(path)
+    try:
+        position = reader.array("journal_pos", 'q')
+    finally:
+        reader.close()
+    return (position[0], position[1]) if position else None
+
+def load_snapshot(path: str, **network_options) -> Tuple[SocialNetwork, HobbyNetwork, Trie]:
+    """
+    Load a snapshot written by save_snapshot and return (network, hobby_network, trie).
+    Extra keyword arguments are passed to the SocialNetwork constructor.
+    Time Complexity: O(V + E + P + C + L) - sections are copied in bulk and indexes rebuilt in single passes
+    """
+    reader = SnapshotReader(path)
+    try:
+        strings = reader.strings()
+        network = _load_social(reader, strings, network_options)
+        hobby_network = _load_hobbies(reader, strings)
+        trie = Trie()
+        trie.insert_many(strings[s] for s in reader.array("trie_names", 'i'))
+    finally:
+        reader.close()
+    return network, hobby_network, trie
@@ -1,69 +1,423 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
 from datetime import datetime
+from itertools import islice
 from typing import List, Tuple, Optional
 
-from hash_map import ChainHashMap
+from affinity import AffinityStore
+from csr_graph import CSRGraph, intersection_size
+from fof_index import FoFIndex
 from max_heap import MaxHeap
-from post_system import Post
+from message_store import MessageStore
+from post_system import Post, PostStore
+from search_index import InvertedIndex
+from trending import TrendingTopics
+from union_find import UnionFind
 
-class Deque:
-    def __init__(self):
-        self.items = []
-    
-    def append(self, item):
-        self.items.append(item)
+class Inbox:
+    """
+    Pending friend requests of a user, oldest first. Backed by an insertion-ordered hash map
+    (requester -> request time), so membership checks, removal and evicting the oldest request are O(1).
+    With a cap, adding a request to a full inbox evicts the oldest one.
+    """
+    __slots__ = ("requests", "cap")
+
+    def __init__(self, cap=None):
+        self.requests = OrderedDict()
+        self.cap = cap
+
+    def add(self, requester, timestamp=None):
+        """
+        Adds a request, returns False if the requester already has one pending
+
+        Time Complexity: O(1)
+        """
+        if requester in self.requests:
+            return False
+        self.requests[requester] = (timestamp or datetime.now()).timestamp()
+        if self.cap is not None and len(self.requests) > self.cap:
+            self.requests.popitem(last=False)  # Evict the oldest request
+        return True
+
+    def remove(self, requester):
+        """
+        Removes a request, returns True if it was pending
+
+        Time Complexity: O(1)
+        """
+        return self.requests.pop(requester, None) is not None
 
-    def remove(self, item):
-        if item in self.items:
-            self.items.remove(item)
+    def page(self, cursor=0, limit=None):
+        """
+        Returns up to limit requesters starting at position cursor, oldest first
+
+        Time Complexity: O(cursor + limit)
+        """
+        stop = None if limit is None else cursor + limit
+        return list(islice(self.requests, cursor, stop))
+
+    def __contains__(self, requester):
+        return requester in self.requests
+
+    def __len__(self):
+        return len(self.requests)
 
     def __iter__(self):
-        return iter(self.items)
+        return iter(self.requests)
 
     def __repr__(self):
-        return repr(self.items)
+        return repr(list(self.requests))
 
 class Vertex:
-    def __init__(self, name, username, hobbies, description=None):
+    """
+    A user in the social graph. Friendships are stored as a sorted array of neighbour user IDs (4 bytes each)
+    instead of a dict of Vertex -> Edge objects, and the friend request inbox is only allocated once used.
+    If the network tracks friendship times, friend_times holds the creation time of each friendship, aligned with friends.
+    """
+    __slots__ = ("uid", "name", "hobbies", "description", "username", "friends", "friend_times", "inbox")
+
+    def __init__(self, name, username, hobbies, description=None, uid=None):
+        self.uid = uid  # Dense integer user ID assigned by the SocialNetwork
         self.name = name
         self.hobbies = set(hobbies)
         self.description = description
         self.username = username
-        self.adjacency_map = dict()
-        self.inbox = Deque()
-        self.messages = Deque()
+        self.friends = array('i')  # Sorted user IDs of friends
+        self.friend_times = None  # array('d') of friendship creation times, only when the network tracks them
+        self.inbox = None  # Inbox of pending friend requests, created on the first request
 
-class Edge:
-    def __init__(self, vertex1, vertex2):
-        self.vertex1 = vertex1
-        self.vertex2 = vertex2
+    def is_friend(self, uid):
+        """
+        Checks if the user with ID uid is a friend
+
+        Time Complexity: O(log d) where d is the number of friends - Binary search on the sorted friend IDs
+        """
+        idx = bisect_left(self.friends, uid)
+        return idx < len(self.friends) and self.friends[idx] == uid
+
+    def add_friend(self, uid, timestamp=None):
+        """
+        Adds a friend ID, returns True if it was not already a friend
+
+        Time Complexity: O(log d) search plus a C-level shift of the array
+        """
+        idx = bisect_left(self.friends, uid)
+        if idx < len(self.friends) and self.friends[idx] == uid:
+            return False
+        self.friends.insert(idx, uid)
+        if self.friend_times is not None:
+            self.friend_times.insert(idx, timestamp)
+        return True
+
+    def remove_friend(self, uid):
+        """
+        Removes a friend ID, returns True if it was a friend
+
+        Time Complexity: O(log d) search plus a C-level shift of the array
+        """
+        idx = bisect_left(self.friends, uid)
+        if idx == len(self.friends) or self.friends[idx] != uid:
+            return False
+        del self.friends[idx]
+        if self.friend_times is not None:
+            del self.friend_times[idx]
+        return True
 
 class SocialNetwork:
-    def __init__(self):
+    # Affinity added per interaction, towards the post author or message recipient
+    INTERACTION_WEIGHTS = {"like": 1.0, "comment": 2.0, "message": 1.0}
+
+    def __init__(self, comment_spill_path=None, hot_comments_per_post=None, track_friendship_times=False, inbox_cap=None,
+                 message_retention=None, message_spill_path=None, affinity_half_life=7 * 24 * 3600, affinity_top_n=32,
+                 fof_top_m=None):
         self.vertices = dict()
-        # Initialize hashmaps for posts
-        self.posts = ChainHashMap()  # Maps post_id to Post objects
-        self.user_posts = ChainHashMap()  # Maps username to list of post IDs
-        self.post_counter = 0  # For generating unique post IDs
-        self.interaction_history = {}  # Track user interactions
+        self.usernames = []  # Maps user ID to username
+        self.vertex_by_id = []  # Maps user ID to Vertex
+        self.track_friendship_times = track_friendship_times  # Keep a creation time per friendship (8 bytes per endpoint)
+        self.inbox_cap = inbox_cap  # Most pending friend requests kept per user, the oldest are evicted beyond it
+        # Columnar post storage, post IDs are dense integers assigned by the store
+        # Old comments on large threads spill to comment_spill_path once a post has more than hot_comments_per_post
+        self.posts = PostStore(self.usernames, comment_spill_path, hot_comments_per_post)
+        # Direct messages per conversation, the latest message_retention of each are kept in memory
+        # and older ones are dropped, or spilled to message_spill_path if it is given
+        self.messages = MessageStore(self.usernames, message_retention, message_spill_path)
+        self.search_index = InvertedIndex()  # Full-text index over post content, updated by create_post
+        self.trending = TrendingTopics()  # Streaming hashtag/mention counts, fed by create_post
+        # Time-decayed interaction affinity, fed by likes, comments and messages, top affinity_top_n partners per user
+        self.affinity = AffinityStore(affinity_half_life, affinity_top_n)
+        # Optional materialized friends-of-friends counts, the fof_top_m largest per user, updated as friendships are made
+        self.fof_index = FoFIndex(fof_top_m, lambda uid: self.vertex_by_id[uid].friends) if fof_top_m else None
+        self.components = UnionFind()  # Connected components of the friendship graph, merged as friendships are made
+        self.community_labels = None  # Community label per user ID from the last detect_communities run
+        self.listeners = []  # Callables notified with (event, args) after every successful mutation
+        self._csr = None  # Last CSR snapshot returned by to_csr
+        self._csr_log = array('i')  # Friendships added since that snapshot, as packed user ID pairs
+
+    def subscribe(self, listener):
+        """
+        Registers a listener that is called as listener(event, args) after every successful mutation.
+        event is the name of the mutating method and args the positional arguments that replay it,
+        so getattr(network, event)(*args) reproduces the change.
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Removes a listener registered with subscribe"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, event, *args):
+        for listener in self.listeners:
+            listener(event, args)
 
     def add_person(self, name, username, hobbies, description=None):
-        person = Vertex(name, username, hobbies, description)
+        replaced = username in self.vertices
+        if replaced:
+            uid = self.vertices[username].uid
+            self._drop_friendships(self.vertices[username])
+            self._csr = None  # The old vertex and its friendships are replaced, so the next snapshot is rebuilt
+        else:
+            uid = len(self.usernames)
+            self.usernames.append(username)
+            self.vertex_by_id.append(None)
+            self.components.add()
+        person = Vertex(name, username, hobbies, description, uid)
+        if self.track_friendship_times:
+            person.friend_times = array('d')
         self.vertices[username] = person
+        self.vertex_by_id[uid] = person
+        if replaced:  # The replaced user's friendships are dropped, which can split components
+            self.components = UnionFind.from_edges(len(self.usernames), self._edges())
+            if self.fof_index is not None:
+                self.fof_index.rebuild([vertex.friends for vertex in self.vertex_by_id])
+        self._notify("add_person", name, username, list(hobbies), description)
         return True
 
-    def make_connections(self, username1, username2):
+    def _drop_friendships(self, person):
+        """
+        Removes a user being replaced from the friend arrays of their friends, since the new vertex reuses the user ID
+
+        Time Complexity: O(d log D) for d friends with at most D friends each
+        """
+        for friend_uid in person.friends:
+            if friend_uid != person.uid:  # A self-friendship only lives on the vertex being replaced
+                self.vertex_by_id[friend_uid].remove_friend(person.uid)
+
+    def make_connections(self, username1, username2, timestamp=None):
+        timestamp = timestamp or datetime.now()
+        self._connect(username1, username2, timestamp)
+        self._notify("make_connections", username1, username2, timestamp)
+
+    def _connect(self, username1, username2, timestamp=None):
         person1 = self.vertices[username1]
         person2 = self.vertices[username2]
-        connection = Edge(person1, person2)
-        person1.adjacency_map[person2] = connection
-        person2.adjacency_map[person1] = connection
+        since = (timestamp or datetime.now()).timestamp() if self.track_friendship_times else None
+        added = person1.add_friend(person2.uid, since)
+        person2.add_friend(person1.uid, since)
+        if added and self._csr is not None:
+            self._csr_log.extend((person1.uid, person2.uid))
+        if added and self.fof_index is not None:
+            self.fof_index.add_friendship(person1.uid, person2.uid, person1.friends, person2.friends)
+        if added:
+            self.components.union(person1.uid, person2.uid)
+
+    def _edges(self):
+        """Every friendship once, as (smaller user ID, larger user ID)"""
+        for vertex in self.vertex_by_id:
+            for friend_uid in vertex.friends[bisect_left(vertex.friends, vertex.uid):]:
+                yield vertex.uid, friend_uid
+
+    def are_friends(self, username1, username2):
+        """
+        Checks if two users are friends
+
+        Time Complexity: O(log d) - Binary search in the sorted friend IDs of the first user
+        """
+        if username1 not in self.vertices or username2 not in self.vertices:
+            return False
+        return self.vertices[username1].is_friend(self.vertices[username2].uid)
+
+    def get_friends(self, username):
+        """
+        Returns the usernames of a user's friends, in user ID order
+
+        Time Complexity: O(d) where d is the number of friends
+        """
+        usernames = self.usernames
+        return [usernames[uid] for uid in self.vertices[username].friends]
+
+    def friends_since(self, username1, username2):
+        """
+        Returns when two users became friends, or None if they are not friends or friendship times are not tracked
+
+        Time Complexity: O(log d) - Binary search in the sorted friend IDs of the first user
+        """
+        person1 = self.vertices[username1]
+        if person1.friend_times is None or username2 not in self.vertices:
+            return None
+        uid = self.vertices[username2].uid
+        idx = bisect_left(person1.friends, uid)
+        if idx < len(person1.friends) and person1.friends[idx] == uid:
+            return datetime.fromtimestamp(person1.friend_times[idx])
+        return None
+
+    """
+    (method) def shortest_path(
+        self: Self@SocialNetwork,
+        username1: str,
+        username2: str,
+        max_depth: int = 6,
+        max_visited: int = 100000
+    ) -> Optional[List[str]]
+    """
+    def shortest_path(self, username1, username2, max_depth=6, max_visited=100_000):
+        """
+        Finds a shortest chain of friendships from username1 to username2, as the usernames along it
+        (both ends included). Returns None if there is no chain of at most max_depth friendships, or if
+        more than max_visited users would have to be explored to find one.
+
+        Bidirectional BFS: both users are searched from at once, one level at a time, always expanding the
+        side with the smaller frontier, so each side only needs to reach about half the distance.
+
+        Time Complexity: O(min(V + E, max_visited * d)) - in practice about the square root of the users a
+                         one-sided BFS would visit
+        """
+        if username1 not in self.vertices or username2 not in self.vertices:
+            return None
+        source, target = self.vertices[username1].uid, self.vertices[username2].uid
+        if source == target:
+            return [username1]
+        if not self.components.connected(source, target):  # No chain at all, skip the search
+            return None
+
+        vertex_by_id = self.vertex_by_id
+        parents = ({source: -1}, {target: -1})  # Per side: user ID -> the user it was reached from
+        frontiers = ([source], [target])
+        depth = 0
+        while frontiers[0] and frontiers[1] and depth < max_depth:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other_seen = parents[side], parents[1 - side]
+            next_frontier = []
+            for uid in frontiers[side]:
+                for friend_uid in vertex_by_id[uid].friends:
+                    if friend_uid in seen:
+                        continue
+                    seen[friend_uid] = uid
+                    if friend_uid in other_seen:  # The two searches meet: join the halves at friend_uid
+                        return self._join_path(friend_uid, parents[0], parents[1])
+                    next_frontier.append(friend_uid)
+            if len(parents[0]) + len(parents[1]) > max_visited:
+                return None
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+            depth += 1
+        return None
+
+    def _join_path(self, meeting_uid, source_parents, target_parents):
+        """Usernames from the source to the target through the user where the two searches met"""
+        path = []
+        uid = meeting_uid
+        while uid != -1:
+            path.append(uid)
+            uid = source_parents[uid]
+        path.reverse()
+        uid = target_parents[meeting_uid]
+        while uid != -1:
+            path.append(uid)
+            uid = target_parents[uid]
+        return [self.usernames[uid] for uid in path]
+
+    """
+    (method) def degrees_of_separation(
+        self: Self@SocialNetwork,
+        username1: str,
+        username2: str,
+        max_depth: int = 6,
+        max_visited: int = 100000
+    ) -> Optional[int]
+    """
+    def degrees_of_separation(self, username1, username2, max_depth=6, max_visited=100_000):
+        """
+        Number of friendships on a shortest chain between two users (1 for friends), or None if they are not
+        connected within max_depth friendships or the search exceeds max_visited users
+
+        Time Complexity: Same as shortest_path
+        """
+        path = self.shortest_path(username1, username2, max_depth, max_visited)
+        return len(path) - 1 if path is not None else None
+
+    def in_same_component(self, username1, username2):
+        """
+        Checks if two users are connected by any chain of friendships
+
+        Time Complexity: O(alpha(n)) - Two union-find lookups, effectively constant
+        """
+        return self.components.connected(self.vertices[username1].uid, self.vertices[username2].uid)
+
+    def component_size(self, username):
+        """
+        Number of users connected to the user by some chain of friendships (the user included)
+
+        Time Complexity: O(alpha(n)) - Union-find lookup of the component root, which holds the size
+        """
+        return self.components.component_size(self.vertices[username].uid)
+
+    def component_count(self):
+        """Number of connected components (isolated users count as one each). Time Complexity: O(1)"""
+        return self.components.components
+
+    """
+    (method) def detect_communities(
+        self: Self@SocialNetwork,
+        max_iterations: int = 20,
+        seed: int = 0
+    ) -> int
+    """
+    def detect_communities(self, max_iterations=20, seed=0):
+        """
+        Runs label propagation over the CSR snapshot of the friendship graph and stores a community label
+        per user (read with community_of). Returns the number of communities found.
+        This is an offline pass: users and friendships added afterwards are not reflected until it is run again.
+
+        Time Complexity: O(I * (V + E)) for I propagation rounds
+        """
+        self.community_labels = self.to_csr().label_propagation(max_iterations, seed)
+        return len(set(self.community_labels))
+
+    def community_of(self, username):
+        """
+        Community label of a user from the last detect_communities run, or None if the user joined after it
+
+        Time Complexity: O(1)
+        """
+        uid = self.vertices[username].uid
+        if self.community_labels is None or uid >= len(self.community_labels):
+            return None
+        return self.community_labels[uid]
+
+    def to_csr(self):
+        """
+        Returns an immutable CSR snapshot of the friendship graph indexed by user ID (see csr_graph.py).
+        The previous snapshot is reused if nothing changed, and refreshed from the log of friendships
+        added since it was taken otherwise.
+
+        Time Complexity: O(V + E) for the first snapshot, O(V + E) memory copy plus O(d log d) per touched user
+                         for a refresh, O(1) if nothing changed
+        """
+        if self._csr is None:
+            self._csr = CSRGraph.from_rows((vertex.friends for vertex in self.vertex_by_id), self.usernames)
+        elif self._csr_log or self._csr.num_vertices != len(self.usernames):
+            self._csr = self._csr.with_edges(self._csr_log, self.usernames)
+        self._csr_log = array('i')
+        return self._csr
 
     def recommend_friends(self, name, limit=3):
         recommendations = []
         person = self.vertices[name]
         
         for potential_friend_name, potential_friend in self.vertices.items():
-            if potential_friend_name == name or potential_friend in person.adjacency_map:
+            if potential_friend_name == name or person.is_friend(potential_friend.uid):
                 continue
             
             common_hobbies = len(person.hobbies & potential_friend.hobbies)
@@ -74,18 +428,81 @@ class SocialNetwork:
         return [user[1] for user in recommendations[:limit]]
 
     def common_friends(self, username1, username2):
-        count = 0
-        person1 = self.vertices[username1]
-        person2 = self.vertices[username2]
-        if len(person1.adjacency_map) < len(person2.adjacency_map):
-            for friend in person1.adjacency_map:
-                if friend in person2.adjacency_map:
-                    count += 1
-        else:
-            for friend in person2.adjacency_map:
-                if friend in person1.adjacency_map:
-                    count += 1
-        return count
+        """
+        Counts the friends two users have in common
+
+        Time Complexity: O(d1 + d2), or O(d1 log(d2 / d1)) by galloping when one user has far more friends
+        """
+        return intersection_size(self.vertices[username1].friends, self.vertices[username2].friends)
+
+    """
+    (method) def friends_of_friends(
+        self: Self@SocialNetwork,
+        username: str,
+        limit: int = None
+    ) -> Dict[str, int]
+    """
+    def friends_of_friends(self, username, limit=None):
+        """
+        Gets the users who are not friends with the user but share friends with them, as username -> mutual friends.
+        With a limit, only the limit users sharing the most friends are returned, most first. Which of several
+        users tied at the last count are returned is unspecified.
+
+        A limit of at most fof_top_m is read from the friends-of-friends index when it is enabled. If the user's
+        row cannot answer it (too few counts of at least its floor), the 2-hop pass is run and the row refreshed.
+
+        Time Complexity: O(M log limit) from the index row of M counts, O(S) for S 2-hop paths otherwise
+        """
+        user = self.vertices[username]
+        usernames = self.usernames
+        index = self.fof_index
+        if limit is not None and index is not None and limit <= index.top_m:
+            top = index.top(user.uid, limit)
+            if top is not None:
+                return {usernames[uid]: count for uid, count in top}
+        counts = ((self.vertices[other].uid, count) for other, count in self.common_friends_many(username).items())
+        counts = {uid: count for uid, count in counts if not user.is_friend(uid)}
+        if index is not None:
+            index.refresh(user.uid, counts)
+        if limit is not None:
+            counts = dict(heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0])))
+        return {usernames[uid]: count for uid, count in counts.items()}
+
+    """
+    (method) def common_friends_many(
+        self: Self@SocialNetwork,
+        username: str,
+        candidates: Iterable[str] = None
+    ) -> Dict[str, int]
+    """
+    def common_friends_many(self, username, candidates=None):
+        """
+        Counts the friends a user has in common with each candidate, as candidate -> count.
+        Without candidates, every user sharing at least one friend with the user (other than the user) is returned.
+        The user is left out of the result in both cases, even if they are among the candidates.
+
+        The counts come from a single 2-hop pass over the friends of the user's friends. For a few candidates
+        that pass can cost more than intersecting the friend arrays pairwise, so the cheaper of the two is used.
+
+        Time Complexity: O(min(S, c * d log d)) where S is the number of 2-hop paths from the user,
+                         c the number of candidates and d the friend count
+        """
+        user = self.vertices[username]
+        vertex_by_id = self.vertex_by_id
+        if candidates is not None:
+            candidates = [candidate for candidate in candidates if candidate != username]
+            paths = sum(len(vertex_by_id[friend_uid].friends) for friend_uid in user.friends)
+            if len(candidates) * max(len(user.friends), 1) < paths:
+                return {candidate: self.common_friends(username, candidate) for candidate in candidates}
+
+        counts = {}
+        for friend_uid in user.friends:
+            for uid in vertex_by_id[friend_uid].friends:
+                counts[uid] = counts.get(uid, 0) + 1
+        counts.pop(user.uid, None)
+        if candidates is None:
+            return {self.usernames[uid]: count for uid, count in counts.items()}
+        return {candidate: counts.get(self.vertices[candidate].uid, 0) for candidate in candidates}
 
     """
     (method) def send_friend_request(
@@ -94,14 +511,21 @@ class SocialNetwork:
         to_user: Any
     ) -> bool
     """
-    def send_friend_request(self, from_user, to_user):
+    def send_friend_request(self, from_user, to_user, timestamp=None):
         """
         Sends a friend request from one user to another.
+        If the recipient's inbox is at the inbox cap, their oldest pending request is evicted.
 
-        Time Complexity: O(1) - Direct dictionary access and append operation are constant time
+        Time Complexity: O(1) - Dictionary lookups and an insertion into the ordered inbox map
         """
-        if to_user in self.vertices and from_user not in self.vertices[to_user].inbox:
-            self.vertices[to_user].inbox.append(from_user)
+        if to_user not in self.vertices:
+            return False
+        to_vertex = self.vertices[to_user]
+        if to_vertex.inbox is None:
+            to_vertex.inbox = Inbox(self.inbox_cap)
+        timestamp = timestamp or datetime.now()
+        if to_vertex.inbox.add(from_user, timestamp):
+            self._notify("send_friend_request", from_user, to_user, timestamp)
             return True
         return False
 
@@ -112,16 +536,18 @@ class SocialNetwork:
         requester: Any
     ) -> bool
     """
-    def accept_friend_request(self, username, requester):
+    def accept_friend_request(self, username, requester, timestamp=None):
         """
         Accepts a friend request from a requester to the specified user.
 
-        Time Complexity: O(1) - Dictionary lookup, remove from list, and make_connections are all constant time operations
+        Time Complexity: O(log d) - O(1) inbox lookup and removal, plus inserting into the two sorted friend arrays
         """
         user = self.vertices[username]
-        if requester in user.inbox:
-            self.make_connections(username, requester)
+        if user.inbox is not None and requester in user.inbox:
+            timestamp = timestamp or datetime.now()
+            self._connect(username, requester, timestamp)
             user.inbox.remove(requester)
+            self._notify("accept_friend_request", username, requester, timestamp)
             return True
         return False
 
@@ -133,34 +559,54 @@ class SocialNetwork:
         message: Any
     ) -> bool
     """
-    def send_message(self, from_user, to_user, message):
+    def send_message(self, from_user, to_user, message, timestamp=None):
         """
         Sends a message from one user to another if they are friends.
 
-        Time Complexity: O(1) - Dictionary lookups and append operation are constant time
+        Time Complexity: O(log d) - Binary search in the friend IDs, then an O(1) append to the conversation
         """
         if to_user not in self.vertices or from_user not in self.vertices:
             return False
         to_vertex = self.vertices[to_user]
         from_vertex = self.vertices[from_user]
-        if from_vertex in to_vertex.adjacency_map:
-            to_vertex.messages.append(f"From {from_user}: {message}")
+        if to_vertex.is_friend(from_vertex.uid):
+            timestamp = timestamp or datetime.now()
+            self.messages.append(from_vertex.uid, to_vertex.uid, message, timestamp)
+            self.affinity.record(from_vertex.uid, to_vertex.uid, self.INTERACTION_WEIGHTS["message"], timestamp)
+            self._notify("send_message", from_user, to_user, message, timestamp)
             return True
         return False
 
     """
     (method) def get_messages(
         self: Self@SocialNetwork,
-        username: Any
+        username: Any,
+        conversation: Any = None,
+        limit: int = 20,
+        cursor: int = None
     ) -> list
     """
-    def get_messages(self, username):
+    def get_messages(self, username, conversation=None, limit=20, cursor=None):
         """
-        Retrieves all messages received by a specified user.
+        Retrieves messages as (sender, message, timestamp) tuples, oldest first.
 
-        Time Complexity: O(n) where n is the number of messages - Creating a new list copies all messages
+        With a conversation (the other user's username), returns the messages exchanged with that user:
+        the latest limit without a cursor, otherwise the page starting at position cursor.
+        Without a conversation, returns the latest limit messages the user received from anyone,
+        skipping the cursor most recent ones.
+
+        Time Complexity: O(limit) for a conversation - the page is read by position from the ring buffer,
+                         O(C + limit log C) across the user's C conversations
         """
-        return list(self.vertices[username].messages)
+        uid = self.vertices[username].uid
+        if conversation is None:
+            return self.messages.received(uid, limit, cursor or 0)
+        if conversation not in self.vertices:
+            return []
+        other = self.vertices[conversation].uid
+        if cursor is None:
+            return self.messages.latest(uid, other, limit)
+        return self.messages.page(uid, other, cursor, limit)
 
     """
     (method) def get_friend_requests(
@@ -168,87 +614,169 @@ class SocialNetwork:
         username: Any
     ) -> list
     """
-    def get_friend_requests(self, username):
+    def get_friend_requests(self, username, limit=None, cursor=0):
+        """
+        Retrieves the pending friend requests for a specified user, oldest first.
+        With a limit, only the page of up to limit requests starting at position cursor is returned.
+
+        Time Complexity: O(cursor + limit), or O(n) for all n requests
+        """
+        inbox = self.vertices[username].inbox
+        return inbox.page(cursor, limit) if inbox is not None else []
+
+    def has_friend_request(self, username, requester):
         """
-        Retrieves all pending friend requests for a specified user.
+        Checks if requester has a pending friend request in the user's inbox
 
-        Time Complexity: O(n) where n is the number of friend requests - Creating a new list copies all requests
+        Time Complexity: O(1) - Hash lookup in the ordered inbox map
         """
-        return list(self.vertices[username].inbox)
+        inbox = self.vertices[username].inbox
+        return inbox is not None and requester in inbox
     
-    def record_interaction(self, user1: str, user2: str):
-        """Records interactions to boost affinity scores between users."""
-        self.interaction_history[user1] = self.interaction_history.get(user1, {})
-        self.interaction_history[user1][user2] = self.interaction_history[user1].get(user2, 0) + 1
+    def record_interaction(self, user1: str, user2: str, weight: float = 1.0, timestamp: datetime = None):
+        """
+        Records an interaction of user1 with user2 to boost user1's affinity towards user2.
+        Likes, comments and messages are recorded automatically.
+
+        Time Complexity: O(N) - Scan of user1's top N partners
+        """
+        timestamp = timestamp or datetime.now()
+        self.affinity.record(self.vertices[user1].uid, self.vertices[user2].uid, weight, timestamp)
+        self._notify("record_interaction", user1, user2, weight, timestamp)
+
+    def get_affinity(self, username: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Gets the users that username interacts with most, as (username, decayed affinity), strongest first
+
+        Time Complexity: O(N log N) for the user's top N partners
+        """
+        uid = self.vertices[username].uid
+        return [(self.usernames[partner], score) for partner, score in self.affinity.top(uid, limit)]
 
     # New methods for post functionality
-    def create_post(self, username: str, content: str) -> str:
-        """Create a new post and return its ID"""
-        post_id = str(self.post_counter)
-        self.post_counter += 1
-        
-        # Create and store the post
-        post = Post(content, username)
-        self.posts.put(post_id, post)
-        
-        # Add to user's posts
-        user_posts = self.user_posts.get(username) or []
-        user_posts.append(post_id)
-        self.user_posts.put(username, user_posts)
-        
+    def create_post(self, username: str, content: str, timestamp: datetime = None) -> int:
+        """
+        Create a new post and return its ID
+
+        Time Complexity: O(L) where L is the length of the content - Appends to the post store columns,
+                         indexes the content and counts its hashtags and mentions
+        """
+        timestamp = timestamp or datetime.now()
+        post_id = self.posts.add(self.vertices[username].uid, content, timestamp)
+        self.search_index.add(post_id, content)
+        self.trending.observe(content, timestamp)
+        self._notify("create_post", username, content, timestamp)
         return post_id
 
-    def like_post(self, post_id: str, username: str) -> bool:
-        """Like a post and return success status"""
+    def get_trending_topics(self, kind: str = "hashtag", window: int = 3600, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        Get the most used hashtags (kind="hashtag") or mentions (kind="mention") over the last window seconds
+
+        Time Complexity: O(k log k) where k is the bounded number of tracked candidates
+        """
+        return self.trending.get_trending(kind, window, limit)
+
+    def like_post(self, post_id: int, username: str, timestamp: datetime = None) -> bool:
+        """Like a post and return success status (liking a post again changes nothing and is not journaled)"""
         post = self.posts.get(post_id)
         if post and username in self.vertices:
-            post.add_like(username)
-            self.posts.put(post_id, post)
+            uid = self.vertices[username].uid
+            if post.add_like(uid):
+                timestamp = timestamp or datetime.now()
+                self.affinity.record(uid, post.author_id, self.INTERACTION_WEIGHTS["like"], timestamp)
+                self._notify("like_post", post.pid, username, timestamp)
             return True
         return False
 
-    def unlike_post(self, post_id: str, username: str) -> bool:
+    def unlike_post(self, post_id: int, username: str) -> bool:
         """Remove like from a post and return success status"""
-        post = self.posts.get(post_id)
-        if post and username in post.likes:
-            post.remove_like(username)
-            self.posts.put(post_id, post)
+        if self.has_liked(post_id, username):
+            post = self.posts.get(post_id)
+            post.remove_like(self.vertices[username].uid)
+            self._notify("unlike_post", post.pid, username)
             return True
         return False
 
-    def comment_on_post(self, post_id: str, username: str, comment: str) -> bool:
+    def has_liked(self, post_id: int, username: str) -> bool:
+        """Check if a user has liked a post"""
+        post = self.posts.get(post_id)
+        return post is not None and username in self.vertices and self.posts.has_liked(post.pid, self.vertices[username].uid)
+
+    def comment_on_post(self, post_id: int, username: str, comment: str, timestamp: datetime = None) -> bool:
         """Add a comment to a post and return success status"""
         post = self.posts.get(post_id)
         if post and username in self.vertices:
-            post.add_comment(username, comment)
-            self.posts.put(post_id, post)
+            timestamp = timestamp or datetime.now()
+            uid = self.vertices[username].uid
+            post.add_comment(uid, comment, timestamp)
+            self.affinity.record(uid, post.author_id, self.INTERACTION_WEIGHTS["comment"], timestamp)
+            self._notify("comment_on_post", post.pid, username, comment, timestamp)
             return True
         return False
 
-    def get_user_posts(self, username: str) -> List[Tuple[str, Post]]:
-        """Get all posts by a user"""
-        post_ids = self.user_posts.get(username) or []
-        return [(pid, self.posts.get(pid)) for pid in post_ids if self.posts.get(pid) is not None]
+    def get_comments(self, post_id: int, limit: int = 10, cursor: int = None) -> List[Tuple[str, str, datetime]]:
+        """
+        Get comments on a post as (username, comment, timestamp), oldest first.
+        Without a cursor the latest limit comments are returned, otherwise the page starting at position cursor.
 
-    def get_friend_posts(self, username: str) -> List[Tuple[str, Post]]:
+        Time Complexity: O(limit) - Reads only the requested slice of the post's comment index
+        """
+        post = self.posts.get(post_id)
+        if post is None:
+            return []
+        if cursor is None:
+            return post.latest_comments(limit)
+        return post.comments_page(cursor, limit)
+
+    def get_user_posts(self, username: str, since: datetime = None, until: datetime = None,
+                       limit: int = None) -> List[Tuple[int, Post]]:
+        """
+        Get posts by a user, oldest first, optionally restricted to since <= timestamp < until.
+        With a limit, only the most recent limit posts in the range are returned.
+
+        Time Complexity: O(log P + k) - Binary search on the user's timestamp index, then k posts are returned
+        """
+        if username not in self.vertices:
+            return []
+        post_ids = self.posts.posts_between(self.vertices[username].uid, since, until, limit)
+        return [(pid, Post(self.posts, pid)) for pid in post_ids]
+
+    def search_posts(self, query: str, limit: int = 10, visible_to: str = None) -> List[Tuple[int, Post]]:
+        """
+        Full-text search over post content, ranked by BM25.
+        If visible_to is given, only posts by that user or their friends are returned.
+
+        Time Complexity: O(M + M' log(limit)) where M is the total posting list length of the query terms
+                         and M' the number of matching posts
+        """
+        accept = None
+        if visible_to is not None:
+            if visible_to not in self.vertices:
+                return []
+            user = self.vertices[visible_to]
+            visible_authors = set(user.friends)
+            visible_authors.add(user.uid)
+            authors = self.posts.authors
+            accept = lambda pid: authors[pid] in visible_authors
+        results = self.search_index.search(query, limit, accept)
+        return [(pid, Post(self.posts, pid)) for pid, _ in results]
+
+    def get_friend_posts(self, username: str) -> List[Tuple[int, Post]]:
         """Get all posts from user's friends"""
         if username not in self.vertices:
             return []
             
         user = self.vertices[username]
-        friend_posts = []
+        friend_post_ids = []
         
         # Get posts from all friends
-        for friend in user.adjacency_map:
-            friend_post_ids = self.user_posts.get(friend.username) or []
-            for pid in friend_post_ids:
-                post = self.posts.get(pid)
-                if post is not None:
-                    friend_posts.append((pid, post))
+        for friend_uid in user.friends:
+            friend_post_ids.extend(self.posts.posts_by(friend_uid))
         
         # Sort by timestamp, newest first
-        friend_posts.sort(key=lambda x: x[1].timestamp, reverse=True)
-        return friend_posts
+        timestamps = self.posts.timestamps
+        friend_post_ids.sort(key=lambda pid: timestamps[pid], reverse=True)
+        return [(pid, Post(self.posts, pid)) for pid in friend_post_ids]
     
     """
     (method) def get_personalized_feed(
@@ -266,7 +794,7 @@ class SocialNetwork:
         Ranking factors (in order of importance):
         1. Post recency (40% weight)
         2. Engagement metrics - likes and comments (40% weight)
-        3. User interaction frequency (20% weight)
+        3. Time-decayed interaction affinity towards the friend (20% weight)
         
         """
         if username not in self.vertices:
@@ -274,38 +802,34 @@ class SocialNetwork:
 
         posts_heap = MaxHeap()
         user = self.vertices[username]
-        current_time = datetime.now()
+        current_time = datetime.now().timestamp()
+        timestamps = self.posts.timestamps
     
         max_time_diff = 60 * 60 * 24 * 7 
         max_engagement = 0
         max_interaction = 0
         
+        affinity = self.affinity.scores_of(user.uid)  # Decayed once for all of the user's top partners
         friend_posts = []
-        for friend_vertex in user.adjacency_map.keys():
-            friend_username = friend_vertex.username
-            friend_post_ids = self.user_posts.get(friend_username) or []
-            
-            interaction_count = (self.interaction_history.get(username, {})
-                            .get(friend_username, 0))
+        for friend_uid in user.friends:
+            interaction_count = affinity.get(friend_uid, 0.0)
             max_interaction = max(max_interaction, interaction_count)
             
-            for pid in friend_post_ids:
-                post = self.posts.get(pid)
-                if post:
-                    engagement = len(post.likes) * 2 + len(post.comments) * 3
-                    max_engagement = max(max_engagement, engagement)
-                    friend_posts.append((post, interaction_count))
+            # Post IDs index straight into the columns of the post store
+            for pid in self.posts.posts_by(friend_uid):
+                engagement = self.posts.engagement(pid)
+                max_engagement = max(max_engagement, engagement)
+                friend_posts.append((pid, engagement, interaction_count))
         
         max_engagement = max(max_engagement, 1)
         max_interaction = max(max_interaction, 1)
         
-        for post, interaction_count in friend_posts:
+        for pid, engagement, interaction_count in friend_posts:
             # 1. Recency Score (40% weight)
-            time_diff = (current_time - post.timestamp).total_seconds()
+            time_diff = current_time - timestamps[pid]
             recency_score = 1 - min(time_diff / max_time_diff, 1)
             
             # 2. Engagement Score (40% weight)
-            engagement = len(post.likes) * 2 + len(post.comments) * 3
             engagement_score = engagement / max_engagement
             
             # 3. User Interaction Score (20% weight)
@@ -316,15 +840,15 @@ class SocialNetwork:
                 engagement_score * 0.4 +
                 interaction_score * 0.2
             )
-            posts_heap.insert((final_score, post))
+            posts_heap.insert((final_score, pid))
 
         feed = []
         while len(feed) < 10 and not posts_heap.is_empty():
-            post = posts_heap.extract_max()[1]
-            feed.append(post)
+            pid = posts_heap.extract_max()[1]
+            feed.append(Post(self.posts, pid))
         return feed
 
 
-    def get_post(self, post_id: str) -> Optional[Post]:
-        """Get a specific post by ID"""
+    def get_post(self, post_id) -> Optional[Post]:
+        """Get a specific post by ID (an int, or a numeric string as typed by the user)"""
         return self.posts.get(post_id)
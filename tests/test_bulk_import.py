@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auto_complete import Trie
+from benchmarks import import_per_call, state_fingerprint, write_dataset
+from bulk_import import import_dataset
+from hobby_network import HobbyNetwork
+from social_network import SocialNetwork
+
+"""
+Preamble:
+    The streaming bulk importer must build the same state as importing the same rows through the public API,
+    one add_person/add_user_hobbies/make_connections/create_post call per row.
+    Run with: python -m pytest tests (or python -m unittest discover tests)
+"""
+
+class BulkImportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # Includes users without hobbies and rows that replace an existing user
+        self.paths = write_dataset(self.directory.name, users=300, friendships=1500, posts=600, seed=5, replaced=30)
+        self.reference = import_per_call(self.paths)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def import_bulk(self, chunk_size):
+        network, hobby_network, trie = SocialNetwork(), HobbyNetwork(), Trie()
+        import_dataset(network, hobby_network, trie, chunk_size=chunk_size, **self.paths)
+        return network, hobby_network, trie
+
+    def test_same_state_as_per_call(self):
+        for chunk_size in (1, 7, 10_000):  # One row per chunk, rows spread over chunks, a single chunk
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(state_fingerprint(*self.reference), state_fingerprint(*self.import_bulk(chunk_size)))
+
+    def test_users_without_hobbies_are_registered(self):
+        network, hobby_network, _ = self.import_bulk(64)
+        reference_hobbies = self.reference[1]
+        self.assertTrue(any(not vertex.hobbies for vertex in hobby_network.user_vertices.values()))
+        self.assertEqual(len(network.vertices), len(hobby_network.user_vertices))
+        self.assertEqual(list(reference_hobbies.user_vertices), list(hobby_network.user_vertices))
+        self.assertEqual([vertex.uid for vertex in reference_hobbies.user_vertices.values()],
+                         [vertex.uid for vertex in hobby_network.user_vertices.values()])
+
+    def test_same_hobby_queries(self):
+        _, hobby_network, _ = self.import_bulk(64)
+        reference_hobbies = self.reference[1]
+        self.assertEqual(reference_hobbies.get_users_with_most_hobbies(10), hobby_network.get_users_with_most_hobbies(10))
+        for hobby in ("hobby0", "hobby1", "hobby2"):
+            # Which of several tied hobbies fills the last related_k slot depends on the update order, the weights do not
+            self.assertEqual([weight for _, weight in reference_hobbies.get_related_hobbies(hobby, 5)],
+                             [weight for _, weight in hobby_network.get_related_hobbies(hobby, 5)])
+        self.assertEqual(list(reference_hobbies.get_users_by_hobbies(all_of=["hobby0"], any_of=["hobby1", "hobby2"])),
+                         list(hobby_network.get_users_by_hobbies(all_of=["hobby0"], any_of=["hobby1", "hobby2"])))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+from array import array
+from typing import List, Optional, Tuple
+
+"""
+Preamble:
+    Fixed-memory time series of a hobby's membership, kept as ring buffers of time buckets at several resolutions.
+
+    Every resolution has a fixed bucket width and keeps a fixed number of buckets: the last hour by minute, the
+    last two days by hour and the last 90 days by day. Each bucket holds two ints: the number of users who
+    joined during it, and the member count after its last change. A change is written into the current bucket of
+    every resolution, so older history is always available at a coarser resolution after the finer buckets
+    have been reused (downsampling happens on write, there is no separate rollup pass).
+
+    Memory is the same for every hobby however busy it is, and a range query reads one bucket per step of the
+    chosen resolution. Buckets are aligned to the Unix epoch, so days run from midnight UTC.
+"""
+
+RESOLUTIONS = ("minute", "hour", "day")
+BUCKET_SECONDS = (60, 3600, 86400)  # Width of a bucket at each resolution
+BUCKET_COUNTS = (60, 48, 90)  # Buckets kept at each resolution
+BUCKET_OFFSETS = (0, 60, 108)  # Start of each resolution's ring in the shared arrays
+TOTAL_BUCKETS = 198
+
+class TrendSeries:
+    __slots__ = ("last", "levels", "joins")
+
+    def __init__(self):
+        self.last = array('q', [-1]) * len(RESOLUTIONS)  # Absolute number of the newest bucket of each resolution
+        self.levels = array('i', bytes(4 * TOTAL_BUCKETS))  # Member count at the end of each bucket
+        self.joins = array('i', bytes(4 * TOTAL_BUCKETS))  # Users who joined during each bucket
+
+    @classmethod
+    def load(cls, last, levels, joins) -> "TrendSeries":
+        """Series from arrays saved by a snapshot (in the layout of the attributes)"""
+        series = cls()
+        series.last = array('q', last)
+        series.levels = array('i', levels)
+        series.joins = array('i', joins)
+        return series
+
+    def record(self, timestamp: float, level: int, joins: int = 1) -> None:
+        """
+        Record that joins users joined at timestamp, leaving level members
+        Time Complexity: O(R) for R resolutions, plus O(1) amortized per bucket that elapsed since the last change
+        """
+        levels, joins_ = self.levels, self.joins
+        for r in range(len(RESOLUTIONS)):
+            width, count, base = BUCKET_SECONDS[r], BUCKET_COUNTS[r], BUCKET_OFFSETS[r]
+            bucket = int(timestamp // width)
+            last = self.last[r]
+            if bucket > last:
+                # Reuse the buckets between the last change and now, nothing changed during them
+                carry = levels[base + last % count] if last >= 0 else 0
+                for skipped in range(max(last + 1, bucket - count + 1), bucket + 1):
+                    levels[base + skipped % count] = carry
+                    joins_[base + skipped % count] = 0
+                self.last[r] = last = bucket
+            elif bucket <= last - count:  # Older than this ring reaches back
+                continue
+            slot = base + bucket % count
+            joins_[slot] += joins
+            if bucket == last:  # A late change to an older bucket does not know the count at its end
+                levels[slot] = level
+
+    def _finest_covering(self, start: float) -> int:
+        """Finest resolution that still holds the bucket containing start (the coarsest if none does)"""
+        for r in range(len(RESOLUTIONS) - 1):
+            if int(start // BUCKET_SECONDS[r]) > self.last[r] - BUCKET_COUNTS[r]:
+                return r
+        return len(RESOLUTIONS) - 1
+
+    def buckets(self, start: float, end: float, resolution: Optional[str] = None) -> List[Tuple[float, int, int]]:
+        """
+        (bucket start, member count at its end, joins during it) for every bucket from start to end, at the given
+        resolution or the finest one that reaches back to start. Buckets older than the ring are left out, and
+        buckets after the last change repeat its member count.
+        Time Complexity: O(b) for the b buckets in the range
+        """
+        r = RESOLUTIONS.index(resolution) if resolution is not None else self._finest_covering(start)
+        width, count, base = BUCKET_SECONDS[r], BUCKET_COUNTS[r], BUCKET_OFFSETS[r]
+        last = self.last[r]
+        if last < 0:
+            return []
+        latest_level = self.levels[base + last % count]
+        result = []
+        for bucket in range(max(int(start // width), last - count + 1), int(end // width) + 1):
+            if bucket <= last:
+                slot = base + bucket % count
+                result.append((bucket * width, self.levels[slot], self.joins[slot]))
+            else:
+                result.append((bucket * width, latest_level, 0))
+        return result
+
+    def joins_history(self) -> List[Tuple[float, int]]:
+        """
+        (bucket midpoint, joins) for every bucket with joins, oldest first, reading each stretch of time from the
+        finest resolution that still holds it (e.g. to re-seed streaming statistics after a snapshot load)
+        Time Complexity: O(B) for the B buckets kept
+        """
+        history = []
+        newer_than = None  # Start of the stretch already read from a finer resolution
+        for r in range(len(RESOLUTIONS)):
+            width, count, base = BUCKET_SECONDS[r], BUCKET_COUNTS[r], BUCKET_OFFSETS[r]
+            last = self.last[r]
+            if last < 0:
+                return []
+            oldest = last - count + 1
+            if r + 1 < len(RESOLUTIONS):  # Start on a bucket boundary of the next resolution, which reads the rest
+                coarser = BUCKET_SECONDS[r + 1] // width
+                oldest = -(-oldest // coarser) * coarser
+            stop = last + 1 if newer_than is None else newer_than // width
+            stretch = []
+            for bucket in range(oldest, stop):
+                joins = self.joins[base + bucket % count]
+                if joins:
+                    stretch.append((bucket * width + width / 2, joins))
+            history[:0] = stretch
+            newer_than = oldest * width
+        return history
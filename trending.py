@@ -0,0 +1,268 @@
+import heapq
+import math
+import re
+from array import array
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from max_heap import IndexedMaxHeap
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+MENTION_PATTERN = re.compile(r"@([A-Za-z0-9_.]*[A-Za-z0-9_])")
+
+def extract_tags(text: str) -> Tuple[List[str], List[str]]:
+    """
+    Extract (hashtags, mentions) from post content. Hashtags are lowercased, mentions keep the username as typed.
+    Time Complexity: O(L) where L is the length of the text
+    """
+    hashtags = [tag.lower() for tag in HASHTAG_PATTERN.findall(text)]
+    mentions = MENTION_PATTERN.findall(text)
+    return hashtags, mentions
+
+class CountMinSketch:
+    """
+    Fixed-memory frequency estimator. Estimates never undercount, and overcount by at most
+    about 2/width of the total count with high probability (depth controls the probability).
+    """
+    def __init__(self, width: int = 1024, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = array('i', bytes(4 * width * depth))  # depth rows of width counters, row-major
+
+    def _positions(self, key: str):
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for row in range(self.depth):
+            yield row * self.width + (h1 + row * h2) % self.width
+
+    def add(self, key: str, count: int = 1) -> None:
+        """Time Complexity: O(d) where d is the depth"""
+        for pos in self._positions(key):
+            self.table[pos] += count
+
+    def estimate(self, key: str) -> int:
+        """Time Complexity: O(d) where d is the depth"""
+        return min(self.table[pos] for pos in self._positions(key))
+
+    def subtract(self, other: "CountMinSketch") -> None:
+        """Remove the counts of another sketch with the same shape. Time Complexity: O(w*d)"""
+        table = self.table
+        for pos, count in enumerate(other.table):
+            if count:
+                table[pos] -= count
+
+    def clear(self) -> None:
+        self.table = array('i', bytes(4 * self.width * self.depth))
+
+class SlidingWindowTopK:
+    """
+    Approximate top-k most frequent keys over a sliding time window.
+
+    The window is split into slots, each with its own count-min sketch, and a running total sketch holds the
+    sum of the live slots. When a slot falls out of the window its counts are subtracted from the total.
+    A bounded candidate set of at most k keys (with a lazy min-heap to find the weakest) tracks the heavy hitters,
+    so memory is fixed no matter how many distinct keys appear and a query costs O(k log k).
+    """
+    def __init__(self, window_seconds: int, k: int = 20, slots: int = 12, width: int = 1024, depth: int = 4):
+        self.window_seconds = window_seconds
+        self.k = k
+        self.slots = slots
+        self.slot_seconds = window_seconds / slots
+        self.ring = [CountMinSketch(width, depth) for _ in range(slots)]
+        self.total = CountMinSketch(width, depth)
+        self.current_slot = None
+        self.candidates: Dict[str, int] = {}  # key -> estimated count in the window
+        self.min_heap: List[Tuple[int, str]] = []  # (estimate, key), may hold stale entries
+
+    def _advance(self, timestamp: float) -> None:
+        """Expire slots that fell out of the window. Time Complexity: O(w*d) per expired slot"""
+        slot = int(timestamp // self.slot_seconds)
+        if self.current_slot is None:
+            self.current_slot = slot
+            return
+        if slot <= self.current_slot:
+            return
+        expired = min(slot - self.current_slot, self.slots)
+        for step in range(1, expired + 1):
+            sketch = self.ring[(self.current_slot + step) % self.slots]
+            self.total.subtract(sketch)
+            sketch.clear()
+        self.current_slot = slot
+        self._refresh_candidates()
+
+    def _refresh_candidates(self) -> None:
+        """Re-estimate the candidates after slots expired. Time Complexity: O(k*d)"""
+        self.candidates = {key: self.total.estimate(key) for key in self.candidates}
+        self.candidates = {key: count for key, count in self.candidates.items() if count > 0}
+        self.min_heap = [(count, key) for key, count in self.candidates.items()]
+        heapq.heapify(self.min_heap)
+
+    def _weakest(self) -> Tuple[int, str]:
+        """Smallest candidate, discarding stale heap entries"""
+        while True:
+            count, key = self.min_heap[0]
+            if self.candidates.get(key) == count:
+                return count, key
+            heapq.heappop(self.min_heap)
+
+    def add(self, key: str, timestamp: float) -> None:
+        """
+        Count one occurrence of a key in the slot of its timestamp, so a late occurrence expires with the slot it
+        belongs to (occurrences older than the window are ignored)
+        Time Complexity: O(d + log k) amortized
+        """
+        slot = int(timestamp // self.slot_seconds)
+        if self.current_slot is not None and slot <= self.current_slot - self.slots:
+            return
+        self._advance(timestamp)
+        self.ring[slot % self.slots].add(key)
+        self.total.add(key)
+        estimate = self.total.estimate(key)
+
+        if key in self.candidates or len(self.candidates) < self.k:
+            self.candidates[key] = estimate
+            heapq.heappush(self.min_heap, (estimate, key))
+        else:
+            weakest_count, weakest_key = self._weakest()
+            if estimate > weakest_count:
+                heapq.heappop(self.min_heap)
+                del self.candidates[weakest_key]
+                self.candidates[key] = estimate
+                heapq.heappush(self.min_heap, (estimate, key))
+
+        if len(self.min_heap) > 4 * self.k:  # Drop stale entries so the heap stays bounded
+            self.min_heap = [(count, key) for key, count in self.candidates.items()]
+            heapq.heapify(self.min_heap)
+
+    def top(self, limit: int = 10, now: datetime = None) -> List[Tuple[str, int]]:
+        """
+        Most frequent keys in the window ending now, as (key, estimated count)
+        Time Complexity: O(k log k)
+        """
+        self._advance((now or datetime.now()).timestamp())
+        ranked = sorted(self.candidates.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+class TrendingTopics:
+    """Trending hashtags and mentions over a set of sliding windows, fed with the content of new posts"""
+    KINDS = ("hashtag", "mention")
+
+    def __init__(self, windows=(3600, 86400), k: int = 20):
+        self.windows = tuple(windows)
+        self.trackers = {
+            kind: {window: SlidingWindowTopK(window, k) for window in windows}
+            for kind in self.KINDS
+        }
+
+    def observe(self, content: str, timestamp: datetime = None) -> None:
+        """
+        Extract hashtags and mentions from a post and count them in every window
+        Time Complexity: O(L + t*W*(d + log k)) where t is the number of tags and W the number of windows
+        """
+        ts = (timestamp or datetime.now()).timestamp()
+        hashtags, mentions = extract_tags(content)
+        for kind, keys in (("hashtag", hashtags), ("mention", mentions)):
+            for key in set(keys):  # A tag repeated within one post counts once
+                for tracker in self.trackers[kind].values():
+                    tracker.add(key, ts)
+
+    def get_trending(self, kind: str = "hashtag", window: int = 3600, limit: int = 10,
+                     now: datetime = None) -> List[Tuple[str, int]]:
+        """Top tags of a kind over a configured window (in seconds), as (tag, estimated count)"""
+        if kind not in self.trackers:
+            raise ValueError(f"Unknown trending kind: {kind}")
+        if window not in self.trackers[kind]:
+            raise ValueError(f"No trending window of {window} seconds is tracked")
+        return self.trackers[kind][window].top(limit, now)
+
+def _log_add(a: float, b: float) -> float:
+    """log(e^a + e^b) without overflow"""
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+class JoinVelocity:
+    """
+    Rising keys (integer IDs) over a window: join velocity against a slower baseline, both exponentially
+    weighted moving averages maintained incrementally.
+
+    The fast average counts joins with weight e^(-age / window), about the joins of the last window. The baseline
+    uses baseline_factor times that time constant and is scaled to joins per window, so a key joining at a steady
+    pace scores about 0 and a key that is speeding up scores the joins above its usual pace.
+
+    Both sums are kept as forward-decayed logarithms: each join adds e^((t - epoch) / tau) in log space, and the
+    value now is that sum times e^(-(now - epoch) / tau). Nothing needs updating as time passes and no rescaling is
+    needed. Since the decay factor is shared by every key, the order of the fast sums never changes, and they sit
+    in an IndexedMaxHeap: the fast average bounds the score from above, so a query reads keys by fast average and
+    stops once no later key can beat the limit-th score found.
+    """
+    def __init__(self, window: float, baseline_factor: float = 24.0):
+        self.window = window  # Time constant of the fast average, in seconds
+        self.baseline = window * baseline_factor  # Time constant of the baseline
+        self.epoch = None  # Reference time of the forward decay, set by the first join
+        self.log_fast = array('d')  # ID -> log of the forward-decayed fast sum
+        self.log_slow = array('d')  # ID -> log of the forward-decayed baseline sum
+        self.heap = IndexedMaxHeap()  # ID -> log_fast
+
+    def add(self, key: int, timestamp: float, joins: int = 1) -> None:
+        """
+        Count joins of a key at a Unix timestamp
+        Time Complexity: O(log n) for n keys
+        """
+        if self.epoch is None:
+            self.epoch = timestamp
+        while len(self.log_fast) <= key:
+            self.log_fast.append(-math.inf)
+            self.log_slow.append(-math.inf)
+        age, log_joins = timestamp - self.epoch, math.log(joins)
+        self.log_fast[key] = _log_add(self.log_fast[key], age / self.window + log_joins)
+        self.log_slow[key] = _log_add(self.log_slow[key], age / self.baseline + log_joins)
+        self.heap.update(key, self.log_fast[key])
+
+    def _fast(self, log_fast: float, now: float) -> float:
+        return math.exp(log_fast - (now - self.epoch) / self.window)
+
+    def score(self, key: int, now: float) -> float:
+        """Joins over the last window above the baseline pace. Time Complexity: O(1)"""
+        if self.epoch is None or key >= len(self.log_fast):
+            return 0.0
+        slow = math.exp(self.log_slow[key] - (now - self.epoch) / self.baseline) * self.window / self.baseline
+        return self._fast(self.log_fast[key], now) - slow
+
+    def top(self, limit: int, now: float) -> List[Tuple[int, float]]:
+        """
+        Keys with the highest positive scores, as (key, score)
+        Time Complexity: O(m log m) for the m keys read before the bound stops the search
+        """
+        best: List[Tuple[float, int]] = []  # Min-heap of the limit best (score, key)
+        for log_fast, key in self.heap.descending():
+            bound = self._fast(log_fast, now)
+            if bound <= 0 or (len(best) == limit and bound <= best[0][0]):
+                break
+            score = self.score(key, now)
+            if score <= 0:
+                continue
+            if len(best) < limit:
+                heapq.heappush(best, (score, key))
+            elif score > best[0][0]:
+                heapq.heapreplace(best, (score, key))
+        return [(key, score) for score, key in sorted(best, reverse=True)]
+
+class TrendingHobbies:
+    """Rising hobbies (by hobby ID) over a set of windows, fed with hobby joins"""
+    def __init__(self, windows=(3600, 86400), baseline_factor: float = 24.0):
+        self.windows = tuple(windows)
+        self.trackers = {window: JoinVelocity(window, baseline_factor) for window in windows}
+
+    def observe(self, hid: int, timestamp: float, joins: int = 1) -> None:
+        """Count joins of a hobby in every window. Time Complexity: O(W log h) for W windows and h hobbies"""
+        for tracker in self.trackers.values():
+            tracker.add(hid, timestamp, joins)
+
+    def get_trending(self, window: int = 3600, limit: int = 10, now: float = None) -> List[Tuple[int, float]]:
+        """Fastest-rising hobby IDs over a configured window (in seconds), as (hobby ID, joins above baseline)"""
+        if window not in self.trackers:
+            raise ValueError(f"No trending window of {window} seconds is tracked")
+        return self.trackers[window].top(limit, datetime.now().timestamp() if now is None else now)
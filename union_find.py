@@ -0,0 +1,81 @@
+from array import array
+from typing import Iterable, Tuple
+
+"""
+Preamble:
+    Disjoint-set forest (union-find) over dense integer IDs, used to track the connected components of the
+    friendship graph as friendships are made.
+
+    parent, rank and size are flat typed arrays indexed by ID. find() compresses paths by halving (every node on
+    the way points to its grandparent), and union() attaches the root of lower rank under the other, so any
+    sequence of operations costs O(alpha(n)) amortized each - effectively constant.
+
+    Components can only merge: a friendship that ends cannot split one, so the forest is rebuilt from the edges
+    when that is needed.
+"""
+
+class UnionFind:
+    def __init__(self, count: int = 0):
+        self.parent = array('i', range(count))  # Parent ID, roots are their own parent
+        self.rank = array('b', bytes(count))  # Upper bound on the height of each root's tree
+        self.size = array('i', [1]) * count  # Number of members, only meaningful for roots
+        self.components = count  # Number of disjoint sets
+
+    def add(self) -> int:
+        """Add a new singleton set and return its ID. Time Complexity: O(1) amortized"""
+        uid = len(self.parent)
+        self.parent.append(uid)
+        self.rank.append(0)
+        self.size.append(1)
+        self.components += 1
+        return uid
+
+    def find(self, uid: int) -> int:
+        """
+        Representative (root) of the set containing uid
+        Time Complexity: O(alpha(n)) amortized
+        """
+        parent = self.parent
+        while parent[uid] != uid:
+            parent[uid] = parent[parent[uid]]  # Path halving
+            uid = parent[uid]
+        return uid
+
+    def union(self, uid1: int, uid2: int) -> bool:
+        """
+        Merge the sets of two IDs, returns False if they were already in the same set
+        Time Complexity: O(alpha(n)) amortized
+        """
+        root1, root2 = self.find(uid1), self.find(uid2)
+        if root1 == root2:
+            return False
+        if self.rank[root1] < self.rank[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+        if self.rank[root1] == self.rank[root2]:
+            self.rank[root1] += 1
+        self.components -= 1
+        return True
+
+    def connected(self, uid1: int, uid2: int) -> bool:
+        """Time Complexity: O(alpha(n)) amortized"""
+        return self.find(uid1) == self.find(uid2)
+
+    def component_size(self, uid: int) -> int:
+        """Number of IDs in the set containing uid. Time Complexity: O(alpha(n)) amortized"""
+        return self.size[self.find(uid)]
+
+    @classmethod
+    def from_edges(cls, count: int, edges: Iterable[Tuple[int, int]]) -> "UnionFind":
+        """
+        Forest over count IDs with every (uid1, uid2) pair merged
+        Time Complexity: O(n + m alpha(n)) for m edges
+        """
+        forest = cls(count)
+        for uid1, uid2 in edges:
+            forest.union(uid1, uid2)
+        return forest
+
+    def __len__(self) -> int:
+        return len(self.parent)